@@ -0,0 +1,98 @@
+"""Benchmark action throughput with and without the per-tick unit of work.
+
+Real `eat` and `work` NPC_ACTION events (bread with three effects, one-hour
+shifts at a WORKABLE place) are run through ActionExecutor.event_listener on a
+file database, in ticks of `--per-tick` events the way SimClock's pre_tick runs
+them: once with every write committed on its own (`tick_unit_of_work = false`)
+and once inside one UnitOfWork per tick, and actions/sec is reported for both.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/bench_actions.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from aitown.helpers.db_helper import init_db
+from aitown.kernel.event_bus import EventType
+from aitown.kernel.npc_actions import ActionExecutor
+from aitown.repos.event_repo import Event
+from aitown.repos.unit_of_work import UnitOfWork
+
+
+def _setup(path: str, npcs: int):
+    conn = init_db(path)
+    effects = [(1, "Hunger +10", "hunger", 10), (2, "Energy +10", "energy", 10), (3, "Mood +5", "mood", 5)]
+    conn.executemany("INSERT INTO effect (id, name, attribute, change) VALUES (?, ?, ?, ?)", effects)
+    conn.execute(
+        "INSERT INTO item (id, name, value, type, effect_ids) VALUES (1, 'Bread', 3, 'CONSUMABLE', ?)",
+        (json.dumps(["1", "2", "3"]),),
+    )
+    conn.execute("INSERT INTO place (id, name, tags) VALUES (1, 'Workshop', ?)", (json.dumps(["WORKABLE"]),))
+    conn.executemany(
+        "INSERT INTO npc (id, name, location_id, hunger, energy, mood, inventory) VALUES (?, ?, 1, 50, 50, 50, ?)",
+        [(i, f"npc{i}", json.dumps({"1": 1_000_000})) for i in range(1, npcs + 1)],
+    )
+    conn.commit()
+    return conn
+
+
+def _events(actions: int, npcs: int):
+    for i in range(actions):
+        npc_id = str(i % npcs + 1)
+        if (i // npcs) % 2:
+            payload = {"action_type": "work", "npc_id": npc_id, "duration_hours": 1}
+        else:
+            payload = {"action_type": "eat", "npc_id": npc_id, "item_id": "1", "item_amount": 1}
+        yield Event(event_type=EventType.NPC_ACTION, npc_id=npc_id, payload=payload)
+
+
+def _run(path: str, actions: int, per_tick: int, npcs: int, unit_of_work: bool) -> float:
+    conn = _setup(path, npcs)
+    live_conn = ActionExecutor.conn
+    ActionExecutor.bind(conn)
+    # event_listener only reads the bus' clock
+    bus = SimpleNamespace(clock=time.time)
+    events = list(_events(actions, npcs))
+    try:
+        started = time.perf_counter()
+        for tick, start in enumerate(range(0, actions, per_tick)):
+            with UnitOfWork(conn) if unit_of_work else contextlib.nullcontext():
+                ActionExecutor.begin_tick(tick, 0)
+                for evt in events[start : start + per_tick]:
+                    ActionExecutor.event_listener(bus, evt)
+                ActionExecutor.ledger.flush()
+        elapsed = time.perf_counter() - started
+        wages = conn.execute("SELECT COUNT(*) FROM ledger_entry").fetchone()[0]
+    finally:
+        ActionExecutor.bind(live_conn)
+        conn.close()
+    # every other round of events is a shift; a failed action would show up as a missing wage
+    assert wages == sum(1 for evt in events if evt.payload["action_type"] == "work"), wages
+    return actions / elapsed
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--actions", type=int, default=2000)
+    p.add_argument("--per-tick", type=int, default=50)
+    p.add_argument("--npcs", type=int, default=50)
+    args = p.parse_args()
+
+    print(f"{'mode':>16} {'actions/s':>12}")
+    for label, uow in (("commit per write", False), ("unit of work", True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            rate = _run(os.path.join(tmp, "bench.db"), args.actions, args.per_tick, args.npcs, uow)
+        print(f"{label:>16} {rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark tick cost of InMemoryEventBus against the size of its backlog.
+
+Queues 10k/100k events that no subscriber consumes, then measures the time of
+pre_tick -> on_tick -> post_tick while a small batch of NPC_ACTION events is
+published every tick. The flat-list bus the kernel used before per-type queues
+is included as a reference.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/bench_event_bus.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.models.event_model import Event
+
+
+class _NullEventRepo:
+    """Stands in for EventRepository so only bus bookkeeping is measured."""
+
+    def __init__(self):
+        self._next_id = 0
+
+    def append_event(self, event: Event) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def mark_processed(self, event_id: int, processed_at: float) -> None:
+        pass
+
+    def max_id(self) -> int:
+        return 0
+
+    def write_batch(self, events, marks) -> bool:
+        return True
+
+
+class _FlatListBus(InMemoryEventBus):
+    """Previous implementation: one flat list scanned on every call."""
+
+    def __init__(self):
+        super().__init__()
+        self.flat: List[Event] = []
+
+    def _enqueue(self, event: Event) -> None:
+        self.flat.append(event)
+
+    def drainI(self, event_type: str):
+        for evt in self.flat:
+            if evt.event_type == event_type:
+                yield evt
+
+    def pre_tick(self) -> None:
+        for evt in self.drainI(EventType.NPC_ACTION):
+            for cb in self.subscribers.get(EventType.NPC_ACTION, []):
+                cb(self, evt)
+
+    def on_tick(self) -> None:
+        processed_events = [evt for evt in self.flat if evt.processed == 1]
+        for evt in processed_events:
+            self.event_repo.mark_processed(evt.id, time.time())
+        self.flat = [evt for evt in self.flat if evt.processed == 0]
+
+
+def _consume(bus, evt: Event) -> None:
+    evt.processed = 1
+
+
+def _make_bus(cls, backlog: int):
+    bus = cls()
+    bus.event_repo = _NullEventRepo()
+    bus.subscribe(EventType.NPC_ACTION, _consume)
+    for _ in range(backlog):
+        bus.publish(Event(event_type=EventType.NPC_DECISION, created_at=1.0))
+    return bus
+
+
+def run(backlog: int, ticks: int, actions_per_tick: int, cls) -> float:
+    """Return the mean tick time in milliseconds."""
+    bus = _make_bus(cls, backlog)
+    elapsed = 0.0
+    for _ in range(ticks):
+        for i in range(actions_per_tick):
+            bus.publish(
+                Event(
+                    event_type=EventType.NPC_ACTION,
+                    payload={"action_type": "idle", "npc_id": f"npc:{i}"},
+                    created_at=1.0,
+                )
+            )
+        t0 = time.perf_counter()
+        bus.pre_tick()
+        bus.on_tick()
+        bus.post_tick()
+        elapsed += time.perf_counter() - t0
+    return elapsed / ticks * 1000.0
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--ticks", type=int, default=50)
+    p.add_argument("--actions", type=int, default=100, help="NPC_ACTION events per tick")
+    p.add_argument("--backlog", type=int, nargs="+", default=[0, 10_000, 100_000])
+    args = p.parse_args()
+
+    print(f"{'backlog':>10} {'flat list ms/tick':>18} {'per-type ms/tick':>17}")
+    for backlog in args.backlog:
+        flat = run(backlog, args.ticks, args.actions, _FlatListBus)
+        indexed = run(backlog, args.ticks, args.actions, InMemoryEventBus)
+        print(f"{backlog:>10} {flat:>18.3f} {indexed:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark encode/decode throughput of the event payload codecs.
+
+Encodes and decodes 100k NPC_ACTION-shaped payloads with every available codec
+(see aitown.helpers.codec_helper) and reports events/sec and encoded size.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/bench_payload_codec.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from aitown.helpers.codec_helper import CODECS
+
+
+def _payloads(n: int) -> list:
+    kinds = ["move", "eat", "sleep", "work", "buy", "sell", "idle"]
+    return [
+        {
+            "action_type": kinds[i % len(kinds)],
+            "npc_id": f"npc:{i % 500}",
+            "place_id": "place:market",
+            "item_id": "item_bread",
+            "item_amount": i % 5 + 1,
+            "duration_hours": i % 8,
+        }
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--events", type=int, default=100_000)
+    args = p.parse_args()
+
+    payloads = _payloads(args.events)
+    print(f"{'codec':>8} {'encode ev/s':>12} {'decode ev/s':>12} {'avg bytes':>10}")
+    for name, codec in CODECS.items():
+        t0 = time.perf_counter()
+        encoded = [codec.encode(p) for p in payloads]
+        t1 = time.perf_counter()
+        for data in encoded:
+            codec.decode(data)
+        t2 = time.perf_counter()
+        size = sum(len(d) for d in encoded) / len(encoded)
+        print(
+            f"{name:>8} {args.events / (t1 - t0):>12,.0f} {args.events / (t2 - t1):>12,.0f} {size:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -53,6 +53,7 @@ CREATE TABLE IF NOT EXISTS npc (
   energy INTEGER DEFAULT 100,
   mood INTEGER DEFAULT 100,
   inventory TEXT DEFAULT '{}',
+  balance INTEGER DEFAULT 0,
   long_memory TEXT,
   is_dead INTEGER DEFAULT 0,
   created_at REAL,
@@ -71,13 +72,42 @@ CREATE TABLE IF NOT EXISTS memory_entry (
 
 CREATE TABLE IF NOT EXISTS event (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
+  npc_id TEXT,
   event_type TEXT,
   payload TEXT,
+  payload_codec TEXT DEFAULT 'json',
   created_at REAL,
   processed INTEGER DEFAULT 0,
   processed_at REAL
 );
 
+-- append-only record of purchases, sales and wages; value is in bronze,
+-- positive when credited to the NPC
+CREATE TABLE IF NOT EXISTS ledger_entry (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  npc_id TEXT,
+  place_id TEXT NOT NULL DEFAULT '',
+  item_id TEXT NOT NULL DEFAULT '',
+  amount INTEGER DEFAULT 0,
+  value INTEGER NOT NULL,
+  tick INTEGER,
+  day INTEGER,
+  created_at REAL
+);
+
+-- per-day totals of ledger_entry, maintained on every ledger flush
+CREATE TABLE IF NOT EXISTS ledger_daily (
+  day INTEGER NOT NULL,
+  kind TEXT NOT NULL,
+  place_id TEXT NOT NULL DEFAULT '',
+  item_id TEXT NOT NULL DEFAULT '',
+  entries INTEGER DEFAULT 0,
+  amount INTEGER DEFAULT 0,
+  value INTEGER DEFAULT 0,
+  PRIMARY KEY (day, kind, place_id, item_id)
+);
+
 CREATE TABLE IF NOT EXISTS town (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   name TEXT NOT NULL,
@@ -88,4 +118,12 @@ CREATE TABLE IF NOT EXISTS town (
 
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_npc_player ON npc(player_id);
-CREATE INDEX IF NOT EXISTS idx_npc_location ON npc(location_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_npc_location ON npc(location_id);
+-- only the live backlog is indexed for get_unprocessed
+CREATE INDEX IF NOT EXISTS idx_event_unprocessed ON event(id) WHERE processed = 0;
+-- compaction scans processed rows by age
+CREATE INDEX IF NOT EXISTS idx_event_processed_at ON event(processed_at) WHERE processed = 1;
+CREATE INDEX IF NOT EXISTS idx_ledger_npc ON ledger_entry(npc_id, tick);
+CREATE INDEX IF NOT EXISTS idx_ledger_place ON ledger_entry(place_id, tick);
+CREATE INDEX IF NOT EXISTS idx_ledger_item ON ledger_entry(item_id, tick);
+CREATE INDEX IF NOT EXISTS idx_ledger_tick ON ledger_entry(tick);
\ No newline at end of file
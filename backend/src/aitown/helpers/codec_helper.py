@@ -0,0 +1,85 @@
+"""Payload codecs used to store event payloads.
+
+Each codec has a short name that is stored next to the encoded payload, so rows
+written with one codec stay readable after the configured default changes.
+
+- "json": stdlib json, always available.
+- "orjson": same JSON text, encoded/decoded with orjson when it is installed.
+- "msgpack": compact binary MessagePack, when msgpack is installed.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+from loguru import logger
+
+from aitown.helpers.config_helper import get_config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+Encoded = Union[str, bytes]
+
+
+class PayloadCodec(NamedTuple):
+    name: str
+    encode: Callable[[Any], Encoded]
+    decode: Callable[[Encoded], Any]
+
+
+CODECS: Dict[str, PayloadCodec] = {
+    "json": PayloadCodec("json", json.dumps, json.loads),
+}
+
+if orjson is not None:
+    CODECS["orjson"] = PayloadCodec(
+        "orjson", lambda obj: orjson.dumps(obj).decode("utf-8"), orjson.loads
+    )
+
+if msgpack is not None:
+    CODECS["msgpack"] = PayloadCodec(
+        "msgpack",
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+
+def get_codec(name: Optional[str] = None) -> PayloadCodec:
+    """Return the codec called `name`, or the configured default when None.
+
+    The default comes from `[repos].event_payload_codec`. An unknown or
+    unavailable codec falls back to "json" with a warning.
+    """
+    if name is None:
+        try:
+            name = get_config("repos").get("event_payload_codec", "json")
+        except (KeyError, FileNotFoundError):
+            name = "json"
+    codec = CODECS.get(name)
+    if codec is None:
+        logger.warning(f"payload codec {name!r} is not available, using json")
+        codec = CODECS["json"]
+    return codec
+
+
+def decode_payload(data: Optional[Encoded], codec_name: Optional[str]) -> Any:
+    """Decode a stored payload using the codec recorded for its row.
+
+    Rows written before codecs were recorded have no codec name and are JSON.
+    """
+    if data is None:
+        return {}
+    codec = CODECS.get(codec_name or "json")
+    if codec is None:
+        raise ValueError(f"payload codec {codec_name!r} is not installed")
+    return codec.decode(data)
@@ -1,8 +1,11 @@
 """Utility helpers for in-game currency operations.
 
-This module provides helpers to compute total coin value, split amounts into
-coin denominations, and deduct costs from an inventory preferring lower
-denominations first (to keep behavior consistent with existing tests).
+NPC money is an integer `balance` (in bronze, the smallest coin). Coins only
+exist when materialized for display (`materialize_coins`) or as legacy coin
+items in old inventories, which `fold_coins` converts into balance.
+
+The coin-inventory helpers (total value, splitting amounts into denominations,
+low-first deduction) are kept for those conversions.
 """
 
 COIN_VALUES = {
@@ -11,6 +14,9 @@ COIN_VALUES = {
     "item_silver_coin": 10,
     "item_bronze_coin": 1,
 }
+# denominations largest-first / smallest-first, sorted once
+_COINS_DESC = tuple(sorted(COIN_VALUES.items(), key=lambda x: -x[1]))
+_COINS_ASC = _COINS_DESC[::-1]
 
 
 def total_value(inventory: dict) -> int:
@@ -29,7 +35,7 @@ def split_amount_to_coins(amount: int) -> dict:
     """
     result = {}
     remaining = amount
-    for cid, val in sorted(COIN_VALUES.items(), key=lambda x: -x[1]):
+    for cid, val in _COINS_DESC:
         if remaining <= 0:
             result[cid] = 0
             continue
@@ -47,7 +53,7 @@ def deduct_cost_low_first(inventory: dict, cost: int) -> tuple[dict, bool]:
     inv = dict(inventory or {})
     remaining = cost
     # iterate from smallest to largest denomination
-    for cid, val in sorted(COIN_VALUES.items(), key=lambda x: x[1]):
+    for cid, val in _COINS_ASC:
         if cid not in inv or inv[cid] <= 0:
             continue
         needed = remaining // val
@@ -58,3 +64,19 @@ def deduct_cost_low_first(inventory: dict, cost: int) -> tuple[dict, bool]:
         remaining -= use * val
     success = remaining <= 0
     return inv, success
+
+
+def materialize_coins(balance: int) -> dict:
+    """Coins (largest-first) worth `balance`, without empty denominations."""
+    return {cid: cnt for cid, cnt in split_amount_to_coins(balance).items() if cnt}
+
+
+def fold_coins(inventory: dict) -> tuple[dict, int]:
+    """Remove coin items from `inventory`; returns (inventory without coins, their value).
+
+    The original inventory is returned as is when it holds no coins.
+    """
+    if not any(cid in inventory for cid in COIN_VALUES):
+        return inventory, 0
+    value = total_value(inventory)
+    return {k: v for k, v in inventory.items() if k not in COIN_VALUES}, value
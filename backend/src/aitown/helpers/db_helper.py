@@ -18,6 +18,24 @@ def _migration_path() -> Path:
     return PROJECT_ROOT / "migrations" / "0001_init.sql"
 
 
+# columns added to tables after their CREATE TABLE may already have been applied
+_ADDED_COLUMNS = (
+    ("event", "npc_id", "TEXT"),
+    ("event", "payload_codec", "TEXT DEFAULT 'json'"),
+    ("npc", "balance", "INTEGER DEFAULT 0"),
+)
+
+
+def _add_missing_columns(conn) -> None:
+    """Bring databases created by an older 0001_init.sql up to date."""
+    for table, column, decl in _ADDED_COLUMNS:
+        try:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        except sqlite3.OperationalError:
+            # duplicate column: the table already has it
+            pass
+
+
 def init_db(
     conn_or_path: Union[str, sqlite3.Connection], seed: bool = False
 ) -> sqlite3.Connection:
@@ -56,6 +74,7 @@ def init_db(
 
     sql = mig.read_text(encoding="utf-8")
     conn.executescript(sql)
+    _add_missing_columns(conn)
 
     if seed:
         now = time.time()
@@ -188,6 +207,7 @@ def load_db(db_path: str = None) -> sqlite3.Connection:
 
     sql = mig.read_text(encoding="utf-8")
     conn.executescript(sql)
+    _add_missing_columns(conn)
 
     # Wrap connections we created so that they are closed on GC to avoid
     # ResourceWarning in tests which don't explicitly close the connection.
@@ -223,6 +243,29 @@ def load_db(db_path: str = None) -> sqlite3.Connection:
     return _ConnProxy(conn)
 
 
+def scratch_db(db_path: str = None) -> sqlite3.Connection:
+    """In-memory copy of a database, for runs that must not touch it.
+
+    The file at db_path (default config.toml [repos].db_path) is only read. If it
+    does not exist, the copy is a freshly seeded database instead.
+
+    Returns:
+        sqlite3.Connection: the scratch connection, migrated like load_db's.
+    """
+    if db_path is None:
+        db_path = get_config("repos")["db_path"]
+
+    conn = sqlite3.connect(":memory:")
+    exists = Path(db_path).exists()
+    if exists:
+        source = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+    return init_db(conn, seed=not exists)
+
+
 def main():
     p = argparse.ArgumentParser(
         description="Initialize SQLite DB from migrations/0001_init.sql"
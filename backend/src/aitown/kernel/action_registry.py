@@ -0,0 +1,160 @@
+"""Registry of NPC actions: payload schemas, preconditions and state deltas.
+
+An action is declared with its rules (see `aitown.kernel.action_rules`):
+
+    ACTIONS.declare("eat", can_eat, eat, item_id=str, item_amount=int)
+
+The keyword arguments are the payload schema besides `npc_id`, which every action
+takes; they are also the parameter names of the rules and of the handler that
+ActionExecutor binds with the `action` decorator:
+
+    @staticmethod
+    @action("eat")
+    def eat(npc_id: str, item_id: str, item_amount: int) -> bool: ...
+
+With `ACTIONS.validate` as its `action_validator`, InMemoryEventBus checks
+NPC_ACTION payloads when they are published, so malformed actions are rejected
+before they reach a tick and the handler is called with the payload as is.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class InvalidAction(ValueError):
+    pass
+
+
+def _coerce(action: str, field: str, kind: type, value: Any) -> Any:
+    """int fields take positive integers (or digit strings), str fields strings or ints."""
+    if isinstance(value, bool):
+        raise InvalidAction(f"{action}: {field} must be {kind.__name__}, got {value!r}")
+    if kind is int:
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if not isinstance(value, int) or value <= 0:
+            raise InvalidAction(f"{action}: {field} must be a positive integer, got {value!r}")
+        return value
+    if isinstance(value, int):
+        return str(value)
+    if not isinstance(value, str) or not value:
+        raise InvalidAction(f"{action}: {field} must be a non-empty string, got {value!r}")
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class ActionSpec:
+    name: str
+    # (payload field, type), npc_id first
+    fields: Tuple[Tuple[str, type], ...]
+    # ActionExecutor entry point, called with `arguments(payload)`
+    handler: Optional[Callable[..., bool]] = None
+    # (ctx, npc, **params) -> None if the action can run, else why not; reads only
+    precondition: Optional[Callable[..., Optional[str]]] = None
+    # (ctx, npc, **params) -> memory line; applies the action to npc and ctx
+    delta: Optional[Callable[..., str]] = None
+
+    def validate(self, payload: dict) -> dict:
+        """Normalized copy of `payload`; raises InvalidAction."""
+        out = dict(payload)
+        for field, kind in self.fields:
+            if payload.get(field) is None:
+                raise InvalidAction(f"{self.name}: missing {field}")
+            out[field] = _coerce(self.name, field, kind, payload[field])
+        return out
+
+    def arguments(self, payload: dict) -> Dict[str, Any]:
+        """Handler keyword arguments taken from a (validated) payload."""
+        return {field: payload[field] for field, _ in self.fields}
+
+    def params(self, payload: dict) -> Dict[str, Any]:
+        """Rule keyword arguments: the handler arguments minus npc_id."""
+        return {field: payload[field] for field, _ in self.fields[1:]}
+
+    def check(self, ctx, npc, params: Dict[str, Any]) -> Optional[str]:
+        return None if self.precondition is None else self.precondition(ctx, npc, **params)
+
+    def apply(self, ctx, npc, params: Dict[str, Any]) -> str:
+        return self.delta(ctx, npc, **params)
+
+
+class ActionRegistry:
+    def __init__(self):
+        self.specs: Dict[str, ActionSpec] = {}
+
+    def register(self, spec: ActionSpec) -> None:
+        self.specs[spec.name] = spec
+
+    def declare(
+        self,
+        name: str,
+        precondition: Optional[Callable[..., Optional[str]]],
+        delta: Callable[..., str],
+        **fields: type,
+    ) -> ActionSpec:
+        """Register action `name` by its payload schema and rules."""
+        spec = ActionSpec(name, (("npc_id", str), *fields.items()), None, precondition, delta)
+        self.register(spec)
+        return spec
+
+    def get(self, name: Optional[str]) -> Optional[ActionSpec]:
+        return self.specs.get(name)
+
+    def validate(self, payload: Any) -> dict:
+        """Validate an NPC_ACTION payload against its action's schema.
+
+        Payloads without an `action_type` are not registry actions (ActionExecutor
+        ignores them) and are passed through for custom subscribers.
+        """
+        if not isinstance(payload, dict):
+            raise InvalidAction(f"payload must be an object, got {type(payload).__name__}")
+        if "action_type" not in payload:
+            return payload
+        spec = self.specs.get(payload.get("action_type"))
+        if spec is None:
+            raise InvalidAction(f"unknown action_type {payload.get('action_type')!r}")
+        return spec.validate(payload)
+
+    def validator(self, context, load_npc: Callable[[str], Any]) -> Callable[[Any], dict]:
+        """`validate` plus the action's precondition against the NPC's current state.
+
+        The action runs at the start of the next tick, so shops are seen restocked;
+        the precondition is checked again then. Actions of NPCs `load_npc` cannot
+        provide (None) are rejected.
+        """
+        view = context.restocked()
+
+        def validate(payload: Any) -> dict:
+            payload = self.validate(payload)
+            spec = self.specs.get(payload.get("action_type"))
+            if spec is None:
+                return payload
+            npc = load_npc(payload["npc_id"])
+            if npc is None:
+                raise InvalidAction(f"{spec.name}: unknown npc {payload['npc_id']}")
+            if spec.precondition is None:
+                return payload
+            try:
+                reason = spec.check(view, npc, spec.params(payload))
+            except (AttributeError, KeyError, TypeError) as e:
+                raise InvalidAction(f"{spec.name}: {e}") from e
+            if reason is not None:
+                raise InvalidAction(f"{spec.name}: {reason}")
+            return payload
+
+        return validate
+
+
+ACTIONS = ActionRegistry()
+
+
+def action(name: str) -> Callable[[Callable[..., bool]], Callable[..., bool]]:
+    """Bind the decorated function as the handler of the declared action `name`."""
+
+    def register(handler: Callable[..., bool]) -> Callable[..., bool]:
+        ACTIONS.register(replace(ACTIONS.specs[name], handler=handler))
+        return handler
+
+    return register
@@ -0,0 +1,297 @@
+"""State rules of the NPC actions.
+
+Every action is declared by a precondition and a delta over an NPC's state: any
+object with the `STATE_COLUMNS` attributes plus `id` and `name`, e.g. the NPC
+model or the batch executor's NpcState.
+
+- `precondition(ctx, npc, **params)` returns None if the action can run, else why
+  it cannot. It only reads, so it can also be checked when the action is published.
+- `delta(ctx, npc, **params)` applies the action to `npc` and `ctx` and returns the
+  memory line to record.
+
+ActionExecutor (one event at a time) and BatchActionExecutor (a whole tick) both
+run these rules and only differ in how they load and write the NPC rows.
+
+Shop stock is what a place's `shop_inventory` lists. Purchases draw it down in
+event order within a tick, and shops are restocked when the next tick begins
+(`ActionContext.begin_tick`).
+"""
+
+from __future__ import annotations
+
+import copy
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from aitown.helpers.currency_helper import fold_coins
+from aitown.kernel.action_registry import ACTIONS
+from aitown.kernel.activity_scheduler import ActivityScheduler
+from aitown.kernel.road_graph import RoutePlanner
+from aitown.models.effect_model import apply_effect_deltas, compile_effect_deltas
+from aitown.repos.item_repo import ItemType
+from aitown.repos.ledger import LedgerKind
+from aitown.repos.npc_repo import NPCStatus
+from aitown.repos.place_repo import PlaceTag
+
+# npc columns the rules may change
+STATE_COLUMNS = ("location_id", "status", "hunger", "energy", "mood", "balance", "inventory")
+
+_MISSING = object()
+
+
+class ActionContext:
+    """Everything besides the NPC that the rules read and change.
+
+    Route, activity and stock changes made through the context are logged, so an
+    executor whose write fails can `rollback` to a `savepoint`; ledger records are
+    handed to the ledger only on `commit`.
+
+    Args:
+        catalog: static items/places/roads.
+        routes: move_to route planner.
+        activities: sleep/work scheduler.
+        ledger: transaction ledger; None records nothing.
+        clock: timestamp source for ledger and memory entries; SimClock swaps in
+            its virtual clock in headless mode.
+    """
+
+    def __init__(self, catalog, routes=None, activities=None, ledger=None, clock=None):
+        self.catalog = catalog
+        self.routes: RoutePlanner = routes or RoutePlanner(catalog)
+        self.activities: ActivityScheduler = activities or ActivityScheduler()
+        self.ledger = ledger
+        self.clock: Callable[[], float] = clock or time.time
+        # (place_id, item_id) -> shop stock left in the current tick
+        self.stock: Dict[Tuple[str, str], int] = {}
+        # (mapping, key, previous value) of every logged change since the last commit
+        self._undo: List[Tuple[dict, str, Any]] = []
+        # Ledger.record arguments since the last commit
+        self._records: List[tuple] = []
+        # ids of npc rows the executors wrote; SimClock hands them to NpcStateStore.invalidate
+        self.written: Set[str] = set()
+
+    def begin_tick(self) -> None:
+        """Restock the shops."""
+        self.commit()
+        self.stock = {}
+
+    def restocked(self) -> "ActionContext":
+        """Read-only view with full shops, for checking actions that run next tick."""
+        return ActionContext(self.catalog, self.routes, self.activities, clock=self.clock)
+
+    def stock_left(self, place_id, item_id) -> int:
+        key = (str(place_id), str(item_id))
+        if key in self.stock:
+            return self.stock[key]
+        place = self.catalog.place(place_id)
+        stock = place.shop_inventory if place is not None else None
+        return stock.get(str(item_id), 0) if isinstance(stock, Mapping) else 0
+
+    def _log(self, mapping: dict, key) -> None:
+        previous = mapping.get(key, _MISSING)
+        self._undo.append((mapping, key, previous if previous is _MISSING else copy.copy(previous)))
+
+    def take_stock(self, place_id, item_id, amount: int) -> None:
+        left = self.stock_left(place_id, item_id)
+        key = (str(place_id), str(item_id))
+        self._log(self.stock, key)
+        self.stock[key] = left - amount
+
+    def plan_route(self, npc_id, from_place, to_place) -> Optional[List[str]]:
+        self._log(self.routes.routes, str(npc_id))
+        return self.routes.plan(npc_id, from_place, to_place)
+
+    def next_hop(self, npc_id) -> Optional[str]:
+        self._log(self.routes.routes, str(npc_id))
+        return self.routes.next_hop(npc_id)
+
+    def settle_route(self, npc_id) -> None:
+        self._log(self.routes.routes, str(npc_id))
+        self.routes.settle(npc_id)
+
+    def cancel_route(self, npc_id) -> None:
+        self._log(self.routes.routes, str(npc_id))
+        self.routes.cancel(npc_id)
+
+    def start_activity(self, npc_id, activity: str, ticks: int) -> None:
+        self._log(self.activities.activities, str(npc_id))
+        self.activities.start(npc_id, activity, ticks)
+
+    def record(self, kind: str, npc_id, value: int, place_id=None, item_id=None, amount: int = 0) -> None:
+        self._records.append((kind, npc_id, value, place_id, item_id, amount, self.clock()))
+
+    def savepoint(self) -> Tuple[int, int]:
+        return len(self._undo), len(self._records)
+
+    def rollback(self, mark: Tuple[int, int] = (0, 0)) -> None:
+        """Undo the changes logged since `mark` (default: since the last commit)."""
+        undo_len, records_len = mark
+        while len(self._undo) > undo_len:
+            mapping, key, previous = self._undo.pop()
+            if previous is _MISSING:
+                mapping.pop(key, None)
+            else:
+                mapping[key] = previous
+        del self._records[records_len:]
+
+    def commit(self) -> int:
+        """Keep the logged changes and hand the records to the ledger; returns their number."""
+        records, self._records, self._undo = self._records, [], []
+        if self.ledger is not None:
+            for record in records:
+                self.ledger.record(*record)
+        return len(records)
+
+
+def fold_legacy_coins(npc) -> None:
+    """Coin items of old saves are money, not goods: fold them into the balance."""
+    inventory, legacy_coins = fold_coins(npc.inventory)
+    if legacy_coins:
+        npc.inventory = inventory
+        npc.balance += legacy_coins
+
+
+def _name(ctx: ActionContext, place_id) -> str:
+    place = ctx.catalog.place(place_id)
+    return place.name if place is not None else str(place_id)
+
+
+def can_move(ctx: ActionContext, npc, place_id: str) -> Optional[str]:
+    if not ctx.routes.graph.connected(npc.location_id, place_id):
+        return f"{npc.name} 想从 {_name(ctx, npc.location_id)} 移动到 {_name(ctx, place_id)}，但无路可走"
+    return None
+
+
+def move(ctx: ActionContext, npc, place_id: str) -> str:
+    from_place = ctx.catalog.place(npc.location_id)
+    to_place = ctx.catalog.place(place_id)
+    npc.location_id = place_id
+    return f"{npc.name} 从 {from_place.name} 移动到 {to_place.name}"
+
+
+def can_move_to(ctx: ActionContext, npc, place_id: str) -> Optional[str]:
+    if ctx.routes.graph.shortest_path(npc.location_id, place_id) is None:
+        return f"{npc.name} 想去 {_name(ctx, place_id)}，但无路可走"
+    return None
+
+
+def move_to(ctx: ActionContext, npc, place_id: str) -> str:
+    """Plan the route and take its first hop; the rest is moved by `routes.advance`."""
+    if not ctx.plan_route(npc.id, npc.location_id, place_id):
+        # already there
+        return ""
+    return move(ctx, npc, ctx.next_hop(npc.id))
+
+
+def can_eat(ctx: ActionContext, npc, item_id: str, item_amount: int) -> Optional[str]:
+    item = ctx.catalog.item(item_id)
+    if item is None or npc.inventory.get(item_id, 0) < item_amount or item.type != ItemType.CONSUMABLE:
+        name = item.name if item is not None else item_id
+        return f"{npc.name} 想吃 {name} x{item_amount}，这显然是在做梦"
+    return None
+
+
+def eat(ctx: ActionContext, npc, item_id: str, item_amount: int) -> str:
+    item = ctx.catalog.item(item_id)
+    # all effects of the item, times the amount, clamped once
+    apply_effect_deltas(npc, compile_effect_deltas(ctx.catalog.effects_of(item), item_amount))
+    npc.inventory[item_id] -= item_amount
+    if npc.inventory[item_id] <= 0:
+        del npc.inventory[item_id]
+    return f"{npc.name} 吃了 {item.name} x{item_amount}"
+
+
+def sleep(ctx: ActionContext, npc, duration_hours: int) -> str:
+    """Recover energy and mood (more at a HOUSE); the NPC sleeps for the whole duration."""
+    place = ctx.catalog.place(npc.location_id)
+    energy, mood = 10 * duration_hours, 5 * duration_hours
+    if PlaceTag.HOUSE in place.tags:
+        energy, mood = energy * 1.2, mood * 1.2
+        msg = f"{npc.name} 在 {place.name} 美美地睡了一觉"
+    else:
+        msg = f"{npc.name} 在 {place.name} 睡了一觉"
+    npc.energy = min(npc.energy + int(energy), 100)
+    npc.mood = min(npc.mood + int(mood), 100)
+    npc.status = NPCStatus.SLEEPING
+    ctx.start_activity(npc.id, "sleep", duration_hours)
+    return msg
+
+
+def can_work(ctx: ActionContext, npc, duration_hours: int) -> Optional[str]:
+    place = ctx.catalog.place(npc.location_id)
+    if PlaceTag.WORKABLE not in place.tags:
+        return f"{npc.name} 想在 {place.name} 工作 {duration_hours} 小时，可惜这里没有工作岗位"
+    if npc.energy < 10 * duration_hours or npc.mood < 5 * duration_hours:
+        return f"{npc.name} 想在 {place.name} 工作 {duration_hours} 小时，但精力或心情不足"
+    return None
+
+
+def work(ctx: ActionContext, npc, duration_hours: int) -> str:
+    """Spend energy and mood at a WORKABLE place to earn 20 bronze per hour."""
+    place = ctx.catalog.place(npc.location_id)
+    earned = 20 * duration_hours
+    npc.balance += earned
+    npc.energy = max(npc.energy - 10 * duration_hours, 0)
+    npc.mood = max(npc.mood - 5 * duration_hours, 0)
+    npc.status = NPCStatus.WORKING
+    ctx.start_activity(npc.id, "work", duration_hours)
+    ctx.record(LedgerKind.WAGE, npc.id, earned, place_id=npc.location_id, amount=duration_hours)
+    return f"{npc.name} 在 {place.name} 开始了 {duration_hours} 小时的工作，预计赚取 {earned} 金币"
+
+
+def can_buy(ctx: ActionContext, npc, item_id: str, item_amount: int) -> Optional[str]:
+    item = ctx.catalog.item(item_id)
+    name = item.name if item is not None else item_id
+    if item is None or ctx.stock_left(npc.location_id, item_id) < item_amount:
+        return f"{npc.name} 想买 {name} x{item_amount}，但 {_name(ctx, npc.location_id)} 没有足够的库存"
+    if npc.balance < item.value * item_amount:
+        return f"{npc.name} 想买 {name} x{item_amount}，但没有足够的金币"
+    return None
+
+
+def buy(ctx: ActionContext, npc, item_id: str, item_amount: int) -> str:
+    item = ctx.catalog.item(item_id)
+    cost = item.value * item_amount
+    npc.balance -= cost
+    npc.inventory[item_id] = npc.inventory.get(item_id, 0) + item_amount
+    ctx.take_stock(npc.location_id, item_id, item_amount)
+    ctx.record(LedgerKind.PURCHASE, npc.id, -cost, place_id=npc.location_id, item_id=item_id, amount=item_amount)
+    return f"{npc.name} 在 {_name(ctx, npc.location_id)} 买了 {item.name} x{item_amount}"
+
+
+def can_sell(ctx: ActionContext, npc, item_id: str, item_amount: int) -> Optional[str]:
+    item = ctx.catalog.item(item_id)
+    place = ctx.catalog.place(npc.location_id)
+    name = item.name if item is not None else item_id
+    if PlaceTag.SHOP not in place.tags:
+        return f"{npc.name} 想卖 {name} x{item_amount}，但 {place.name} 不是商店"
+    if item is None or npc.inventory.get(item_id, 0) < item_amount:
+        return f"{npc.name} 想卖 {name} x{item_amount}，但没有足够的库存"
+    return None
+
+
+def sell(ctx: ActionContext, npc, item_id: str, item_amount: int) -> str:
+    item = ctx.catalog.item(item_id)
+    earned = item.value * item_amount
+    npc.inventory[item_id] -= item_amount
+    npc.balance += earned
+    ctx.record(LedgerKind.SALE, npc.id, earned, place_id=npc.location_id, item_id=item_id, amount=item_amount)
+    return f"{npc.name} 在 {_name(ctx, npc.location_id)} 卖了 {item.name} x{item_amount}，赚了 {earned}"
+
+
+def idle(ctx: ActionContext, npc) -> str:
+    """Small mood gain and energy loss; also what a failed action turns into."""
+    npc.mood = min(npc.mood + 10, 100)
+    npc.energy = max(npc.energy - 5, 0)
+    return f"{npc.name} 在 {_name(ctx, npc.location_id)} 放松了一下， 心情变好了"
+
+
+ACTIONS.declare("move", can_move, move, place_id=str)
+ACTIONS.declare("move_to", can_move_to, move_to, place_id=str)
+ACTIONS.declare("eat", can_eat, eat, item_id=str, item_amount=int)
+ACTIONS.declare("sleep", None, sleep, duration_hours=int)
+ACTIONS.declare("work", can_work, work, duration_hours=int)
+ACTIONS.declare("buy", can_buy, buy, item_id=str, item_amount=int)
+ACTIONS.declare("sell", can_sell, sell, item_id=str, item_amount=int)
+ACTIONS.declare("idle", None, idle)
@@ -0,0 +1,69 @@
+"""Per-NPC multi-tick activities.
+
+`sleep` and `work` last `duration_hours` ticks (one tick is one simulated hour).
+The action itself is executed in the tick it was decided; the scheduler then
+keeps the NPC busy for the rest of the duration, and SimClock's busy check makes
+the NPC_DECISION fan-out skip it, so a "sleep 8h" costs one LLM call instead of
+eight. `tick()` is called once at the start of every tick and returns the
+activities that ended, so the NPC's status can be reset before it decides again.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class ActivityScheduler:
+    def __init__(self):
+        # ticks started so far
+        self.tick_count = 0
+        # npc_id -> (activity, tick at which the NPC decides again)
+        self.activities: Dict[str, Tuple[str, int]] = {}
+
+    def start(self, npc_id, activity: str, ticks: int) -> None:
+        """Hold the NPC busy for `ticks` ticks, counting the current one."""
+        if ticks <= 1:
+            self.activities.pop(str(npc_id), None)
+            return
+        self.activities[str(npc_id)] = (activity, self.tick_count + ticks - 1)
+
+    def resume(self, activities: Iterable[Tuple[str, str]]) -> int:
+        """Re-register (npc_id, activity) pairs read from stored NPC statuses.
+
+        Their remaining duration is not stored, so they end when the next tick
+        starts, which resets the NPC's status before it decides again. NPCs that
+        are already scheduled are left alone. Returns the number re-registered.
+        """
+        resumed = 0
+        for npc_id, activity in activities:
+            if not self.is_busy(npc_id):
+                self.activities[str(npc_id)] = (activity, self.tick_count + 1)
+                resumed += 1
+        return resumed
+
+    def tick(self) -> List[Tuple[str, str]]:
+        """Advance one tick; returns (npc_id, activity) of activities that ended."""
+        self.tick_count += 1
+        finished = [
+            (npc_id, activity)
+            for npc_id, (activity, until) in self.activities.items()
+            if until <= self.tick_count
+        ]
+        for npc_id, _ in finished:
+            del self.activities[npc_id]
+        return finished
+
+    def activity(self, npc_id) -> Optional[str]:
+        entry = self.activities.get(str(npc_id))
+        return entry[0] if entry else None
+
+    def remaining(self, npc_id) -> int:
+        """Ticks until the NPC decides again (0 if idle)."""
+        entry = self.activities.get(str(npc_id))
+        return entry[1] - self.tick_count if entry else 0
+
+    def is_busy(self, npc_id) -> bool:
+        return str(npc_id) in self.activities
+
+    def cancel(self, npc_id) -> None:
+        self.activities.pop(str(npc_id), None)
@@ -0,0 +1,179 @@
+"""asyncio flavour of the in-memory event bus.
+
+`AsyncEventBus` keeps the publish/subscribe surface of `InMemoryEventBus` but its
+tick phases are coroutines, so `SimClock` can await them. NPC_DECISION is
+dispatched to all subscribers concurrently (bounded by a semaphore) instead of
+one after another on the clock thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import threading
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+from aitown.kernel.decision_deadline import (
+    DecisionCall,
+    DecisionProxy,
+    DeferredPolicy,
+    fallback_action,
+)
+from aitown.kernel.event_bus import EventType, InMemoryEventBus, cfg_kernel
+from aitown.kernel.profiler import PROFILER
+from aitown.repos.event_repo import Event
+
+
+class AsyncEventBus(InMemoryEventBus):
+    """Event bus whose tick phases are coroutines.
+
+    Subscribers may be plain callables or coroutine functions. Coroutine
+    subscribers run on the event loop; plain callables are moved to a worker
+    thread so a blocking LLM call does not stall the loop.
+
+    Args:
+        durability, capacity, overflow_policy, action_coalescing: see InMemoryEventBus.
+        concurrency: max NPC_DECISION subscribers running at once
+            (default `[kernel].decision_concurrency`).
+        decision_deadline_seconds: per-tick budget for the NPC_DECISION fan-out;
+            subscribers still running afterwards are cancelled. 0 disables the
+            deadline (default `[kernel].decision_deadline_seconds`). Cancelled
+            coroutine decisions are asked again next tick. A worker thread cannot
+            be cancelled, so its subscriber is skipped until the thread returns.
+            With an "idle" or "repeat" `deferred_policy` a fallback action is
+            published for the NPC meanwhile.
+    """
+
+    def __init__(
+        self,
+        durability: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        decision_deadline_seconds: Optional[float] = None,
+        capacity: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        action_coalescing: Optional[str] = None,
+    ):
+        super().__init__(
+            durability,
+            capacity,
+            overflow_policy,
+            action_coalescing,
+            decision_deadline_seconds=decision_deadline_seconds,
+        )
+        self.concurrency: int = concurrency or cfg_kernel.get("decision_concurrency", 16)
+        # number of NPC_DECISION subscribers cancelled at the deadline of the last tick
+        self.timed_out: int = 0
+        # plain-callable subscribers whose worker thread is still running
+        self._threads: Dict[Callable, DecisionCall] = {}
+        self._threads_lock = threading.Lock()
+
+    async def _dispatch(self, call: DecisionCall, arg) -> None:
+        cb = call.cb
+        with PROFILER.measure("subscriber", cb):
+            if inspect.iscoroutinefunction(cb):
+                await cb(DecisionProxy(self, call), arg)
+            else:
+                # a worker thread cannot be cancelled; if it misses the deadline its
+                # publish lands in a later tick and the subscriber is skipped until then
+                await asyncio.to_thread(self._run_thread, call, arg)
+
+    def _run_thread(self, call: DecisionCall, arg) -> None:
+        with self._threads_lock:
+            self._threads[call.cb] = call
+        try:
+            call.cb(DecisionProxy(self, call), arg)
+        finally:
+            with self._threads_lock:
+                self._threads.pop(call.cb, None)
+
+    async def pre_tick(self) -> None:
+        self.coalesce_actions()
+        queue = self.queues.get(EventType.NPC_ACTION)
+        if not queue:
+            return
+        callbacks = self.dispatch.get(EventType.NPC_ACTION)
+        batch_callbacks = self.dispatch.batch(EventType.NPC_ACTION)
+        self._dispatch_thread = threading.get_ident()
+        events = self._take(queue)
+        try:
+            # actions mutate shared state, so they are still applied one at a time
+            for evt in events:
+                for cb in callbacks:
+                    with PROFILER.measure("subscriber", cb):
+                        result = cb(self, evt)
+                        if inspect.isawaitable(result):
+                            await result
+            for cb in batch_callbacks:
+                with PROFILER.measure("subscriber", cb):
+                    result = cb(self, events)
+                    if inspect.isawaitable(result):
+                        await result
+        finally:
+            self._dispatch_thread = None
+            self._settle(events, queue)
+
+    async def on_tick(self) -> None:
+        super().on_tick()
+
+    async def post_tick(self) -> None:
+        evt = Event(event_type=EventType.NPC_DECISION, created_at=self.clock())
+        # batch subscribers are dispatched like the others, with a one-event list
+        callbacks = [(cb, evt) for cb in self._decision_callbacks()]
+        callbacks += [(cb, [evt]) for cb in self.dispatch.batch(EventType.NPC_DECISION)]
+        with self._threads_lock:
+            # still deciding on a worker thread since an earlier tick
+            busy = sum(len(self._threads[cb].npc_ids) for cb, _ in callbacks if cb in self._threads)
+            callbacks = [(cb, arg) for cb, arg in callbacks if cb not in self._threads]
+        self.timed_out = 0
+        self.deferred = busy
+        self.counters["deferred"] += busy
+        # coroutine subscribers publish from the loop thread, which must never block
+        self._dispatch_thread = threading.get_ident()
+        try:
+            await self._decide(callbacks)
+        finally:
+            self._dispatch_thread = None
+        self.flush()
+
+    async def _decide(self, callbacks) -> None:
+        if callbacks:
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def run(call, arg):
+                async with semaphore:
+                    await self._dispatch(call, arg)
+
+            calls = [DecisionCall(cb) for cb, _ in callbacks]
+            tasks = [asyncio.ensure_future(run(call, arg)) for call, (_, arg) in zip(calls, callbacks)]
+            done, pending = await asyncio.wait(
+                tasks, timeout=self.decision_deadline_seconds or None
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                self.timed_out = len(pending)
+                for task, call in zip(tasks, calls):
+                    if task not in pending:
+                        continue
+                    # a batch decider falls back for every NPC it was deciding for
+                    npc_ids = call.npc_ids
+                    if self.deferred_policy != DeferredPolicy.CARRY:
+                        # a worker thread still running must not publish on top of the fallback
+                        call.abandon()
+                    self.deferred += len(npc_ids)
+                    self.counters["deferred"] += len(npc_ids)
+                    for npc_id in npc_ids:
+                        fallback = fallback_action(
+                            self.deferred_policy, npc_id, self._last_actions.get(npc_id)
+                        )
+                        if fallback is not None:
+                            self.publish(fallback)
+                logger.warning(
+                    f"{len(pending)} NPC decisions missed the {self.decision_deadline_seconds}s deadline"
+                )
+            for task in done:
+                if task.exception() is not None:
+                    logger.error(f"NPC decision subscriber failed: {task.exception()}")
@@ -0,0 +1,179 @@
+"""Batch execution of a tick's NPC_ACTION events.
+
+`BatchActionExecutor.execute` is an NPC_ACTION batch subscriber doing the work
+of ActionExecutor.event_listener for the whole tick at once: the NPCs involved
+are loaded with one `IN (...)` query, the registered action rules (see
+aitown.kernel.action_rules) are applied to in-memory state in event order, and
+the changed NPC rows and new memory entries are written back with `executemany`.
+
+Both executors run the same rules on the same ActionContext, so shop stock,
+routes and activities behave the same whichever one is enabled. If the batch
+cannot be written, the context is rolled back and the events stay pending for
+the next tick; ledger records are only handed over once the batch is written.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from aitown.helpers.currency_helper import fold_coins
+from aitown.kernel.action_registry import ACTIONS
+from aitown.kernel.action_rules import STATE_COLUMNS, ActionContext, idle
+from aitown.kernel.profiler import PROFILER
+from aitown.repos.event_repo import Event
+from aitown.repos.npc_repo import NPCStatus
+from aitown.repos.unit_of_work import UnitOfWork, savepoint
+
+# stay well below SQLite's host parameter limit
+MAX_IN_PARAMS = 500
+
+class NpcState:
+    """Mutable in-memory copy of the NPC columns actions touch."""
+
+    __slots__ = (
+        "id", "name", "location_id", "status", "hunger", "energy", "mood", "balance", "inventory"
+    )
+
+    def __init__(self, row: dict):
+        self.id = row["id"]
+        self.name = row.get("name")
+        self.location_id = row.get("location_id")
+        self.status = row.get("status") or NPCStatus.PEACEFUL
+        self.hunger = row.get("hunger", 100)
+        self.energy = row.get("energy", 100)
+        self.mood = row.get("mood", 100)
+        inventory = row.get("inventory") or {}
+        inventory = json.loads(inventory) if isinstance(inventory, str) else dict(inventory)
+        # coin items of old saves become balance
+        self.inventory, legacy_coins = fold_coins(inventory)
+        self.balance: int = (row.get("balance") or 0) + legacy_coins
+
+    def row(self, updated_at: float) -> tuple:
+        values = [getattr(self, c) for c in STATE_COLUMNS]
+        values[-1] = json.dumps(self.inventory)
+        return (*values, updated_at, self.id)
+
+
+def load_npc(conn, npc_id) -> Optional[NpcState]:
+    """One NPC as NpcState, or None if it does not exist or cannot be read."""
+    try:
+        row = conn.execute("SELECT * FROM npc WHERE id = ?", (npc_id,)).fetchone()
+    except sqlite3.Error as e:
+        logger.debug(f"cannot load npc {npc_id}: {e}")
+        return None
+    return NpcState(dict(row)) if row is not None else None
+
+
+class BatchActionExecutor:
+    """Validates and applies NPC_ACTION events in bulk.
+
+    Args:
+        conn: database connection (normally ActionExecutor.conn).
+        context: catalog, routes, activities, stock and ledger the rules work on
+            (normally ActionExecutor.context).
+    """
+
+    def __init__(self, conn, context: ActionContext):
+        self.conn = conn
+        self.context = context
+
+    def load_npcs(self, npc_ids: Iterable) -> Dict[str, NpcState]:
+        """Load NPC rows by id with chunked `IN (...)` queries, keyed by str(id)."""
+        ids = list(dict.fromkeys(npc_ids))
+        states: Dict[str, NpcState] = {}
+        cur = self.conn.cursor()
+        for start in range(0, len(ids), MAX_IN_PARAMS):
+            chunk = ids[start : start + MAX_IN_PARAMS]
+            marks = ", ".join("?" * len(chunk))
+            cur.execute(f"SELECT * FROM npc WHERE id IN ({marks})", chunk)
+            for row in cur.fetchall():
+                state = NpcState(dict(row))
+                states[str(state.id)] = state
+        return states
+
+    def execute(self, event_bus, events: List[Event]) -> int:
+        """Apply `events` in order; returns the number of events processed."""
+        actions = [evt for evt in events if not evt.processed]
+        if not actions:
+            return 0
+        with PROFILER.measure("action", "batch"):
+            try:
+                npcs = self.load_npcs(
+                    evt.payload.get("npc_id") for evt in actions if isinstance(evt.payload, dict)
+                )
+            except sqlite3.Error as e:
+                logger.error(f"Error loading NPCs for action batch: {e}")
+                return 0
+            mark = self.context.savepoint()
+            dirty: Dict[str, NpcState] = {}
+            memories: List[tuple] = []
+            now = self.context.clock()
+            for evt in actions:
+                if not isinstance(evt.payload, dict):
+                    # cannot be executed, now or later
+                    logger.error(f"malformed NPC_ACTION payload {evt.payload!r}")
+                    continue
+                npc = npcs.get(str(evt.payload.get("npc_id")))
+                if npc is None:
+                    logger.error(f"action {evt.payload.get('action_type')} for unknown npc {evt.payload.get('npc_id')}")
+                    continue
+                for msg in self._apply(npc, evt.payload):
+                    memories.append((npc.id, msg, now))
+                dirty[str(npc.id)] = npc
+            if not self._write(dirty.values(), memories, now):
+                # events stay pending and are retried next tick against the state before this batch
+                self.context.rollback(mark)
+                return 0
+            self.context.commit()
+        for evt in actions:
+            evt.processed = 1
+            evt.processed_at = now
+        return len(actions)
+
+    def _apply(self, npc: NpcState, payload: dict) -> List[str]:
+        """Run one action (idle if it fails); returns the memory lines to record."""
+        action_type = payload.get("action_type")
+        spec = ACTIONS.get(action_type)
+        if spec is None or spec.delta is None:
+            # unknown action types are ignored, as in ActionExecutor.event_listener
+            return []
+        ctx = self.context
+        mark = ctx.savepoint()
+        ok, msg = False, ""
+        try:
+            params = spec.params(spec.validate(payload))
+            if spec.check(ctx, npc, params) is None:
+                msg = spec.apply(ctx, npc, params)
+                ok = True
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            ctx.rollback(mark)
+            logger.error(f"invalid {action_type} action for npc {npc.id}: {e}")
+        if ok:
+            if action_type in ("move", "move_to"):
+                ctx.settle_route(npc.id)
+            return [msg] if msg else []
+        # a blocked hop ends the trip; the NPC decides again next tick
+        ctx.cancel_route(npc.id)
+        return [idle(ctx, npc)]
+
+    def _write(self, npcs: Iterable[NpcState], memories: List[tuple], now: float) -> bool:
+        placeholders = ", ".join(f"{c}=?" for c in STATE_COLUMNS)
+        npcs = list(npcs)
+        rows = [npc.row(now) for npc in npcs]
+        with UnitOfWork(self.conn), savepoint(self.conn) as sp:
+            try:
+                cur = self.conn.cursor()
+                cur.executemany(f"UPDATE npc SET {placeholders}, updated_at=? WHERE id = ?", rows)
+                cur.executemany(
+                    "INSERT INTO memory_entry (npc_id, content, created_at) VALUES (?, ?, ?)", memories
+                )
+            except sqlite3.Error as e:
+                sp.rollback()
+                logger.error(f"Error writing action batch: {e}")
+                return False
+        self.context.written.update(str(npc.id) for npc in npcs)
+        return True
@@ -0,0 +1,139 @@
+"""Helpers for the NPC_DECISION tick deadline.
+
+When `[kernel].decision_deadline_seconds` is set, the buses stop waiting for NPC
+decisions at the deadline. A decision that is not ready is *deferred*:
+
+- carry: keep it running and publish its actions when it finishes (next tick);
+- idle: give up on it and publish an idle action for the NPC instead;
+- repeat: give up on it and repeat the NPC's last executed action (idle if none).
+
+A batch subscriber decides for many NPCs in one call. The NPCs it covers are
+the ones it finds not busy through `npc_busy` on the bus it is handed, and a
+deferred batch call counts, and falls back, once per covered NPC.
+"""
+
+from __future__ import annotations
+
+import enum
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Set
+
+from aitown.repos.event_repo import Event
+
+
+class DeferredPolicy(enum.StrEnum):
+    CARRY = "carry"
+    IDLE = "idle"
+    REPEAT = "repeat"
+
+
+def subscriber_npc_id(cb: Callable) -> Optional[str]:
+    """NPC id of a per-NPC subscriber (a bound NPC method), or None."""
+    npc_id = getattr(getattr(cb, "__self__", None), "id", None)
+    return None if npc_id is None else str(npc_id)
+
+
+def fallback_action(
+    policy: DeferredPolicy, npc_id: Optional[str], last_payload: Optional[dict]
+) -> Optional[Event]:
+    """Cheap replacement action for a deferred decision, or None for CARRY."""
+    if policy == DeferredPolicy.CARRY or npc_id is None:
+        return None
+    if policy == DeferredPolicy.REPEAT and last_payload:
+        payload = dict(last_payload)
+    else:
+        payload = {"action_type": "idle", "npc_id": npc_id}
+    return Event(event_type="NPC_ACTION", payload=payload, npc_id=npc_id)
+
+
+class DecisionCall:
+    """One NPC_DECISION subscriber call running on a worker thread.
+
+    Events the subscriber publishes are collected in `outbox` and handed to the
+    real bus on the clock thread, in submission order, once the call is done.
+    An abandoned call's outbox is discarded.
+    """
+
+    def __init__(self, cb: Callable):
+        self.cb = cb
+        self.npc_id = subscriber_npc_id(cb)
+        self._covered: List[str] = [] if self.npc_id is None else [self.npc_id]
+        self._decided: Set[str] = set()
+        self.outbox: List[Event] = []
+        self.abandoned = False
+        self.future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def add(self, event: Event) -> None:
+        with self._lock:
+            if not self.abandoned:
+                self.outbox.append(event)
+
+    def abandon(self) -> None:
+        with self._lock:
+            self.abandoned = True
+            self.outbox = []
+
+    def take(self) -> List[Event]:
+        with self._lock:
+            events, self.outbox = self.outbox, []
+        return events
+
+    def cover(self, npc_id: str) -> None:
+        with self._lock:
+            if npc_id not in self._covered:
+                self._covered.append(npc_id)
+
+    def decided(self, npc_id: str) -> None:
+        with self._lock:
+            self._decided.add(npc_id)
+
+    @property
+    def npc_ids(self) -> List[Optional[str]]:
+        """NPCs this call decides for that have no published decision yet; [None] if it never said."""
+        with self._lock:
+            if not self._covered:
+                return [None]
+            return [npc_id for npc_id in self._covered if npc_id not in self._decided]
+
+
+class DecisionProxy:
+    """Bus stand-in passed to a deadline-bound subscriber.
+
+    Everything is forwarded to the bus; NPCs that `npc_busy` reports as free are
+    recorded as covered by the call, and NPCs it publishes for as decided. Once
+    the call is abandoned its publishes are dropped.
+    """
+
+    def __init__(self, bus: Any, call: DecisionCall):
+        self._bus = bus
+        self._call = call
+
+    def npc_busy(self, npc_id) -> bool:
+        busy = self._bus.npc_busy(npc_id)
+        if not busy and npc_id is not None:
+            self._call.cover(str(npc_id))
+        return busy
+
+    def publish(self, event: Event) -> bool:
+        if self._call.abandoned:
+            return False
+        if event.npc_id is not None:
+            self._call.decided(str(event.npc_id))
+        return self._bus.publish(event)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._bus, name)
+
+
+class DeferredPublisher(DecisionProxy):
+    """DecisionProxy whose `publish` goes to the call's outbox.
+
+    Whether the bus enqueues the event is only known once the call is finished,
+    so events it refuses then are reported to its `discard_listeners`.
+    """
+
+    def publish(self, event: Event) -> bool:
+        self._call.add(event)
+        return True
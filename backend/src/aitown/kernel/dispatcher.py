@@ -0,0 +1,62 @@
+"""Subscriber dispatch table for the event buses.
+
+Subscriptions change rarely (startup, NPC creation) while dispatch happens on every
+tick, so the table recompiles the subscriber list of an event type into a frozen
+tuple whenever it changes and the buses read that tuple once per phase.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Tuple
+
+Callback = Callable[..., object]
+
+_EMPTY: Tuple[Callback, ...] = ()
+
+
+class SubscriberTable:
+    """Per-event-type subscriber lists compiled into tuples.
+
+    Two kinds of subscribers are kept per type:
+
+    - event subscribers, called as `cb(bus, event)` once per event;
+    - batch subscribers, called as `cb(bus, events)` once per phase with the whole
+      list of events of that type (for NPC_DECISION a single-element list).
+    """
+
+    def __init__(self):
+        self._event: Dict[str, List[Callback]] = {}
+        self._batch: Dict[str, List[Callback]] = {}
+        # compiled views, rebuilt on every change
+        self.callbacks: Dict[str, Tuple[Callback, ...]] = {}
+        self.batch_callbacks: Dict[str, Tuple[Callback, ...]] = {}
+
+    def add(self, event_type: str, callback: Callback) -> None:
+        self._event.setdefault(event_type, []).append(callback)
+        self.callbacks[event_type] = tuple(self._event[event_type])
+
+    def add_batch(self, event_type: str, callback: Callback) -> None:
+        self._batch.setdefault(event_type, []).append(callback)
+        self.batch_callbacks[event_type] = tuple(self._batch[event_type])
+
+    def remove(self, event_type: str, callback: Callback) -> bool:
+        """Remove `callback` from either kind of subscriber. Returns True if found."""
+        for source, compiled in ((self._event, self.callbacks), (self._batch, self.batch_callbacks)):
+            subscribers = source.get(event_type)
+            if subscribers and callback in subscribers:
+                subscribers.remove(callback)
+                compiled[event_type] = tuple(subscribers)
+                return True
+        return False
+
+    def clear(self) -> None:
+        self._event.clear()
+        self._batch.clear()
+        self.callbacks = {}
+        self.batch_callbacks = {}
+
+    def get(self, event_type: str) -> Tuple[Callback, ...]:
+        return self.callbacks.get(event_type, _EMPTY)
+
+    def batch(self, event_type: str) -> Tuple[Callback, ...]:
+        return self.batch_callbacks.get(event_type, _EMPTY)
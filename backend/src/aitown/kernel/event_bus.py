@@ -1,72 +1,545 @@
 import enum
+import threading
 import time
-from datetime import datetime
-from typing import Callable, Dict, Iterator, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterator, List, Optional
 
+from loguru import logger
+
+from aitown.helpers.config_helper import get_config
+from aitown.kernel.decision_deadline import (
+    DecisionCall,
+    DeferredPolicy,
+    DeferredPublisher,
+    fallback_action,
+    subscriber_npc_id,
+)
+from aitown.kernel.dispatcher import SubscriberTable
+from aitown.kernel.profiler import PROFILER
+from aitown.models.event_model import DISCARDED
+from aitown.repos.event_journal import EventJournal
 from aitown.repos.event_repo import Event, EventRepository
 
+cfg_kernel = get_config("kernel")
+
 
 class EventType(enum.StrEnum):
     NPC_DECISION = "NPC_DECISION" # 由EVENT_BUS创建，NPC消费 (1 producer : n consumers)
     NPC_ACTION = "NPC_ACTION" # 由NPC创建，EVENT_BUS传递，ActionExecutor消费 (n producers : 1 consumer)
 
 
+class OverflowPolicy(enum.StrEnum):
+    BLOCK = "block"  # publishers wait for pre_tick to make room
+    DROP_OLDEST = "drop_oldest"  # drop the oldest pending action of the same NPC
+    COALESCE = "coalesce"  # replace the NPC's pending actions with the new one
+
+
+class ActionCoalescing(enum.StrEnum):
+    OFF = "off"  # execute every pending action
+    LATEST = "latest"  # execute only the newest pending action per NPC
+    MERGE = "merge"  # fold pending actions per NPC with `action_merger`
+
+
+def _npc_key(event: Event) -> Optional[str]:
+    return event.npc_id or event.payload.get("npc_id")
+
+
+def merge_action_payloads(events: List[Event]) -> dict:
+    """Default merger: overlay payloads oldest to newest, so newer keys win."""
+    merged: dict = {}
+    for evt in events:
+        merged.update(evt.payload)
+    return merged
+
+
 class InMemoryEventBus:
     """Minimal event bus used for tests and local wiring.
 
-    Stores published Event instances in a list and calls optional subscriber callbacks.
-    Also exposes a simple drain method to consume events by type.
+    Keeps one FIFO queue of pending events per event type plus a list of events
+    that were processed but not yet persisted, so draining a type costs
+    O(matching events) and clearing processed events costs O(processed).
+    Calls optional subscriber callbacks and exposes drain methods to consume
+    events by type.
+
+    Persistence goes through an EventJournal; `durability` ("event" or "tick",
+    default from `[kernel].event_durability`) selects whether every publish/mark
+    is committed immediately or buffered and flushed once per tick.
+
+    `capacity` (default `[kernel].event_capacity`, 0 = unbounded) caps the number
+    of pending events. When the bus is full `overflow_policy` decides what happens
+    (see OverflowPolicy); events dropped or coalesced away are marked processed and
+    counted in `counters`.
+
+    `action_coalescing` (default `[kernel].action_coalescing`) optionally collapses
+    several pending NPC_ACTION events of one NPC into one before pre_tick executes
+    them; see ActionCoalescing. `action_merger` turns the pending events of an NPC
+    (oldest first) into the payload that is executed in MERGE mode.
+
+    `decision_deadline_seconds` (default `[kernel].decision_deadline_seconds`, 0 =
+    wait for every decision) bounds the NPC_DECISION fan-out of post_tick. With a
+    deadline the subscribers run on a thread pool; those not done in time are
+    deferred according to `deferred_policy` (see DeferredPolicy) and counted in
+    `deferred` (last tick) and `counters["deferred"]`.
+
+    `action_validator`, when set, checks NPC_ACTION payloads in `publish`; rejected
+    events are never queued and are counted in `counters["rejected"]`.
     """
 
-    def __init__(self):
-        self.events: List[Event] = []
-        self.event_repo: EventRepository = EventRepository(None)
-        self.subscribers: Dict[str, List[Callable[[InMemoryEventBus,Event], None]]] = {}
+    def __init__(
+        self,
+        durability: Optional[str] = None,
+        capacity: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        action_coalescing: Optional[str] = None,
+        action_merger: Callable[[List[Event]], dict] = merge_action_payloads,
+        decision_deadline_seconds: Optional[float] = None,
+        deferred_policy: Optional[str] = None,
+    ):
+        self.queues: Dict[str, Deque[Event]] = {}
+        self.processed: List[Event] = []
+        self.capacity: int = (
+            cfg_kernel.get("event_capacity", 0) if capacity is None else capacity
+        )
+        self.overflow_policy = OverflowPolicy(
+            overflow_policy or cfg_kernel.get("overflow_policy", OverflowPolicy.BLOCK)
+        )
+        self.block_timeout_seconds: float = cfg_kernel.get(
+            "publish_block_timeout_seconds", 5.0
+        )
+        self.action_coalescing = ActionCoalescing(
+            action_coalescing or cfg_kernel.get("action_coalescing", ActionCoalescing.OFF)
+        )
+        self.action_merger = action_merger
+        self.counters: Dict[str, int] = {"dropped": 0, "coalesced": 0, "deferred": 0, "rejected": 0}
+        if decision_deadline_seconds is None:
+            decision_deadline_seconds = cfg_kernel.get("decision_deadline_seconds", 0.0)
+        self.decision_deadline_seconds: float = decision_deadline_seconds
+        self.deferred_policy = DeferredPolicy(
+            deferred_policy or cfg_kernel.get("deferred_decision_policy", DeferredPolicy.CARRY)
+        )
+        # NPC_DECISION subscribers that missed the deadline of the last tick
+        self.deferred: int = 0
+        # carried decision calls still running on the pool
+        self._inflight: List[DecisionCall] = []
+        self._decision_pool: Optional[ThreadPoolExecutor] = None
+        # last executed action payload per npc (for DeferredPolicy.REPEAT)
+        self._last_actions: Dict[str, dict] = {}
+        # NPC_ACTION payload check run by publish (SimClock sets ACTIONS.validate);
+        # returns the normalized payload or raises ValueError, which rejects the event
+        self.action_validator: Optional[Callable[[dict], dict]] = None
+        # predicates npc_id -> bool; NPCs any of them reports busy (e.g. travelling on
+        # a RoutePlanner route) are not asked for a decision in post_tick
+        self.busy_checks: List[Callable[[str], bool]] = []
+        # called with every NPC_ACTION that will never be executed: rejected or
+        # dropped when published, or dropped/coalesced away while queued
+        self.discard_listeners: List[Callable[[Event], None]] = []
+        self._pending: int = 0
+        # pending NPC_ACTION events per npc, oldest first
+        self._pending_actions: Dict[Optional[str], Deque[Event]] = {}
+        # npcs with more than one pending action since the last coalescing pass
+        self._bursty: set[Optional[str]] = set()
+        # events dropped/coalesced while still sitting in a queue; skipped lazily
+        self._discarded: set[int] = set()
+        self._dispatch_thread: Optional[int] = None
+        self.journal = EventJournal(
+            EventRepository(None),
+            mode=durability or cfg_kernel.get("event_durability", "tick"),
+            max_pending=cfg_kernel.get("event_flush_max_pending", 1000),
+            max_delay_seconds=cfg_kernel.get("event_flush_max_delay_seconds", 5.0),
+        )
+        self.dispatch = SubscriberTable()
+        # timestamp source; SimClock swaps in its virtual clock in headless mode
+        self.clock: Callable[[], float] = time.time
+        # subscribers may publish from worker threads (see AsyncEventBus)
+        self._publish_lock = threading.Lock()
+        self._space = threading.Condition(self._publish_lock)
+
+    @property
+    def subscribers(self) -> Dict[str, tuple]:
+        """Compiled per-event subscribers by event type (read-only view)."""
+        return self.dispatch.callbacks
+
+    @property
+    def event_repo(self) -> EventRepository:
+        return self.journal.event_repo
+
+    @event_repo.setter
+    def event_repo(self, event_repo: EventRepository) -> None:
+        self.journal.swap_repo(event_repo)
 
-    def publish(self, event: Event) -> None:
+    @property
+    def events(self) -> List[Event]:
+        """Flat view of every event held by the bus (pending and processed).
+
+        Built on demand; hot paths should use `queues`/`drainI` instead.
+        """
+        pending = [evt for queue in self.queues.values() for evt in self._live(queue)]
+        return pending + self.processed
+
+    @events.setter
+    def events(self, events: List[Event]) -> None:
+        self.queues = {}
+        self.processed = []
+        self._pending = 0
+        self._pending_actions = {}
+        self._bursty = set()
+        self._discarded = set()
+        for evt in events:
+            self._enqueue(evt)
+
+    @property
+    def pending(self) -> int:
+        """Number of queued events not yet processed."""
+        return self._pending
+
+    def _live(self, queue: Deque[Event]) -> Iterator[Event]:
+        for evt in queue:
+            if id(evt) not in self._discarded:
+                yield evt
+
+    def _enqueue(self, event: Event) -> None:
+        if event.processed:
+            self.processed.append(event)
+            return
+        queue = self.queues.get(event.event_type)
+        if queue is None:
+            queue = self.queues[event.event_type] = deque()
+        queue.append(event)
+        self._pending += 1
+        if event.event_type == EventType.NPC_ACTION:
+            key = _npc_key(event)
+            actions = self._pending_actions.setdefault(key, deque())
+            actions.append(event)
+            if len(actions) > 1:
+                self._bursty.add(key)
+
+    def _forget(self, event: Event) -> None:
+        """Remove a no-longer-pending action from the per-NPC index."""
+        if event.event_type != EventType.NPC_ACTION:
+            return
+        key = _npc_key(event)
+        actions = self._pending_actions.get(key)
+        if not actions:
+            return
+        if actions[0] is event:
+            actions.popleft()
+        else:
+            for i, evt in enumerate(actions):
+                if evt is event:
+                    del actions[i]
+                    break
+        if not actions:
+            del self._pending_actions[key]
+
+    def _discard(self, event: Event, counter: str) -> None:
+        """Retire a queued event without dispatching it (caller holds the lock)."""
+        # persisted as DISCARDED, so replay does not execute it
+        event.processed = DISCARDED
+        event.processed_at = self.clock()
+        self.processed.append(event)
+        self._discarded.add(id(event))
+        self._forget(event)
+        self._pending -= 1
+        self.counters[counter] += 1
+        self._discarded_action(event)
+
+    def _discarded_action(self, event: Event) -> None:
+        if event.event_type != EventType.NPC_ACTION:
+            return
+        for listener in self.discard_listeners:
+            listener(event)
+
+    def _oldest_action(self) -> Optional[Event]:
+        queue = self.queues.get(EventType.NPC_ACTION)
+        while queue and id(queue[0]) in self._discarded:
+            self._discarded.discard(id(queue.popleft()))
+        return queue[0] if queue else None
+
+    def _make_room(self, event: Event) -> bool:
+        """Apply the overflow policy for `event` on a full bus (caller holds the lock).
+
+        Returns False if `event` itself has to be dropped.
+        """
+        if (
+            self.overflow_policy == OverflowPolicy.BLOCK
+            and threading.get_ident() != self._dispatch_thread
+        ):
+            if self._space.wait_for(
+                lambda: self._pending < self.capacity, timeout=self.block_timeout_seconds
+            ):
+                return True
+            logger.warning(f"event bus full for {self.block_timeout_seconds}s, dropping event")
+            return False
+        # a publisher running inside a tick phase cannot wait for that phase to
+        # free space, so blocking falls back to dropping the oldest action
+        own = self._pending_actions.get(_npc_key(event)) if event.event_type == EventType.NPC_ACTION else None
+        if self.overflow_policy == OverflowPolicy.COALESCE and own:
+            for stale in list(own):
+                self._discard(stale, "coalesced")
+            return True
+        victim = own[0] if own else self._oldest_action()
+        if victim is None:
+            return False
+        self._discard(victim, "dropped")
+        return True
+
+    def publish(self, event: Event) -> bool:
         """
         Publish an Event instance into the bus.
+
+        Returns False if the event was not enqueued (rejected by the action
+        validator or dropped on a full bus).
         """
+        if self.action_validator is not None and event.event_type == EventType.NPC_ACTION:
+            try:
+                event.payload = self.action_validator(event.payload)
+            except ValueError as e:
+                with self._space:
+                    self.counters["rejected"] += 1
+                logger.warning(f"rejected NPC_ACTION of npc {event.npc_id}: {e}")
+                self._discarded_action(event)
+                return False
         # ensure created_at exists (use numeric timestamp)
         if not event.created_at:
-            event.created_at = time.time()
-        self.events.append(event)
-        # persist to database
-        event.id = self.event_repo.append_event(event)
+            event.created_at = self.clock()
+        with self._space:
+            if self.capacity and self._pending >= self.capacity:
+                if not self._make_room(event):
+                    self.counters["dropped"] += 1
+                    self._discarded_action(event)
+                    return False
+            self._enqueue(event)
+            # persist to database (possibly deferred until the end of the tick)
+            event.id = self.journal.append(event)
+        return True
 
     def subscribe(self, event_type: str, callback: Callable[[Event], None]) -> None:
         """Subscribe a callback function to an event type."""
-        self.subscribers.setdefault(event_type, []).append(callback)
+        self.dispatch.add(event_type, callback)
+
+    def subscribe_batch(
+        self, event_type: str, callback: Callable[["InMemoryEventBus", List[Event]], None]
+    ) -> None:
+        """Subscribe a callback that receives all events of a tick phase in one call."""
+        self.dispatch.add_batch(event_type, callback)
+
+    def unsubscribe(self, event_type: str, callback: Callable) -> bool:
+        return self.dispatch.remove(event_type, callback)
 
     def drain(self, event_type: str) -> List[Event]:
-        matched = [evt for evt in self.events if evt.event_type == event_type]
-        return matched
+        return list(self._live(self.queues.get(event_type, ())))
 
     def drainI(self, event_type: str) -> Iterator[Event]:
-        for evt in self.events:
-            if evt.event_type == event_type:
-                yield evt
+        yield from self._live(self.queues.get(event_type, ()))
+
+    def _next_pending(self, queue: Deque[Event]) -> Optional[Event]:
+        """Pop the head of `queue`, or None if it was dropped/coalesced meanwhile."""
+        evt = queue.popleft()
+        if id(evt) in self._discarded:
+            self._discarded.discard(id(evt))
+            return None
+        return evt
+
+    def _take(self, queue: Deque[Event]) -> List[Event]:
+        """Pop the events queued before this phase, skipping dropped/coalesced ones.
+
+        Anything published while the phase runs waits for the next one.
+        """
+        batch = []
+        for _ in range(len(queue)):
+            evt = self._next_pending(queue)
+            if evt is not None:
+                batch.append(evt)
+        return batch
+
+    def _settle(self, events: List[Event], queue: Deque[Event]) -> None:
+        """Move dispatched events to `processed`, or back to their queue if unhandled."""
+        with self._space:
+            for evt in events:
+                if evt.processed:
+                    self.processed.append(evt)
+                    self._forget(evt)
+                    self._pending -= 1
+                    key = _npc_key(evt)
+                    if key is not None:
+                        self._last_actions[str(key)] = evt.payload
+                else:
+                    queue.append(evt)
+            self._space.notify_all()
+
+    def coalesce_actions(self) -> int:
+        """Collapse pending NPC_ACTION events to one per NPC.
+
+        Only NPCs that queued more than one action since the last pass are visited.
+        The newest event survives (with a merged payload in MERGE mode); the others
+        are marked processed and flushed with the rest of the tick's marks.
+        Returns the number of superseded events.
+        """
+        if self.action_coalescing == ActionCoalescing.OFF or not self._bursty:
+            return 0
+        superseded = 0
+        with self._space:
+            for key in self._bursty:
+                actions = self._pending_actions.get(key)
+                if not actions or len(actions) < 2:
+                    continue
+                stale = list(actions)
+                newest = stale.pop()
+                if self.action_coalescing == ActionCoalescing.MERGE:
+                    newest.payload = self.action_merger(stale + [newest])
+                for evt in stale:
+                    self._discard(evt, "coalesced")
+                superseded += len(stale)
+            self._bursty.clear()
+            self._space.notify_all()
+        return superseded
 
     def pre_tick(self) -> None:
-        for evt in self.drainI(EventType.NPC_ACTION):
-            for cb in self.subscribers.get(EventType.NPC_ACTION, []):
-                cb(self, evt)
+        self.coalesce_actions()
+        queue = self.queues.get(EventType.NPC_ACTION)
+        if not queue:
+            return
+        callbacks = self.dispatch.get(EventType.NPC_ACTION)
+        batch_callbacks = self.dispatch.batch(EventType.NPC_ACTION)
+        self._dispatch_thread = threading.get_ident()
+        events = self._take(queue)
+        try:
+            for evt in events:
+                for cb in callbacks:
+                    with PROFILER.measure("subscriber", cb):
+                        cb(self, evt)
+            for cb in batch_callbacks:
+                with PROFILER.measure("subscriber", cb):
+                    cb(self, events)
+        finally:
+            self._dispatch_thread = None
+            self._settle(events, queue)
 
     def on_tick(self) -> None:
         """
-        Processes events on each tick by persisting processed events to the database and removing them from the event list.
+        Processes events on each tick by persisting processed events to the database and removing them from the bus.
         """
         # 已处理的事件进行数据库持久化
-        processed_events = [evt for evt in self.events if evt.processed == 1]
+        processed_events, self.processed = self.processed, []
         for evt in processed_events:
-            self.event_repo.mark_processed(evt.id, time.time())
-        # 删除已处理的事件
-        self.events = [evt for evt in self.events if evt.processed == 0]
+            self.journal.mark_processed(evt.id, self.clock(), evt.processed)
+
+    def npc_busy(self, npc_id) -> bool:
+        """True if a busy check claims the NPC (it needs no decision this tick)."""
+        if npc_id is None:
+            return False
+        npc_id = str(npc_id)
+        return any(check(npc_id) for check in self.busy_checks)
+
+    def _decision_callbacks(self) -> tuple:
+        """Per-NPC NPC_DECISION subscribers, minus those of busy NPCs."""
+        callbacks = self.dispatch.get(EventType.NPC_DECISION)
+        if not self.busy_checks:
+            return callbacks
+        return tuple(cb for cb in callbacks if not self.npc_busy(subscriber_npc_id(cb)))
 
     def post_tick(self) -> None:
         # Process NPC_DECISION events to potentially generate new actions.
         # The NPC_MEMORY event type was removed; keep post-tick concise.
-        evt = Event(event_type=EventType.NPC_DECISION, created_at=time.time())
-        for cb in self.subscribers.get(EventType.NPC_DECISION, []):
-            cb(self, evt)
+        evt = Event(event_type=EventType.NPC_DECISION, created_at=self.clock())
+        self._dispatch_thread = threading.get_ident()
+        if self.decision_deadline_seconds > 0:
+            try:
+                self._decide_with_deadline(evt)
+            finally:
+                self._dispatch_thread = None
+            self.flush()
+            return
+        try:
+            for cb in self._decision_callbacks():
+                with PROFILER.measure("subscriber", cb):
+                    cb(self, evt)
+            batch_callbacks = self.dispatch.batch(EventType.NPC_DECISION)
+            if batch_callbacks:
+                events = [evt]
+                for cb in batch_callbacks:
+                    with PROFILER.measure("subscriber", cb):
+                        cb(self, events)
+        finally:
+            self._dispatch_thread = None
+        # one write transaction per tick for everything published/processed in it
+        self.flush()
+
+    def _run_decision(self, cb: Callable, proxy: DeferredPublisher, arg) -> None:
+        with PROFILER.measure("subscriber", cb):
+            cb(proxy, arg)
+
+    def _submit_decision(self, cb: Callable, arg) -> DecisionCall:
+        if self._decision_pool is None:
+            self._decision_pool = ThreadPoolExecutor(
+                max_workers=cfg_kernel.get("decision_concurrency", 16),
+                thread_name_prefix="decision",
+            )
+        call = DecisionCall(cb)
+        call.future = self._decision_pool.submit(
+            self._run_decision, cb, DeferredPublisher(self, call), arg
+        )
+        return call
+
+    def _finish_decision(self, call: DecisionCall) -> None:
+        if call.future.exception() is not None:
+            logger.error(f"NPC decision subscriber failed: {call.future.exception()}")
+        for event in call.take():
+            self.publish(event)
+
+    def _decide_with_deadline(self, evt: Event) -> None:
+        """NPC_DECISION fan-out bounded by `decision_deadline_seconds`.
+
+        Results are published on the clock thread in subscription order, so the
+        action queue does not depend on which decision finished first.
+        """
+        self.deferred = 0
+        carried: List[DecisionCall] = []
+        busy: Dict[Callable, DecisionCall] = {}
+        for call in self._inflight:
+            if call.future.done():
+                self._finish_decision(call)
+            else:
+                carried.append(call)
+                busy[call.cb] = call
+
+        calls: List[DecisionCall] = []
+        events = [evt]
+        subscribers = [(cb, evt) for cb in self._decision_callbacks()]
+        subscribers += [(cb, events) for cb in self.dispatch.batch(EventType.NPC_DECISION)]
+        for cb, arg in subscribers:
+            if cb in busy:
+                # still deciding since an earlier tick
+                self.deferred += len(busy[cb].npc_ids)
+                continue
+            calls.append(self._submit_decision(cb, arg))
+
+        wait([call.future for call in calls], timeout=self.decision_deadline_seconds)
+        for call in calls:
+            if call.future.done():
+                self._finish_decision(call)
+                continue
+            npc_ids = call.npc_ids
+            self.deferred += len(npc_ids)
+            if self.deferred_policy == DeferredPolicy.CARRY:
+                carried.append(call)
+                continue
+            call.abandon()
+            # a batch decider gives up on every NPC it was deciding for
+            for npc_id in npc_ids:
+                fallback = fallback_action(
+                    self.deferred_policy, npc_id, self._last_actions.get(npc_id)
+                )
+                if fallback is not None:
+                    self.publish(fallback)
+        self._inflight = carried
+        if self.deferred:
+            self.counters["deferred"] += self.deferred
+            logger.warning(
+                f"{self.deferred} NPC decisions deferred past the {self.decision_deadline_seconds}s deadline"
+            )
 
+    def flush(self) -> int:
+        """Write buffered event inserts and processed-marks to the database."""
+        return self.journal.flush()
@@ -0,0 +1,141 @@
+"""Headless fast-forward runner.
+
+Runs the simulation on a virtual SimClock for N simulated days without sleeping
+and reports throughput, for load tests and batch experiments:
+
+    aitown-headless --days 30
+
+The run works on an in-memory copy of the database, so the stored town (its
+clock, NPCs and events) is left as it was. By default NPCs decide offline with
+`RandomDecider`, so a run makes no LLM calls and is reproducible for a given
+`--seed`; `--llm` makes them decide as in a live run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from typing import Any, Dict, List, Tuple
+
+from aitown.helpers.db_helper import scratch_db
+from aitown.kernel.action_registry import ACTIONS
+from aitown.kernel.batch_executor import load_npc
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.kernel.npc_actions import ActionExecutor
+from aitown.kernel.sim_clock import SimClock
+from aitown.models.npc_model import NPC
+from aitown.repos.event_repo import Event
+from aitown.repos.npc_repo import npc_from_row
+from aitown.services.event_service import EventService
+from aitown.services.npc_service import NPC_INSTANCE_LIST
+
+
+def load_npcs(conn) -> List[NPC]:
+    """Living NPCs stored in the database."""
+    return [npc_from_row(row) for row in conn.execute("SELECT * FROM npc WHERE is_dead = 0 ORDER BY id")]
+
+
+class RandomDecider:
+    """Offline NPC_DECISION batch subscriber: every free NPC takes a random legal action.
+
+    Candidates are idle, sleep, work, a move (or move_to) to each other place and
+    eat/buy/sell of one of each item; those whose precondition fails against the
+    NPC's stored state are left out, as the publish-time validator would.
+    """
+
+    def __init__(self, conn, seed: int = 0):
+        self.conn = conn
+        self.rng = random.Random(seed)
+
+    def candidates(self, ctx, npc) -> List[Tuple[str, Dict[str, Any]]]:
+        options = [
+            ("idle", {}),
+            ("sleep", {"duration_hours": self.rng.randint(1, 8)}),
+            ("work", {"duration_hours": self.rng.randint(1, 4)}),
+        ]
+        for place_id in ctx.catalog.places:
+            if place_id != str(npc.location_id):
+                options += [("move", {"place_id": place_id}), ("move_to", {"place_id": place_id})]
+        for item_id in ctx.catalog.items:
+            options += [(name, {"item_id": item_id, "item_amount": 1}) for name in ("eat", "buy", "sell")]
+        return [(name, params) for name, params in options if ACTIONS.get(name).check(ctx, npc, params) is None]
+
+    def decide_all(self, event_bus: InMemoryEventBus, events: List[Event]) -> None:
+        # the action runs at the start of the next tick, after shops restock
+        ctx = ActionExecutor.context.restocked()
+        for npc in list(NPC_INSTANCE_LIST):
+            if event_bus.npc_busy(npc.id):
+                continue
+            state = load_npc(self.conn, npc.id)
+            if state is None:
+                continue
+            name, params = self.rng.choice(self.candidates(ctx, state))
+            payload = {"action_type": name, "npc_id": str(npc.id), **params}
+            event_bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id=str(npc.id), payload=payload))
+
+
+def run(
+    days: float = 1.0,
+    ticks: int | None = None,
+    db_path: str | None = None,
+    llm: bool = False,
+    seed: int = 0,
+) -> dict:
+    """Fast-forward the town stored at db_path and return a throughput report.
+
+    Every living NPC decides each tick: with a seeded RandomDecider, or with
+    `llm=True` through the LLM as in a live run. Actions, memories and ledger
+    entries are written to the scratch copy and stamped with virtual time.
+    """
+    conn = scratch_db(db_path)
+    npcs = load_npcs(conn)
+    live_conn = ActionExecutor.conn
+    live_npcs = list(NPC_INSTANCE_LIST)
+    ActionExecutor.bind(conn)
+    NPC_INSTANCE_LIST[:] = npcs
+    try:
+        clock = SimClock(virtual=True, conn=conn)
+        if llm:
+            EventService.register_all(clock.event_bus, batch=True)
+        else:
+            clock.event_bus.subscribe_batch(EventType.NPC_DECISION, RandomDecider(conn, seed).decide_all)
+        clock.start()
+        try:
+            report = clock.fast_forward(days=days, ticks=ticks)
+        finally:
+            clock.stop()
+    finally:
+        NPC_INSTANCE_LIST[:] = live_npcs
+        ActionExecutor.bind(live_conn)
+        conn.close()
+    report["npcs"] = len(npcs)
+    report["town_time"] = clock.town_time()
+    report["dropped_events"] = clock.event_bus.counters["dropped"]
+    report["rejected_events"] = clock.event_bus.counters["rejected"]
+    report["decider"] = "llm" if llm else f"random (seed {seed})"
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description="Run the simulation headless, as fast as possible")
+    p.add_argument("--days", type=float, default=1.0, help="simulated days to run (default 1)")
+    p.add_argument("--ticks", type=int, default=None, help="exact number of ticks (overrides --days)")
+    p.add_argument("--db", default=None, help="database to copy the town from (default [repos].db_path)")
+    p.add_argument("--llm", action="store_true", help="decide through the LLM (network calls, not reproducible)")
+    p.add_argument("--seed", type=int, default=0, help="seed of the offline random decider (default 0)")
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = p.parse_args()
+
+    report = run(days=args.days, ticks=args.ticks, db_path=args.db, llm=args.llm, seed=args.seed)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(
+            f"{report['ticks']} ticks, {report['npcs']} NPCs in {report['elapsed_seconds']:.3f}s "
+            f"({report['ticks_per_second']:.1f} ticks/s), town time {report['town_time']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,37 @@
 """NPC action implementations.
 
 Contains the ActionExecutor which implements NPC actions like move/eat/work/buy/sell.
+Preconditions and state changes are the rules in aitown.kernel.action_rules, which
+BatchActionExecutor runs too; ActionExecutor applies them one NPC row at a time.
 """
 
 import datetime
-import time
+import sqlite3
+
+from loguru import logger
 
 from aitown.helpers.db_helper import load_db
+from aitown.kernel.action_registry import ACTIONS, action
+from aitown.kernel.action_rules import STATE_COLUMNS, ActionContext, fold_legacy_coins
+from aitown.kernel.activity_scheduler import ActivityScheduler
 from aitown.kernel.event_bus import InMemoryEventBus
+from aitown.kernel.profiler import PROFILER
+from aitown.kernel.road_graph import RoutePlanner
 from aitown.repos.effect_repo import EffectRepository
 from aitown.repos.event_repo import Event
-from aitown.repos.item_repo import ItemRepository, ItemType
+from aitown.repos.item_repo import ItemRepository
+from aitown.repos.ledger import Ledger
 from aitown.repos.memory_repo import MemoryEntry, MemoryEntryRepository
 from aitown.repos.npc_repo import NpcRepository, NPCStatus
-from aitown.repos.place_repo import PlaceRepository, PlaceTag
+from aitown.repos.place_repo import PlaceRepository
 from aitown.repos.road_repo import RoadRepository
-from aitown.helpers.currency_helper import total_value, deduct_cost_low_first, split_amount_to_coins
+from aitown.repos.static_catalog import StaticCatalog
+from aitown.repos.unit_of_work import savepoint
 
 
 class ActionExecutor:
     """
-    move, eat, sleep, work, buy, sell, idle
+    move, move_to, eat, sleep, work, buy, sell, idle
 
     所有动作的流程都是：
     1. 检查前置条件（如位置、物品、状态等）
@@ -39,8 +50,40 @@ class ActionExecutor:
     place_repo: PlaceRepository = PlaceRepository(conn)
     memory_repo: MemoryEntryRepository = MemoryEntryRepository(conn)
     road_repo: RoadRepository = RoadRepository(conn)
+    # items, effects, places and roads are static: read them from memory
+    catalog: StaticCatalog = StaticCatalog(conn)
+    # multi-hop routes started by move_to, advanced one hop per tick
+    routes: RoutePlanner = RoutePlanner(catalog)
+    # sleep/work keep the NPC busy (no decisions) for their whole duration
+    activities: ActivityScheduler = ActivityScheduler()
+    # purchases, sales and wages; flushed once per tick by SimClock
+    ledger: Ledger = Ledger(conn)
+    # what the action rules work on besides the NPC (shared with BatchActionExecutor)
+    context: ActionContext = ActionContext(catalog, routes, activities, ledger)
+
+    @staticmethod
+    def bind(conn) -> None:
+        """Point the executor at another database, e.g. a scratch copy for headless runs.
+
+        Repositories, catalog, ledger and context are rebuilt on `conn`; routes and
+        activities in progress are dropped.
+        """
+        cls = ActionExecutor
+        cls.conn = conn
+        cls.npc_repo = NpcRepository(conn)
+        cls.item_repo = ItemRepository(conn)
+        cls.effect_repo = EffectRepository(conn)
+        cls.place_repo = PlaceRepository(conn)
+        cls.memory_repo = MemoryEntryRepository(conn)
+        cls.road_repo = RoadRepository(conn)
+        cls.catalog = StaticCatalog(conn)
+        cls.routes = RoutePlanner(cls.catalog)
+        cls.activities = ActivityScheduler()
+        cls.ledger = Ledger(conn)
+        cls.context = ActionContext(cls.catalog, cls.routes, cls.activities, cls.ledger)
 
     @staticmethod
+    @action("move")
     def move(npc_id: str, place_id: str) -> bool:
         """Move NPC to a target place if a connecting road exists.
 
@@ -51,41 +94,23 @@ class ActionExecutor:
         Returns:
             True if move succeeded and state was updated, False otherwise.
         """
-        success = True
-        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
-        # use shared repository instances from the class to avoid re-creating connections
-        from_place = ActionExecutor.place_repo.get_by_id(npc.location_id)
-        to_place = ActionExecutor.place_repo.get_by_id(place_id)
-
-        available_roads = ActionExecutor.road_repo.list_nearby(npc.location_id)
-        road = next(
-            (
-                r
-                for r in available_roads
-                if r.from_place == place_id or r.to_place == place_id
-            ),
-            None,
-        )
-        if not road:
-            msg = (
-                f"{npc.name} 想从 {from_place.name} 移动到 {to_place.name}，但无路可走"
-            )
-            success = False
-
-        msg = f"{npc.name} 从 {from_place.name} 移动到 {to_place.name}"
-
-        # TODO: 广播事件
-
-        if not success:
-            return False
+        return ActionExecutor.perform("move", npc_id, place_id=place_id)
 
-        ActionExecutor.npc_repo.update(npc_id, {"location_id": place_id})
+    @staticmethod
+    @action("move_to")
+    def move_to(npc_id: str, place_id: str) -> bool:
+        """Travel to a place that may be several roads away.
 
-        npc.remember(ActionExecutor.memory_repo, msg)
+        Plans the shortest route and takes its first hop now; the remaining hops are
+        moved one per tick by `ActionExecutor.routes` without new NPC decisions.
 
-        return True
+        Returns:
+            True if the NPC is on its way (or already there), False if unreachable.
+        """
+        return ActionExecutor.perform("move_to", npc_id, place_id=place_id)
 
     @staticmethod
+    @action("eat")
     def eat(npc_id: str, item_id: str, item_amount: int) -> bool:
         """Consume an item from NPC inventory and apply its effects.
 
@@ -97,74 +122,19 @@ class ActionExecutor:
         Returns:
             True on success, False if inventory or item type invalid.
         """
-        success = True
-        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
-        inventory = npc.inventory
-        item = ActionExecutor.item_repo.get_by_id(item_id)
-
-        if (
-            item_id not in inventory
-            or inventory[item_id] < item_amount
-            or item.type != ItemType.CONSUMABLE
-        ):
-            msg = f"{npc.name} 想吃 {item.name} x{item_amount}，这显然是在做梦"
-            success = False
-
-        msg = f"{npc.name} 吃了 {item.name} x{item_amount}"
-
-        # TODO : 广播事件
-
-        if not success:
-            return False
-
-        for eff_id in item.effect_ids:
-            eff = ActionExecutor.effect_repo.get_by_id(eff_id)
-            eff.apply_to_npc(npc_id, item_amount)
-        inventory[item_id] -= item_amount
-        if inventory[item_id] <= 0:
-            del inventory[item_id]
-        ActionExecutor.npc_repo.update(npc_id, {"inventory": inventory})
-
-        npc.remember(ActionExecutor.memory_repo, msg)
-
-        return True
+        return ActionExecutor.perform("eat", npc_id, item_id=item_id, item_amount=item_amount)
 
     @staticmethod
+    @action("sleep")
     def sleep(npc_id: str, duration_hours: int) -> bool:
         """
         在有HOUSE标签的地点睡觉，恢复更多的energy和mood，并获得形容描述“美美地睡了一觉”
         NPC会进入NPCStatus.SLEEPING状态，期间不能执行其他动作
         """
-        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
-        place = ActionExecutor.place_repo.get_by_id(npc.location_id)
-
-        energy_recovered = 10 * duration_hours
-        mood_recovered = 5 * duration_hours
-
-        msg = ""
-        if PlaceTag.HOUSE in place.tags:
-            energy_recovered *= 1.2
-            mood_recovered *= 1.2
-            msg = f"{npc.name} 在 {place.name} 美美地睡了一觉"
-        else:
-            msg = f"{npc.name} 在 {place.name} 睡了一觉"
-
-        # TODO: 广播事件
-
-        ActionExecutor.npc_repo.update(
-            npc_id,
-            {
-                "energy": min(npc.energy + int(energy_recovered), 100),
-                "mood": min(npc.mood + int(mood_recovered), 100),
-                "status": NPCStatus.SLEEPING,
-            },
-        )
-
-        npc.remember(ActionExecutor.memory_repo, msg)
-
-        return True
+        return ActionExecutor.perform("sleep", npc_id, duration_hours=duration_hours)
 
     @staticmethod
+    @action("work")
     def work(npc_id: str, duration_hours: int) -> bool:
         """
         在有WORKABLE标签的地点工作，消耗energy和mood，获得金钱
@@ -178,112 +148,25 @@ class ActionExecutor:
         Returns:
             True if the work was performed, False otherwise.
         """
-        success = True
-        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
-        place = ActionExecutor.place_repo.get_by_id(npc.location_id)
-        inventory = npc.inventory
-
-        energy_cost = 10 * duration_hours
-        mood_cost = 5 * duration_hours
-        money_earned = 20 * duration_hours
-
-        if PlaceTag.WORKABLE not in place.tags:
-            msg = f"{npc.name} 想在 {place.name} 工作 {duration_hours} 小时，可惜这里没有工作岗位"
-            success = False
-
-        if success and (npc.energy < energy_cost or npc.mood < mood_cost):
-            msg = f"{npc.name} 想在 {place.name} 工作 {duration_hours} 小时，但精力或心情不足"
-            success = False
-
-        msg = f"{npc.name} 在 {place.name} 开始了 {duration_hours} 小时的工作，预计赚取 {money_earned} 金币"
-        # TODO : 广播事件
-
-        if not success:
-            return False
-
-        # 将赚取的金额拆分为硬币并加入库存
-        coin_adds = split_amount_to_coins(money_earned)
-        for cid, cnt in coin_adds.items():
-            if cnt <= 0:
-                continue
-            inventory[cid] = inventory.get(cid, 0) + cnt
-
-        ActionExecutor.npc_repo.update(
-            npc_id,
-            {
-                "energy": max(npc.energy - energy_cost, 0),
-                "mood": max(npc.mood - mood_cost, 0),
-                "inventory": inventory,
-            },
-        )
-
-        npc.remember(ActionExecutor.memory_repo, msg)
-
-        return True
+        return ActionExecutor.perform("work", npc_id, duration_hours=duration_hours)
 
     @staticmethod
+    @action("buy")
     def buy(npc_id: str, item_id: str, item_amount: int) -> bool:
         """Buy an item from the current place's shop inventory.
 
-        This function checks stock, computes total cost, deducts coins from the NPC
-        (using smaller denominations first per tests), updates inventory and records memory.
+        This function checks stock, computes total cost, deducts it from the NPC's
+        balance, updates inventory and records memory.
 
         Returns:
             True on success, False on failure (insufficient stock or funds).
         """
-        success = True
-        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
-        inventory = npc.inventory
-        item = ActionExecutor.item_repo.get_by_id(item_id)
-        place = ActionExecutor.place_repo.get_by_id(npc.location_id)
-
-        if (
-            item_id not in place.shop_inventory
-            or place.shop_inventory[item_id] < item_amount
-        ):
-            msg = f"{npc.name} 想买 {item.name} x{item_amount}，但 {place.name} 没有足够的库存"
-            success = False
-
-        # 计算NPC现有的金币总额
-        total_money = total_value(inventory)
-
-        total_cost = item.value * item_amount
-        if success and total_money < total_cost:
-            msg = f"{npc.name} 想买 {item.name} x{item_amount}，但没有足够的金币"
-            success = False
-
-        msg = f"{npc.name} 在 {place.name} 买了 {item.name} x{item_amount}"
-        # TODO : 广播事件
-
-        if not success:
-            return False
-
-        # 扣除金币，使用 currency helper（低面值优先以匹配测试行为）
-        inventory, deducted_ok = deduct_cost_low_first(inventory, total_cost)
-        if not deducted_ok:
-            # unexpected: not enough funds (should have been caught above)
-            return False
-
-        # 添加购买的物品到NPC库存
-        if item_id in inventory:
-            inventory[item_id] += item_amount
-        else:
-            inventory[item_id] = item_amount
-
-        ActionExecutor.npc_repo.update(
-            npc_id,
-            {
-                "inventory": inventory,
-            },
-        )
-
-        npc.remember(ActionExecutor.memory_repo, msg)
-
-        return True
+        return ActionExecutor.perform("buy", npc_id, item_id=item_id, item_amount=item_amount)
 
     @staticmethod
+    @action("sell")
     def sell(npc_id: str, item_id: str, item_amount: int) -> bool:
-        """Sell an item from NPC inventory at a shop, converting value to coins.
+        """Sell an item from NPC inventory at a shop, crediting its value to the balance.
 
         Args:
             npc_id: id of the NPC selling
@@ -293,54 +176,10 @@ class ActionExecutor:
         Returns:
             True on success, False if place not a shop or insufficient inventory.
         """
-        success = True
-        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
-        inventory = npc.inventory
-        item = ActionExecutor.item_repo.get_by_id(item_id)
-        place = ActionExecutor.place_repo.get_by_id(npc.location_id)
-
-        if PlaceTag.SHOP not in place.tags:
-            msg = (
-                f"{npc.name} 想卖 {item.name} x{item_amount}，但 {place.name} 不是商店"
-            )
-            success = False
-
-        if success and (item_id not in inventory or inventory[item_id] < item_amount):
-            msg = f"{npc.name} 想卖 {item.name} x{item_amount}，但没有足够的库存"
-            success = False
-
-        # TODO : 广播事件
-
-        if not success:
-            return False
-
-        total_earnings = item.value * item_amount
-        msg = f"{npc.name} 在 {place.name} 卖了 {item.name} x{item_amount}，赚了 {total_earnings}"
-        platinum_coins = total_earnings // 1000
-        gold_coins = (total_earnings % 1000) // 100
-        silver_coins = (total_earnings % 100) // 10
-        bronze_coins = total_earnings % 10
-
-        mod_to_inventory = [
-            {"item_id": "item_platinum_coin", "amount": platinum_coins},
-            {"item_id": "item_gold_coin", "amount": gold_coins},
-            {"item_id": "item_silver_coin", "amount": silver_coins},
-            {"item_id": "item_bronze_coin", "amount": bronze_coins},
-            {"item_id": item_id, "amount": -item_amount},
-        ]
-
-        for item in mod_to_inventory:
-            inventory[item["item_id"]] = (
-                inventory.get(item["item_id"], 0) + item["amount"]
-            )
-
-        ActionExecutor.npc_repo.update(npc_id, {"inventory": inventory})
-
-        npc.remember(ActionExecutor.memory_repo, msg)
-
-        return True
+        return ActionExecutor.perform("sell", npc_id, item_id=item_id, item_amount=item_amount)
 
     @staticmethod
+    @action("idle")
     def idle(npc_id: str) -> bool:
         """Make the NPC idle: small mood increase and energy decrease.
 
@@ -350,60 +189,103 @@ class ActionExecutor:
         Returns:
             True after updating NPC state and recording memory.
         """
-        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
-        place = ActionExecutor.place_repo.get_by_id(npc.location_id)
+        return ActionExecutor.perform("idle", npc_id)
 
-        msg = f"{npc.name} 在 {place.name} 放松了一下， 心情变好了"
-        # TODO : 广播事件
+    @staticmethod
+    def perform(action_type: str, npc_id: str, **params) -> bool:
+        """Run the rules of a registered action against the NPC's stored state.
 
-        ActionExecutor.npc_repo.update(
-            npc_id,
-            {
-                "mood": min(npc.mood + 10, 100),
-                "energy": max(npc.energy - 5, 0),
-            },
-        )
+        If the precondition holds, the delta is applied to the loaded NPC, the
+        changed columns are written with one update and the memory line is
+        recorded. Returns False if the NPC does not exist, or the precondition or
+        the write failed.
+        """
+        spec = ACTIONS.get(action_type)
+        ctx = ActionExecutor.context
+        npc = ActionExecutor.npc_repo.get_by_id(npc_id)
+        if npc is None:
+            logger.debug(f"{action_type}: unknown npc {npc_id}")
+            return False
+        stored = {column: getattr(npc, column) for column in STATE_COLUMNS}
+        stored["inventory"] = dict(npc.inventory)
+        fold_legacy_coins(npc)
 
-        npc.remember(ActionExecutor.memory_repo, msg)
+        reason = spec.check(ctx, npc, params)
+        if reason is not None:
+            logger.debug(reason)
+            return False
+        mark = ctx.savepoint()
+        msg = spec.apply(ctx, npc, params)
+        fields = {c: getattr(npc, c) for c in STATE_COLUMNS if getattr(npc, c) != stored[c]}
+        if not ActionExecutor.npc_repo.update_fields(npc_id, fields):
+            ctx.rollback(mark)
+            return False
+        ctx.commit()
+        if fields:
+            ctx.written.add(str(npc_id))
 
+        if msg:
+            npc.remember(ActionExecutor.memory_repo, msg, created_at=ctx.clock())
         return True
 
+    @staticmethod
+    def begin_tick(tick: int, day: int) -> int:
+        """Start a tick: restock shops, stamp the ledger and end finished activities."""
+        ActionExecutor.context.begin_tick()
+        ActionExecutor.ledger.begin_tick(tick, day)
+        return ActionExecutor.end_activities()
+
+    @staticmethod
+    def resume_activities() -> int:
+        """Schedule the sleep/work that stored NPC statuses still show (e.g. after a restart).
+
+        Without this those NPCs would decide at once and keep their stale status;
+        resumed activities end at the next tick, resetting the status first.
+        """
+        try:
+            rows = ActionExecutor.conn.execute(
+                "SELECT id, status FROM npc WHERE status IN (?, ?) AND is_dead = 0",
+                (NPCStatus.SLEEPING, NPCStatus.WORKING),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error loading NPC activities: {e}")
+            return 0
+        activities = {NPCStatus.SLEEPING: "sleep", NPCStatus.WORKING: "work"}
+        return ActionExecutor.activities.resume((str(row[0]), activities[row[1]]) for row in rows)
+
+    @staticmethod
+    def end_activities() -> int:
+        """Start a tick for the activity scheduler; NPCs whose sleep/work ended are peaceful again."""
+        finished = ActionExecutor.activities.tick()
+        for npc_id, _ in finished:
+            ActionExecutor.npc_repo.update_fields(npc_id, {"status": NPCStatus.PEACEFUL})
+            ActionExecutor.context.written.add(str(npc_id))
+        return len(finished)
+
     @staticmethod
     def event_listener(event_bus: InMemoryEventBus, event: Event):
         """Dispatch an incoming event to the corresponding ActionExecutor method.
 
-        The listener interprets the event payload and calls the matching action.
-        If the action fails, falls back to idle.
+        The handler is looked up in the action registry (see `action`); unknown
+        action types are ignored. If the action fails, falls back to idle.
         """
         payload = event.payload
         action_type = payload.get("action_type")
-        res = True
-        match action_type:
-            case "move":
-                res = ActionExecutor.move(payload["npc_id"], payload["place_id"])
-            case "eat":
-                res = ActionExecutor.eat(
-                    payload["npc_id"], payload["item_id"], payload["item_amount"]
-                )
-            case "sleep":
-                res = ActionExecutor.sleep(payload["npc_id"], payload["duration_hours"])
-            case "work":
-                res = ActionExecutor.work(payload["npc_id"], payload["duration_hours"])
-            case "buy":
-                res = ActionExecutor.buy(
-                    payload["npc_id"], payload["item_id"], payload["item_amount"]
-                )
-            case "sell":
-                res = ActionExecutor.sell(
-                    payload["npc_id"], payload["item_id"], payload["item_amount"]
-                )
-            case "idle":
-                res = ActionExecutor.idle(payload["npc_id"])
-            case _:
-                pass
+        # inside a tick's UnitOfWork a failed action is rolled back on its own
+        with savepoint(ActionExecutor.conn) as sp, PROFILER.measure("action", action_type or "unknown"):
+            res = True
+            spec = ACTIONS.get(action_type)
+            if spec is not None and spec.handler is not None:
+                res = spec.handler(**spec.arguments(payload))
+            if not res:
+                sp.rollback()
 
         if not res:
+            # a blocked hop ends the trip; the NPC decides again next tick
+            ActionExecutor.routes.cancel(payload["npc_id"])
             ActionExecutor.idle(payload["npc_id"])
+        elif action_type in ("move", "move_to"):
+            ActionExecutor.routes.settle(payload["npc_id"])
 
         event.processed = 1
-        event.processed_at = time.time()
+        event.processed_at = event_bus.clock()
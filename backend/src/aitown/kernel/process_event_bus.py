@@ -0,0 +1,154 @@
+"""Multi-process flavour of the in-memory event bus.
+
+`ProcessEventBus` keeps NPC_ACTION handling in the main process but moves the
+NPC_DECISION work (prompt building, LLM call, response parsing) to a pool of
+worker processes. NPCs are partitioned by id, so one NPC is always served by the
+same worker. Workers send action payloads back over pipes and the main process
+publishes them in the order the NPCs were submitted, which keeps the action queue
+(and therefore the simulation) deterministic regardless of which worker finishes
+first.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from aitown.kernel.event_bus import EventType, InMemoryEventBus, cfg_kernel
+from aitown.models.npc_model import decide_action
+from aitown.repos.event_repo import Event
+
+
+def _worker_main(conn, decider: Callable[[dict], dict]) -> None:
+    """Worker loop: receive [(index, npc_data)], reply [(index, payload)]; None stops."""
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError:
+            break
+        if batch is None:
+            break
+        results = []
+        for index, npc_data in batch:
+            try:
+                payload = decider(npc_data)
+            except Exception as e:
+                logger.error(f"decision for npc {npc_data.get('id')} failed: {e}")
+                payload = {"action_type": "idle", "npc_id": npc_data.get("id")}
+            results.append((index, payload))
+        conn.send(results)
+    conn.close()
+
+
+class ProcessEventBus(InMemoryEventBus):
+    """Event bus that shards NPC decisions across worker processes.
+
+    Workers start lazily on the first `decide` call and are stopped by `close()`.
+    The decider must be a module-level function (it is handed to the workers)
+    taking an NPC snapshot dict and returning an NPC_ACTION payload.
+
+    Args:
+        durability, capacity, overflow_policy, action_coalescing: see InMemoryEventBus.
+        workers: number of worker processes (default `[kernel].decision_workers`,
+            0 means `os.cpu_count()`).
+        decider: function run in the workers (default `npc_model.decide_action`).
+    """
+
+    def __init__(
+        self,
+        durability: Optional[str] = None,
+        capacity: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        action_coalescing: Optional[str] = None,
+        workers: Optional[int] = None,
+        decider: Callable[[dict], dict] = decide_action,
+    ):
+        super().__init__(durability, capacity, overflow_policy, action_coalescing)
+        if workers is None:
+            workers = cfg_kernel.get("decision_workers", 0)
+        self.workers: int = workers or os.cpu_count() or 1
+        self.decider = decider
+        self._procs: List[multiprocessing.Process] = []
+        self._conns: list = []
+
+    def partition(self, npc_id) -> int:
+        """Worker index serving `npc_id`; stable across runs (unlike hash())."""
+        return zlib.crc32(str(npc_id).encode()) % self.workers
+
+    def start(self) -> None:
+        if self._procs:
+            return
+        for _ in range(self.workers):
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_worker_main, args=(child, self.decider), daemon=True
+            )
+            proc.start()
+            child.close()
+            self._procs.append(proc)
+            self._conns.append(parent)
+        logger.info(f"started {self.workers} decision worker processes")
+
+    def close(self) -> None:
+        for conn in self._conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except (OSError, EOFError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self._procs = []
+        self._conns = []
+
+    def decide(self, npcs: Iterable) -> int:
+        """Run the decider for every NPC on its worker and publish the resulting actions.
+
+        Actions are published in the order of `npcs`. Returns the number published.
+        """
+        snapshots = [npc.model_dump() for npc in npcs]
+        if not snapshots:
+            return 0
+        self.start()
+
+        shards: Dict[int, List[Tuple[int, dict]]] = {}
+        for index, data in enumerate(snapshots):
+            shards.setdefault(self.partition(data.get("id")), []).append((index, data))
+        for worker, shard in shards.items():
+            self._conns[worker].send(shard)
+
+        payloads: List[Optional[dict]] = [None] * len(snapshots)
+        broken = False
+        for worker in shards:
+            try:
+                for index, payload in self._conns[worker].recv():
+                    payloads[index] = payload
+            except EOFError:
+                logger.error(f"decision worker {worker} exited unexpectedly")
+                broken = True
+        if broken:
+            # restart the whole pool on the next tick
+            self.close()
+
+        published = 0
+        for data, payload in zip(snapshots, payloads):
+            if payload is None:
+                continue
+            npc_id = data.get("id")
+            if not isinstance(payload, dict):
+                payload = {"action_type": "idle", "npc_id": npc_id}
+            self.publish(
+                Event(
+                    event_type=EventType.NPC_ACTION,
+                    payload=payload,
+                    npc_id=None if npc_id is None else str(npc_id),
+                )
+            )
+            published += 1
+        return published
@@ -0,0 +1,189 @@
+"""Tick profiler with rolling latency histograms.
+
+`PROFILER` is the process-wide instance used by SimClock (per tick phase), the
+event buses (per subscriber) and ActionExecutor (per action type). Timings go into
+HDR-style log-linear histograms that only cover the last `window_seconds`, so
+`stats()` reflects current behaviour rather than the whole run.
+
+When profiling is disabled `measure()` returns a shared null context, so the
+instrumented code pays one attribute check and an empty `with` block.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from aitown.helpers.config_helper import get_config
+
+cfg_kernel = get_config("kernel")
+
+# sub-buckets per power of two; 2**5 gives about 3% relative error
+SUB_BUCKET_BITS = 5
+_NULL = contextlib.nullcontext()
+
+
+def bucket_index(micros: int) -> int:
+    """Log-linear bucket of a value in microseconds (HDR histogram layout)."""
+    if micros < (1 << SUB_BUCKET_BITS):
+        return micros
+    shift = micros.bit_length() - 1 - SUB_BUCKET_BITS
+    return ((shift + 1) << SUB_BUCKET_BITS) + (micros >> shift) - (1 << SUB_BUCKET_BITS)
+
+
+def bucket_value(index: int) -> int:
+    """Upper bound (in microseconds) of the values falling into `index`."""
+    if index < (1 << SUB_BUCKET_BITS):
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    sub = index - ((shift + 1) << SUB_BUCKET_BITS) + (1 << SUB_BUCKET_BITS)
+    return ((sub + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Rolling log-linear histogram of durations.
+
+    The window is split into `slots` sub-histograms; a slot is cleared when the
+    clock comes back around to it, so old samples age out without a scan.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 300.0,
+        slots: int = 10,
+        time_fn: Callable[[], float] = time.monotonic,
+    ):
+        self.slot_seconds: float = window_seconds / slots
+        self.time_fn = time_fn
+        self._counts: List[Dict[int, int]] = [{} for _ in range(slots)]
+        self._sums: List[float] = [0.0] * slots
+        self._epochs: List[int] = [-1] * slots
+
+    def _slot(self) -> int:
+        epoch = int(self.time_fn() / self.slot_seconds)
+        i = epoch % len(self._counts)
+        if self._epochs[i] != epoch:
+            self._counts[i] = {}
+            self._sums[i] = 0.0
+            self._epochs[i] = epoch
+        return i
+
+    def record(self, seconds: float) -> None:
+        i = self._slot()
+        idx = bucket_index(max(0, int(seconds * 1_000_000)))
+        counts = self._counts[i]
+        counts[idx] = counts.get(idx, 0) + 1
+        self._sums[i] += seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        """count, mean and p50/p90/p99/max (seconds) over the live window."""
+        self._slot()
+        oldest = int(self.time_fn() / self.slot_seconds) - len(self._counts) + 1
+        merged: Dict[int, int] = {}
+        total = 0.0
+        for counts, s, epoch in zip(self._counts, self._sums, self._epochs):
+            if epoch < oldest:
+                continue
+            total += s
+            for idx, n in counts.items():
+                merged[idx] = merged.get(idx, 0) + n
+        count = sum(merged.values())
+        if not count:
+            return {"count": 0}
+        out: Dict[str, float] = {"count": count, "mean": total / count}
+        targets = [("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)]
+        seen = 0
+        t = 0
+        for idx in sorted(merged):
+            seen += merged[idx]
+            while t < len(targets) and seen >= targets[t][1] * count:
+                out[targets[t][0]] = bucket_value(idx) / 1_000_000
+                t += 1
+        return out
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+class TickProfiler:
+    """Named rolling histograms plus an optional periodic log line.
+
+    Args:
+        enabled: default `[kernel].profiling`.
+        window_seconds: histogram window (default `[kernel].profile_window_seconds`).
+        log_every_ticks: log a summary every N ticks, 0 = never
+            (default `[kernel].profile_log_every_ticks`).
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        window_seconds: Optional[float] = None,
+        log_every_ticks: Optional[int] = None,
+    ):
+        self.enabled: bool = cfg_kernel.get("profiling", False) if enabled is None else enabled
+        self.window_seconds: float = window_seconds or cfg_kernel.get("profile_window_seconds", 300.0)
+        self.log_every_ticks: int = (
+            cfg_kernel.get("profile_log_every_ticks", 0) if log_every_ticks is None else log_every_ticks
+        )
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(name, LatencyHistogram(self.window_seconds))
+        return hist
+
+    def measure(self, kind: str, name: Any = ""):
+        """Context manager timing one `kind:name` section (no-op when disabled).
+
+        `name` may be a callable; its qualified name is only resolved when enabled.
+        """
+        if not self.enabled:
+            return _NULL
+        if callable(name):
+            name = getattr(name, "__qualname__", repr(name))
+        return _Timer(self.histogram(f"{kind}:{name}" if name else kind))
+
+    def record(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: hist.snapshot() for name, hist in sorted(self.histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms = {}
+
+    def maybe_log(self, tick_count: int) -> None:
+        """Log the per-phase summary every `log_every_ticks` ticks."""
+        if not self.enabled or self.log_every_ticks <= 0 or tick_count % self.log_every_ticks:
+            return
+        parts = []
+        for name, snap in self.stats().items():
+            if snap.get("count"):
+                parts.append(f"{name} p50={snap['p50'] * 1000:.1f}ms p99={snap['p99'] * 1000:.1f}ms n={snap['count']}")
+        if parts:
+            logger.info(f"tick {tick_count} profile: " + "; ".join(parts))
+
+
+PROFILER = TickProfiler()
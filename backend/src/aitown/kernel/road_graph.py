@@ -0,0 +1,147 @@
+"""Road graph and multi-hop route planning.
+
+`RoadGraph` turns the road table into sorted adjacency lists and answers
+shortest-path queries with BFS (roads are unweighted), caching the BFS tree of
+every source place it was asked about.
+
+`RoutePlanner` keeps a queue of remaining hops per travelling NPC. It is
+subscribed to NPC_DECISION as a batch subscriber and publishes the next `move`
+of every route each tick; travelling NPCs are reported busy to the bus so they
+are not asked for a decision until their last move has been executed.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from aitown.kernel.event_bus import EventType
+from aitown.repos.event_repo import Event
+
+
+class RoadGraph:
+    """Adjacency index over roads; every road can be travelled both ways (as in move)."""
+
+    def __init__(self, roads: Iterable = ()):
+        adjacency: Dict[str, set] = {}
+        for road in roads:
+            a, b = str(road.from_place), str(road.to_place)
+            adjacency.setdefault(a, set()).add(b)
+            adjacency.setdefault(b, set()).add(a)
+        # sorted so BFS (and therefore every route) is deterministic
+        self.adjacency: Dict[str, Tuple[str, ...]] = {k: tuple(sorted(v)) for k, v in adjacency.items()}
+        self._parents: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def neighbors(self, place_id) -> Tuple[str, ...]:
+        return self.adjacency.get(str(place_id), ())
+
+    def connected(self, from_place, to_place) -> bool:
+        return str(to_place) in self.neighbors(from_place)
+
+    def _bfs(self, source: str) -> Dict[str, Optional[str]]:
+        parents = self._parents.get(source)
+        if parents is None:
+            parents = {source: None}
+            frontier = deque([source])
+            while frontier:
+                here = frontier.popleft()
+                for there in self.adjacency.get(here, ()):
+                    if there not in parents:
+                        parents[there] = here
+                        frontier.append(there)
+            self._parents[source] = parents
+        return parents
+
+    def shortest_path(self, from_place, to_place) -> Optional[List[str]]:
+        """Hops from `from_place` to `to_place` (excluding the start), or None if unreachable."""
+        source, target = str(from_place), str(to_place)
+        if source == target:
+            return []
+        parents = self._bfs(source)
+        if target not in parents:
+            return None
+        path = []
+        while target != source:
+            path.append(target)
+            target = parents[target]
+        path.reverse()
+        return path
+
+
+class RoutePlanner:
+    """Routes of travelling NPCs over the road graph of a StaticCatalog."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.routes: Dict[str, Deque[str]] = {}
+        self._graph: Optional[RoadGraph] = None
+        self._graph_version = -1
+
+    @property
+    def graph(self) -> RoadGraph:
+        roads = self.catalog.roads
+        if self._graph is None or self._graph_version != self.catalog.version:
+            self._graph = RoadGraph(roads)
+            self._graph_version = self.catalog.version
+        return self._graph
+
+    def plan(self, npc_id, from_place, to_place) -> Optional[List[str]]:
+        """Replace the NPC's route with the shortest one; returns the hops or None."""
+        path = self.graph.shortest_path(from_place, to_place)
+        self.cancel(npc_id)
+        if path:
+            self.routes[str(npc_id)] = deque(path)
+        return path
+
+    def next_hop(self, npc_id) -> Optional[str]:
+        """Pop the next hop of the NPC's route; the (empty) route stays until `settle`."""
+        route = self.routes.get(str(npc_id))
+        return route.popleft() if route else None
+
+    def settle(self, npc_id) -> None:
+        """Called after a move was executed: forget the route once it is used up."""
+        route = self.routes.get(str(npc_id))
+        if route is not None and not route:
+            del self.routes[str(npc_id)]
+
+    def cancel(self, npc_id) -> None:
+        self.routes.pop(str(npc_id), None)
+
+    def is_travelling(self, npc_id) -> bool:
+        return str(npc_id) in self.routes
+
+    def remaining(self, npc_id) -> List[str]:
+        return list(self.routes.get(str(npc_id), ()))
+
+    def discarded(self, event: Event) -> None:
+        """Bus discard listener: a lost move ends the trip, so the NPC decides again."""
+        payload = event.payload if isinstance(event.payload, dict) else {}
+        if payload.get("action_type") in ("move", "move_to"):
+            self.cancel(payload.get("npc_id", event.npc_id))
+
+    def advance(self, event_bus, events: List[Event]) -> int:
+        """NPC_DECISION batch subscriber: publish the next hop of every route."""
+        published = 0
+        for npc_id in sorted(self.routes):
+            hop = self.next_hop(npc_id)
+            if hop is None:
+                # the last move was executed without a settle, or was lost
+                self.cancel(npc_id)
+                continue
+            enqueued = event_bus.publish(
+                Event(
+                    event_type=EventType.NPC_ACTION,
+                    npc_id=npc_id,
+                    payload={"action_type": "move", "npc_id": npc_id, "place_id": hop},
+                )
+            )
+            if not enqueued:
+                # the bus refused or dropped the move (e.g. its road is gone): end the trip
+                self.cancel(npc_id)
+                continue
+            published += 1
+        if published:
+            logger.debug(f"autopilot moved {published} travelling NPCs")
+        return published
@@ -10,11 +10,18 @@ import time
 from typing import Optional, Callable
 from loguru import logger
 
+from aitown.helpers.config_helper import get_config
 from aitown.kernel.sim_clock import SimClock, ClockError
 from aitown.kernel.event_bus import InMemoryEventBus
+from aitown.kernel.npc_actions import ActionExecutor
+from aitown.kernel.profiler import PROFILER
+from aitown.kernel.tick_scheduler import TickScheduler
+from aitown.repos.event_archive import EventArchiver
 from aitown.repos.event_repo import EventRepository, Event
 import threading
 
+cfg_kernel = get_config("kernel")
+
 
 class KernelRuntime:
     """A minimal runtime that owns a SimClock and exposes a runtime interface.
@@ -27,6 +34,9 @@ class KernelRuntime:
             self.sim_clock.event_bus = event_bus
         self.worker_thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
+        self.compaction_every_ticks: int = cfg_kernel.get("event_compaction_every_ticks", 0)
+        self.compaction_max_batches: int = cfg_kernel.get("event_compaction_max_batches", 4)
+        self.scheduler = TickScheduler(self.sim_clock.tick_interval_seconds)
 
     # Lifecycle methods delegate to SimClock
     def start(self) -> None:
@@ -42,15 +52,55 @@ class KernelRuntime:
         self.sim_clock.stop()
 
     def working(self) -> None:
-        while 1 :
-            if self._stop_event.is_set():
-                break
-            try:
-                self.sim_clock.step(1)
-            except ClockError as e:
-                logger.error(f"ClockError in working loop: {e}")
-                break
-            time.sleep(self.sim_clock.tick_interval_seconds)  # prevent tight loop
+        """Run ticks at a fixed rate until stop() is called.
+
+        Ticks are scheduled against absolute deadlines (see TickScheduler), so the
+        time spent inside a tick does not push the following ones back.
+        """
+        self.scheduler.interval = self.sim_clock.tick_interval_seconds
+        self.scheduler.start()
+        while not self._stop_event.is_set():
+            for _ in range(self.scheduler.due()):
+                started = time.monotonic()
+                try:
+                    self.sim_clock.step(1)
+                except ClockError as e:
+                    logger.error(f"ClockError in working loop: {e}")
+                    return
+                self.compact_events()
+                self.scheduler.record(time.monotonic() - started)
+                PROFILER.maybe_log(self.sim_clock.tick_count)
+                if self._stop_event.is_set():
+                    return
+            self._stop_event.wait(self.scheduler.time_until_next())
+
+    def compact_events(self, force: bool = False) -> int:
+        """Archive old processed events every `event_compaction_every_ticks` ticks.
+
+        Runs at most `event_compaction_max_batches` batches so a large backlog is
+        drained over several ticks instead of stalling one.
+        """
+        every = self.compaction_every_ticks
+        if not force and (every <= 0 or self.sim_clock.tick_count % every != 0):
+            return 0
+        # processed marks still buffered in the journal are not in the table yet
+        self.event_bus.flush()
+        archiver = EventArchiver(self.event_bus.event_repo)
+        return archiver.compact(max_batches=self.compaction_max_batches)
+
+    def stats(self) -> dict:
+        """Runtime statistics: scheduler lateness/overruns, event bus counters and
+        rolling latency histograms (empty unless `[kernel].profiling` is on)."""
+        return {
+            "tick_count": self.sim_clock.tick_count,
+            "scheduler": dict(self.scheduler.stats),
+            "event_bus": {**self.event_bus.counters, "pending": self.event_bus.pending},
+            "profile": PROFILER.stats(),
+        }
+
+    def reload_static_data(self) -> bool:
+        """Reload the static catalog (items, effects, places, roads) after the tables changed."""
+        return ActionExecutor.catalog.reload()
 
     def running(self) -> bool:
         return self.sim_clock.running
@@ -7,14 +7,26 @@ that expects a `publish(event_name, payload)` method.
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
 import time
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from loguru import logger
 
 from aitown.helpers.config_helper import get_config
+from aitown.kernel.action_registry import ACTIONS
+from aitown.kernel.async_event_bus import AsyncEventBus
+from aitown.kernel.batch_executor import BatchActionExecutor, load_npc
 from aitown.kernel.event_bus import EventType, InMemoryEventBus
 from aitown.kernel.npc_actions import ActionExecutor
+from aitown.kernel.process_event_bus import ProcessEventBus
+from aitown.kernel.profiler import PROFILER
+from aitown.models.event_model import DISCARDED
+from aitown.repos.event_repo import Event, EventRepository
+from aitown.repos.npc_state_store import NpcStateStore
 from aitown.repos.town_repo import TownRepository
+from aitown.repos.unit_of_work import UnitOfWork
 
 
 class ClockError(Exception):
@@ -24,18 +36,111 @@ cfg_town = get_config("town")
 cfg_kernel = get_config("kernel")
 
 
+TICKS_PER_DAY = 24  # one tick is one simulated hour
+
+
+def format_town_time(total_ticks: int) -> str:
+    """Format a tick count as in-simulation time ('DD-HH')."""
+    days = total_ticks // TICKS_PER_DAY
+    hours = total_ticks % TICKS_PER_DAY
+    return f"第{days}天{hours:02d}点"
+
+
+# town_id -> (sim_start_time, tick_interval_seconds); see get_clock_context
+_clock_context: Dict[str, Tuple[float, float]] = {}
+
+
+def get_clock_context(town_id: Optional[str] = None) -> Tuple[float, float]:
+    """Return (sim_start_time, tick_interval_seconds) for a town, cached per process.
+
+    The start time is read from the town table once; TownRepository.set_sim_start_time
+    invalidates the cache.
+    """
+    town_id = town_id or cfg_town.get("town_id", "town:001")
+    ctx = _clock_context.get(town_id)
+    if ctx is None:
+        start = TownRepository().get_sim_start_time(town_id)
+        if start is None:
+            raise ClockError(f"sim_start_time is not set for {town_id}")
+        ctx = (start, cfg_kernel.get("tick_interval_seconds", 90.0))
+        _clock_context[town_id] = ctx
+    return ctx
+
+
+def invalidate_clock_context(town_id: Optional[str] = None) -> None:
+    """Drop the cached clock context of a town (all towns if town_id is None)."""
+    if town_id is None:
+        _clock_context.clear()
+    else:
+        _clock_context.pop(town_id, None)
+
+
 class SimClock:
-    def __init__(self):
+    """Tick driver for the event bus.
+
+    With `virtual=True` (default `[kernel].virtual_clock`) the clock is headless:
+    `now()` is derived from the tick count instead of `time.time()`, and the bus
+    stamps its events with that virtual time, so `fast_forward` can run simulated
+    days back to back without sleeping.
+
+    `conn` is the database the town and the bus' events are stored in (default
+    `[repos].db_path`); headless runs pass the scratch copy ActionExecutor is bound to.
+    """
+
+    def __init__(self, virtual: Optional[bool] = None, conn=None):
         # load configuration
         self.town_id: str = cfg_town.get("town_id", "town:001")
-        self.town_repo = TownRepository(None)
+        self.town_repo = TownRepository(conn)
         self.tick_interval_seconds: float = cfg_kernel.get("tick_interval_seconds", 90.0)
-        self.event_bus: InMemoryEventBus = InMemoryEventBus()
-        self.event_bus.subscribe(EventType.NPC_ACTION, ActionExecutor.event_listener)
+        bus_kind = cfg_kernel.get("event_bus", "sync")
+        if bus_kind == "async":
+            self.event_bus: InMemoryEventBus = AsyncEventBus()
+        elif bus_kind == "process":
+            self.event_bus: InMemoryEventBus = ProcessEventBus()
+        else:
+            self.event_bus: InMemoryEventBus = InMemoryEventBus()
+        if conn is not None:
+            self.event_bus.event_repo = EventRepository(conn)
+        if cfg_kernel.get("batch_actions", False):
+            self.batch_executor = BatchActionExecutor(ActionExecutor.conn, ActionExecutor.context)
+            self.event_bus.subscribe_batch(EventType.NPC_ACTION, self.batch_executor.execute)
+        else:
+            self.event_bus.subscribe(EventType.NPC_ACTION, ActionExecutor.event_listener)
+        # malformed actions (and, if enabled, those whose preconditions fail) are
+        # rejected when published, not when executed
+        if cfg_kernel.get("preconditions_at_publish", True):
+            self.event_bus.action_validator = ACTIONS.validator(
+                ActionExecutor.context, functools.partial(load_npc, ActionExecutor.conn)
+            )
+        else:
+            self.event_bus.action_validator = ACTIONS.validate
+        # NPCs on a move_to route are moved by the planner instead of deciding
+        self.event_bus.subscribe_batch(EventType.NPC_DECISION, ActionExecutor.routes.advance)
+        self.event_bus.busy_checks.append(ActionExecutor.routes.is_travelling)
+        # a hop the bus drops, coalesces away or rejects later ends the trip
+        self.event_bus.discard_listeners.append(ActionExecutor.routes.discarded)
+        # NPCs sleeping or working for several hours only decide when they are done
+        self.event_bus.busy_checks.append(ActionExecutor.activities.is_busy)
+        # statuses stored by an earlier run: end those activities before the NPCs decide
+        ActionExecutor.resume_activities()
+        self.npc_store: Optional[NpcStateStore] = None
+        if cfg_kernel.get("npc_state_store", False):
+            try:
+                self.npc_store = NpcStateStore(ActionExecutor.conn)
+            except ImportError as e:
+                logger.warning(f"npc_state_store disabled: {e}")
 
         self._running: bool = False
         self._last_tick_ts: Optional[float] = None
         self._tick_count: int = 0 # sim hour
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.tick_unit_of_work: bool = cfg_kernel.get("tick_unit_of_work", True)
+        self.virtual: bool = cfg_kernel.get("virtual_clock", False) if virtual is None else virtual
+        self._start_ts: float = time.time()
+        if self.virtual:
+            self.event_bus.clock = self.now
+        # ledger and memory entries are stamped with this clock's time (virtual or not)
+        ActionExecutor.context.clock = self.now
 
     def start(self) -> None:
         if self._running:
@@ -43,11 +148,15 @@ class SimClock:
         if self.tick_interval_seconds < 0:
             raise ClockError("tick_interval_seconds must be non-negative")
         self._running = True
-        self._last_tick_ts = time.time()
-        self.town_repo.set_sim_start_time(self.town_id, self._last_tick_ts)
+        self._start_ts = time.time() - self._tick_count * self.tick_interval_seconds
+        self._last_tick_ts = self.now()
+        self.town_repo.set_sim_start_time(self.town_id, self._start_ts)
 
     def stop(self) -> None:
         self._running = False
+        self.event_bus.flush()
+        if isinstance(self.event_bus, ProcessEventBus):
+            self.event_bus.close()
 
     def step(self, steps: int = 1) -> None:
         if steps < 0:
@@ -56,15 +165,156 @@ class SimClock:
             self._tick()
             # if a real-time delay is desired between steps, caller should sleep
 
+    async def astep(self, steps: int = 1) -> None:
+        """Coroutine variant of step() for callers already running an event loop."""
+        if steps < 0:
+            raise ClockError("steps must be non-negative")
+        for _ in range(steps):
+            await self._atick()
+
     def _tick(self) -> None:
         """Run one tick cycle: pre_tick -> on_tick -> post_tick."""
-        self.event_bus.pre_tick()
-        self.event_bus.on_tick()
-        self.event_bus.post_tick()
+        if isinstance(self.event_bus, AsyncEventBus):
+            # keep one loop for the clock so async clients can reuse their connections
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._atick())
+            return
+        with PROFILER.measure("tick"):
+            with PROFILER.measure("phase", "pre_tick"), self._unit_of_work():
+                ActionExecutor.begin_tick(self._tick_count, self._tick_count // TICKS_PER_DAY)
+                self.event_bus.pre_tick()
+                ActionExecutor.ledger.flush()
+                self._tick_npc_store()
+            with PROFILER.measure("phase", "on_tick"):
+                self.event_bus.on_tick()
+            with PROFILER.measure("phase", "post_tick"):
+                self.event_bus.post_tick()
 
         # update internal state
         self._tick_count += 1
-        self._last_tick_ts = time.time()
+        self._last_tick_ts = self.now()
+
+    def _tick_npc_store(self) -> None:
+        """Needs decay for the whole town, re-reading only the rows actions wrote."""
+        written, ActionExecutor.context.written = ActionExecutor.context.written, set()
+        if self.npc_store is not None:
+            self.npc_store.invalidate(written)
+            self.npc_store.tick()
+
+    def _unit_of_work(self):
+        """One transaction for all action writes of pre_tick (`[kernel].tick_unit_of_work`)."""
+        if not self.tick_unit_of_work:
+            return contextlib.nullcontext()
+        return UnitOfWork(ActionExecutor.conn)
+
+    async def _atick(self) -> None:
+        """Awaitable tick cycle for an AsyncEventBus."""
+        with PROFILER.measure("tick"):
+            with PROFILER.measure("phase", "pre_tick"), self._unit_of_work():
+                ActionExecutor.begin_tick(self._tick_count, self._tick_count // TICKS_PER_DAY)
+                await self.event_bus.pre_tick()
+                ActionExecutor.ledger.flush()
+                self._tick_npc_store()
+            with PROFILER.measure("phase", "on_tick"):
+                await self.event_bus.on_tick()
+            with PROFILER.measure("phase", "post_tick"):
+                await self.event_bus.post_tick()
+
+        self._tick_count += 1
+        self._last_tick_ts = self.now()
+
+    def replay(
+        self,
+        events: Optional[Iterable[Event]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        after_id: int = 0,
+        page_size: int = 1000,
+        event_repo: Optional[EventRepository] = None,
+    ) -> int:
+        """Re-apply persisted NPC_ACTION events without sleeping or asking the LLM.
+
+        Events are streamed from `event_repo` (default: the bus' repository) in id
+        order, or taken from `events` (e.g. `read_archive(...)`), and passed to the
+        bus' NPC_ACTION subscribers (ActionExecutor.event_listener) one by one;
+        batch subscribers receive them in chunks of `page_size`.
+        Nothing is re-published or re-persisted and no NPC_DECISION fan-out happens,
+        so world state is rebuilt as fast as the action path allows. The ledger
+        already holds the entries of the replayed actions, so it records nothing
+        during the replay.
+
+        Events the bus dropped or coalesced away (stored as DISCARDED) are skipped.
+        The others are grouped into the ticks that executed them, by `processed_at`
+        counted from the town's sim_start_time, and `ActionExecutor.begin_tick` runs
+        before each group as it did live (shops restock, activities end).
+
+        Returns:
+            Number of events replayed.
+        """
+        if events is None:
+            repo = event_repo or self.event_bus.event_repo
+            # replayed ranges must include everything the journal still buffers
+            self.event_bus.flush()
+            events = repo.iter_events(
+                event_type=EventType.NPC_ACTION,
+                since=since,
+                until=until,
+                after_id=after_id,
+                processed_only=True,
+                page_size=page_size,
+            )
+        callbacks = self.event_bus.dispatch.get(EventType.NPC_ACTION)
+        batch_callbacks = self.event_bus.dispatch.batch(EventType.NPC_ACTION)
+        count = 0
+        chunk: list[Event] = []
+        context = ActionExecutor.context
+        # records of live actions still go to the ledger
+        context.commit()
+        ledger, context.ledger = context.ledger, None
+        interval = self.tick_interval_seconds or 1.0
+        start = self.town_repo.get_sim_start_time(self.town_id)
+        tick: Optional[int] = None
+
+        def run_batch() -> None:
+            nonlocal chunk
+            if chunk:
+                for cb in batch_callbacks:
+                    cb(self.event_bus, chunk)
+                chunk = []
+
+        t0 = time.perf_counter()
+        try:
+            for evt in events:
+                if evt.processed == DISCARDED:
+                    continue
+                if evt.processed_at is not None:
+                    if start is None or start > evt.processed_at:
+                        # no usable start time: count ticks from the first replayed one
+                        start = evt.processed_at - interval / 2
+                    evt_tick = int((evt.processed_at - start) // interval)
+                    if evt_tick != tick:
+                        run_batch()
+                        tick = evt_tick
+                        ActionExecutor.begin_tick(tick, tick // TICKS_PER_DAY)
+                evt.processed = 0
+                evt.processed_at = None
+                for cb in callbacks:
+                    cb(self.event_bus, evt)
+                count += 1
+                if batch_callbacks:
+                    chunk.append(evt)
+                    if len(chunk) >= page_size:
+                        run_batch()
+            run_batch()
+        finally:
+            # drop what the replayed actions recorded
+            context.commit()
+            context.ledger = ledger
+        elapsed = time.perf_counter() - t0
+        if count:
+            logger.info(f"replayed {count} events in {elapsed:.3f}s ({count / max(elapsed, 1e-9):.0f} events/s)")
+        return count
 
     @property
     def running(self) -> bool:
@@ -74,14 +324,52 @@ class SimClock:
     def tick_count(self) -> int:
         return self._tick_count
     
+    def now(self) -> float:
+        """Current timestamp: wall clock, or start + ticks * interval when virtual."""
+        if self.virtual:
+            return self._start_ts + self._tick_count * self.tick_interval_seconds
+        return time.time()
+
+    def town_time(self) -> str:
+        """In-simulation time of this clock, from its tick count."""
+        return format_town_time(self._tick_count)
+
+    def fast_forward(self, days: float = 1.0, ticks: Optional[int] = None) -> dict:
+        """Run `days` simulated days (or exactly `ticks` ticks) without sleeping.
+
+        Returns:
+            dict with `ticks`, `elapsed_seconds` and `ticks_per_second`.
+        """
+        if ticks is None:
+            ticks = int(days * TICKS_PER_DAY)
+        if ticks < 0:
+            raise ClockError("ticks must be non-negative")
+        if self.virtual:
+            # the bus may have been swapped since __init__
+            self.event_bus.clock = self.now
+            ActionExecutor.context.clock = self.now
+        started = time.perf_counter()
+        self.step(ticks)
+        self.event_bus.flush()
+        elapsed = time.perf_counter() - started
+        return {
+            "ticks": ticks,
+            "elapsed_seconds": elapsed,
+            "ticks_per_second": ticks / elapsed if elapsed > 0 else float("inf"),
+        }
+
     @staticmethod
     def get_town_time_from_timestamp(timestamp: float) -> str:
         """Convert a real-world timestamp to in-simulation time as 'DD-HH'."""
-        town_id = cfg_town.get("town_id", "town:001")
-        tick_interval_seconds = cfg_kernel.get("tick_interval_seconds", 90.0)
-        town_start_time = TownRepository().get_sim_start_time(town_id)
+        town_start_time, tick_interval_seconds = get_clock_context()
         elapsed = timestamp - town_start_time
-        total_ticks = int(elapsed / tick_interval_seconds)
-        days = total_ticks // 24
-        hours = total_ticks % 24
-        return f"第{days}天{hours:02d}点"
+        return format_town_time(int(elapsed / tick_interval_seconds))
+
+    @staticmethod
+    def get_town_times_from_timestamps(timestamps: Iterable[float]) -> List[str]:
+        """Vectorized get_town_time_from_timestamp: one context lookup for all timestamps."""
+        town_start_time, tick_interval_seconds = get_clock_context()
+        return [
+            format_town_time(int((ts - town_start_time) / tick_interval_seconds))
+            for ts in timestamps
+        ]
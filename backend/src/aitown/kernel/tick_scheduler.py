@@ -0,0 +1,108 @@
+"""Fixed-rate tick scheduler.
+
+Tick k is due at the absolute deadline `start + k * interval`, independent of how
+long previous ticks took, so the tick count keeps pace with the wall clock (which
+`SimClock.get_town_time_from_timestamp` assumes). A late runtime either catches up
+with extra ticks, at most `max_catchup_ticks` per wake-up, or, with catch-up
+disabled, skips the missed deadlines and keeps the original phase.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable, Optional
+
+from loguru import logger
+
+from aitown.helpers.config_helper import get_config
+
+cfg_kernel = get_config("kernel")
+
+
+class TickScheduler:
+    """Compute when ticks are due and keep lateness/overrun statistics.
+
+    Args:
+        interval: seconds between tick deadlines.
+        max_catchup_ticks: extra ticks run in one wake-up when behind; 0 disables
+            catch-up (default `[kernel].max_catchup_ticks`).
+        time_fn: monotonic clock, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_catchup_ticks: Optional[int] = None,
+        time_fn: Callable[[], float] = time.monotonic,
+    ):
+        if max_catchup_ticks is None:
+            max_catchup_ticks = cfg_kernel.get("max_catchup_ticks", 4)
+        self.interval: float = interval
+        self.max_catchup_ticks: int = max_catchup_ticks
+        self.time_fn = time_fn
+        self.next_deadline: Optional[float] = None
+        self.stats: dict = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats = {
+            "ticks": 0,
+            "catchup_ticks": 0,
+            "skipped_ticks": 0,
+            "overruns": 0,
+            "last_lateness": 0.0,
+            "max_lateness": 0.0,
+            "last_overrun": 0.0,
+            "max_overrun": 0.0,
+        }
+
+    def start(self, now: Optional[float] = None) -> None:
+        """Make the first tick due immediately."""
+        self.next_deadline = self.time_fn() if now is None else now
+
+    def time_until_next(self, now: Optional[float] = None) -> float:
+        if self.next_deadline is None:
+            self.start(now)
+        now = self.time_fn() if now is None else now
+        return max(0.0, self.next_deadline - now)
+
+    def due(self, now: Optional[float] = None) -> int:
+        """Number of ticks to run now, advancing the deadline past them."""
+        if self.next_deadline is None:
+            self.start(now)
+        now = self.time_fn() if now is None else now
+        if now < self.next_deadline:
+            return 0
+
+        lateness = now - self.next_deadline
+        self.stats["last_lateness"] = lateness
+        self.stats["max_lateness"] = max(self.stats["max_lateness"], lateness)
+        behind = 1 + (math.floor(lateness / self.interval) if self.interval > 0 else 0)
+
+        if self.max_catchup_ticks <= 0:
+            run = 1
+            skipped = behind - 1
+            if skipped:
+                self.stats["skipped_ticks"] += skipped
+                logger.warning(f"tick {lateness:.3f}s late, skipping {skipped} ticks")
+            self.next_deadline += behind * self.interval
+        else:
+            # deadlines beyond the cap stay due and are picked up on the next wake-up
+            run = min(behind, 1 + self.max_catchup_ticks)
+            self.stats["catchup_ticks"] += run - 1
+            if behind > run:
+                logger.warning(f"tick {lateness:.3f}s late, {behind - run} ticks still behind")
+            self.next_deadline += run * self.interval
+        return run
+
+    def record(self, duration: float) -> float:
+        """Record how long one tick took; returns its overrun past the interval."""
+        overrun = max(0.0, duration - self.interval)
+        self.stats["ticks"] += 1
+        self.stats["last_overrun"] = overrun
+        if overrun > 0:
+            self.stats["overruns"] += 1
+            self.stats["max_overrun"] = max(self.stats["max_overrun"], overrun)
+            logger.warning(f"tick took {duration:.3f}s, {overrun:.3f}s over the {self.interval}s interval")
+        return overrun
@@ -1,7 +1,12 @@
 """Effect model extracted from repos/effect_repo.py"""
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from pydantic import BaseModel
 
+# NPC attributes effects may change, and their bounds
+NPC_ATTRIBUTES = ("hunger", "energy", "mood")
+ATTRIBUTE_MIN = 0
+ATTRIBUTE_MAX = 100
+
 
 class Effect(BaseModel):
     id: Optional[int] = None
@@ -9,21 +14,39 @@ class Effect(BaseModel):
     attribute: str
     change: int
 
-    def apply_to_npc(self, npc_id: str, factor: int = 1):
+    def apply_to_npc(self, npc_id: str, factor: int = 1, npc_repo=None):
         # kept minimal here; behavior remains in repositories/services
-        from aitown.repos.npc_repo import NpcRepository
+        # pass the caller's npc_repo to share its connection (and unit of work)
+        if npc_repo is None:
+            from aitown.repos.npc_repo import NpcRepository
 
-        npc_repo = NpcRepository()
+            npc_repo = NpcRepository()
         npc = npc_repo.get(npc_id)
-        match self.attribute:
-            case "hunger":
-                npc.hunger = max(0, min(100, npc.hunger + self.change * factor))
-                npc_repo.update(npc_id, {"hunger": npc.hunger})
-            case "energy":
-                npc.energy = max(0, min(100, npc.energy + self.change * factor))
-                npc_repo.update(npc_id, {"energy": npc.energy})
-            case "mood":
-                npc.mood = max(0, min(100, npc.mood + self.change * factor))
-                npc_repo.update(npc_id, {"mood": npc.mood})
-            case _:
-                pass
\ No newline at end of file
+        fields = apply_effect_deltas(npc, compile_effect_deltas([self], factor))
+        if fields:
+            npc_repo.update_fields(npc_id, fields)
+
+
+def compile_effect_deltas(effects: Iterable[Optional[Effect]], factor: int = 1) -> Dict[str, int]:
+    """Sum the changes of `effects` (times `factor`) per NPC attribute."""
+    deltas: Dict[str, int] = {}
+    for eff in effects:
+        if eff is None or eff.attribute not in NPC_ATTRIBUTES:
+            continue
+        deltas[eff.attribute] = deltas.get(eff.attribute, 0) + eff.change * factor
+    return deltas
+
+
+def apply_effect_deltas(npc, deltas: Dict[str, int]) -> Dict[str, int]:
+    """Apply attribute deltas to `npc` in place, clamped to 0..100.
+
+    The clamp happens once on the summed delta. Returns the changed fields, ready
+    for a single update.
+    """
+    fields: Dict[str, int] = {}
+    for attr, delta in deltas.items():
+        value = max(ATTRIBUTE_MIN, min(ATTRIBUTE_MAX, getattr(npc, attr) + delta))
+        if value != getattr(npc, attr):
+            setattr(npc, attr, value)
+            fields[attr] = value
+    return fields
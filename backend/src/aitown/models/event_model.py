@@ -3,6 +3,12 @@ from typing import Optional
 from pydantic import BaseModel, Field
 import time
 
+# values of Event.processed
+PENDING = 0
+PROCESSED = 1
+# retired by the bus without being executed (dropped or coalesced away)
+DISCARDED = 2
+
 
 class Event(BaseModel):
     id: Optional[int] = None
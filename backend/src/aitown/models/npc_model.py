@@ -26,12 +26,14 @@ class NPC(BaseModel):
     energy: int = 100
     mood: int = 100
     inventory: dict[str, int] = Field(default_factory=dict)
+    # money in bronze; see currency_helper.materialize_coins
+    balance: int = 0
     long_memory: Optional[str] = None
     is_dead: int = 0
     created_at: float = Field(default_factory=time.time)
     updated_at: Optional[float] = None
 
-    def remember(self, memory_repo, content: str) -> bool:
+    def remember(self, memory_repo, content: str, created_at: Optional[float] = None) -> bool:
         mr = memory_repo
         if mr is None:
             from aitown.repos.memory_repo import MemoryEntryRepository
@@ -40,7 +42,9 @@ class NPC(BaseModel):
 
         from aitown.repos.memory_repo import MemoryEntry
 
-        mem = MemoryEntry(npc_id=self.id, content=content)
+        mem = MemoryEntry(npc_id=None if self.id is None else str(self.id), content=content)
+        if created_at is not None:
+            mem.created_at = created_at
         mr.create(mem)
 
         self.long_memory = (self.long_memory or "") + "\n" + content
@@ -57,41 +61,32 @@ class NPC(BaseModel):
     def register_decision_callback(self, event_bus, event):
         # original logic depends on LLM and services; keep simple delegation
         from aitown.helpers.llm_helper import generate
-        import json
-        import re
-        from loguru import logger
-
-        prompt = f"NPC id: {self.id}\nname: {self.name}\n"  # shortened
-        all_ok = True
-        resp = generate(prompt)
-        if not resp:
-            logger.error("NPC.generate returned empty response")
-            all_ok = False
-
-        if all_ok:
-            try:
-                payload = json.loads(resp)
-            except Exception:
-                m = re.search(r"\{[\s\S]*\}", resp or "")
-                if m:
-                    try:
-                        payload = json.loads(m.group(0))
-                    except Exception:
-                        all_ok = False
-                else:
-                    all_ok = False
-
-        if all_ok:
-            if isinstance(payload, dict):
-                payload.setdefault("npc_id", self.id)
-            from aitown.models.event_model import Event
-
-            evt = Event(event_type="NPC_ACTION", payload=payload, npc_id=self.id)
-        else:
-            from aitown.models.event_model import Event
-
-            evt = Event(npc_id=self.id, event_type="NPC_ACTION", payload={"action_type": "idle", "npc_id": self.id})
-        event_bus.publish(evt)
+
+        resp = generate(self.decision_prompt())
+        event_bus.publish(self._action_event_from_response(resp))
+
+    async def register_decision_callback_async(self, event_bus, event):
+        """Coroutine variant of register_decision_callback for AsyncEventBus."""
+        from aitown.helpers.llm_helper import generate_async
+
+        resp = await generate_async(self.decision_prompt())
+        event_bus.publish(self._action_event_from_response(resp))
+
+    def coins(self) -> dict:
+        """Balance as coin counts, e.g. for display."""
+        from aitown.helpers.currency_helper import materialize_coins
+
+        return materialize_coins(self.balance)
+
+    def decision_prompt(self) -> str:
+        return f"NPC id: {self.id}\nname: {self.name}\n"  # shortened
+
+    def _action_event_from_response(self, resp: str):
+        """Parse an LLM response into an NPC_ACTION event, falling back to idle."""
+        from aitown.models.event_model import Event
+
+        payload = parse_action_payload(resp, self.id)
+        return Event(event_type="NPC_ACTION", payload=payload, npc_id=self.id)
 
     def summary_memory(self) -> bool:
         from aitown.helpers.llm_helper import generate
@@ -102,3 +97,43 @@ class NPC(BaseModel):
             self.long_memory = summary
             return True
         return False
+
+
+def parse_action_payload(resp: str, npc_id) -> dict:
+    """Parse an LLM response into an NPC_ACTION payload, falling back to idle.
+
+    Module-level and free of repository access so it can run in a worker process.
+    """
+    import json
+    import re
+    from loguru import logger
+
+    if not resp:
+        logger.error("NPC.generate returned empty response")
+        return {"action_type": "idle", "npc_id": npc_id}
+
+    try:
+        payload = json.loads(resp)
+    except Exception:
+        m = re.search(r"\{[\s\S]*\}", resp)
+        if not m:
+            return {"action_type": "idle", "npc_id": npc_id}
+        try:
+            payload = json.loads(m.group(0))
+        except Exception:
+            return {"action_type": "idle", "npc_id": npc_id}
+
+    if isinstance(payload, dict):
+        payload.setdefault("npc_id", npc_id)
+    return payload
+
+
+def decide_action(npc_data: dict) -> dict:
+    """Ask the LLM for the next action of an NPC snapshot (`NPC.model_dump()`).
+
+    Used by ProcessEventBus workers; returns the NPC_ACTION payload.
+    """
+    from aitown.helpers.llm_helper import generate
+
+    npc = NPC(**npc_data)
+    return parse_action_payload(generate(npc.decision_prompt()), npc.id)
@@ -0,0 +1,146 @@
+"""Compaction of the event table into date-partitioned archive files.
+
+Processed events older than a retention window are moved, in bounded batches,
+into gzip-compressed JSON-lines files named `event-YYYY-MM-DD.jsonl.gz` (UTC date
+of `created_at`) and deleted from the hot table, so its size tracks the live
+backlog instead of the whole history. Run it from cron or by hand:
+
+    aitown-event-archive --retention-seconds 604800
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import gzip
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from aitown.helpers.config_helper import get_config
+from aitown.models.event_model import Event
+from aitown.repos.event_repo import EventRepository
+
+cfg_repos = get_config("repos")
+
+
+def _partition(created_at: Optional[float]) -> str:
+    ts = created_at or 0.0
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+class EventArchiver:
+    """Moves old processed events from the `event` table into archive files.
+
+    Args:
+        event_repo: repository whose connection holds the event table.
+        archive_dir: directory for archive files (default `[repos].event_archive_dir`).
+        retention_seconds: processed events younger than this stay in the table
+            (default `[repos].event_retention_seconds`).
+        batch_size: rows moved per transaction (default `[repos].event_compaction_batch_size`).
+    """
+
+    def __init__(
+        self,
+        event_repo: EventRepository,
+        archive_dir: Optional[str] = None,
+        retention_seconds: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.event_repo = event_repo
+        self.archive_dir = Path(archive_dir or cfg_repos.get("event_archive_dir", "archive/events"))
+        self.retention_seconds = (
+            cfg_repos.get("event_retention_seconds", 86400.0)
+            if retention_seconds is None
+            else retention_seconds
+        )
+        self.batch_size = batch_size or cfg_repos.get("event_compaction_batch_size", 5000)
+
+    def archive_path(self, day: str) -> Path:
+        return self.archive_dir / f"event-{day}.jsonl.gz"
+
+    def _write(self, events: List[Event]) -> None:
+        by_day: Dict[str, List[Event]] = {}
+        for evt in events:
+            by_day.setdefault(_partition(evt.created_at), []).append(evt)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        for day, day_events in by_day.items():
+            # appending opens a new gzip member; gzip readers stream them all
+            with gzip.open(self.archive_path(day), "at", encoding="utf-8") as fh:
+                for evt in day_events:
+                    fh.write(json.dumps(evt.model_dump(), ensure_ascii=False))
+                    fh.write("\n")
+
+    def compact(self, now: Optional[float] = None, max_batches: Optional[int] = None) -> int:
+        """Archive and delete processed events older than the retention window.
+
+        Each batch is written to its archive file before it is deleted, so an
+        interrupted run can at worst archive a batch twice, never lose it.
+
+        Args:
+            now: reference timestamp (defaults to time.time()).
+            max_batches: stop after this many batches (None = until done).
+
+        Returns:
+            Number of events moved out of the table.
+        """
+        cutoff = (now if now is not None else time.time()) - self.retention_seconds
+        conn = self.event_repo.conn
+        moved = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT * FROM event WHERE processed != 0 AND processed_at < ? ORDER BY id LIMIT ?",
+                (cutoff, self.batch_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            events = [self.event_repo._from_row(r) for r in rows]
+            self._write(events)
+            try:
+                cur.executemany("DELETE FROM event WHERE id = ?", [(evt.id,) for evt in events])
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                logger.error(f"Error compacting event table: {e}")
+                break
+            moved += len(events)
+            batches += 1
+        return moved
+
+
+def read_archive(path: Path) -> Iterator[Event]:
+    """Stream the events stored in one archive file."""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield Event.model_validate(json.loads(line))
+
+
+def main():
+    from aitown.helpers.db_helper import load_db
+
+    p = argparse.ArgumentParser(description="Archive old processed events out of the event table")
+    p.add_argument("--db", default=None, help="SQLite DB path (default: [repos].db_path)")
+    p.add_argument("--archive-dir", default=None)
+    p.add_argument("--retention-seconds", type=float, default=None)
+    p.add_argument("--max-batches", type=int, default=None)
+    args = p.parse_args()
+
+    archiver = EventArchiver(
+        EventRepository(load_db(args.db)),
+        archive_dir=args.archive_dir,
+        retention_seconds=args.retention_seconds,
+    )
+    moved = archiver.compact(max_batches=args.max_batches)
+    print(f"archived {moved} events to {archiver.archive_dir}")
+
+
+if __name__ == "__main__":
+    main()
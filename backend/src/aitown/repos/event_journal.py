@@ -0,0 +1,144 @@
+"""Write-behind journal for published events.
+
+Buffers event inserts and processed-marks in memory and writes them to the
+`event` table in a single transaction, instead of one INSERT/UPDATE plus commit
+per event. Event ids are allocated by the journal when an event is appended, so
+callers get a stable id long before the row reaches the database.
+"""
+
+from __future__ import annotations
+
+import enum
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from aitown.models.event_model import PROCESSED, Event
+from aitown.repos.event_repo import EventRepository
+
+
+class DurabilityMode(enum.StrEnum):
+    EVENT = "event"  # write every insert/mark through immediately
+    TICK = "tick"  # buffer until flush() (once per tick) or a threshold is hit
+
+
+class EventJournal:
+    """Buffers event writes for an EventRepository.
+
+    In `DurabilityMode.EVENT` every call is forwarded to the repository right away
+    (one commit per event, as before). In `DurabilityMode.TICK` writes are kept in
+    memory until `flush()` is called, `max_pending` buffered writes accumulate, or
+    the oldest buffered write is older than `max_delay_seconds`.
+
+    If the batch write fails, the buffer is written row by row and the rows that
+    still fail are logged and moved to `quarantine` (the latest `max_pending`
+    are kept), so one bad row cannot block persistence.
+    """
+
+    def __init__(
+        self,
+        event_repo: EventRepository,
+        mode: str = DurabilityMode.TICK,
+        max_pending: int = 1000,
+        max_delay_seconds: float = 5.0,
+    ):
+        self.event_repo = event_repo
+        self.mode = DurabilityMode(mode)
+        self.max_pending = max_pending
+        self.max_delay_seconds = max_delay_seconds
+        self._lock = threading.RLock()
+        self._next_id: Optional[int] = None
+        self._inserts: Dict[int, Event] = {}
+        self._marks: List[Tuple[int, float, int]] = []
+        self._oldest: Optional[float] = None
+        # inserts (Event) and marks (id, processed_at, processed) that could not be written
+        self.quarantine: Deque[Union[Event, Tuple[int, float, int]]] = deque(maxlen=max_pending)
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered writes not yet flushed."""
+        return len(self._inserts) + len(self._marks)
+
+    def _allocate_id(self) -> int:
+        if self._next_id is None:
+            self._next_id = self.event_repo.max_id() + 1
+        event_id = self._next_id
+        self._next_id += 1
+        return event_id
+
+    def append(self, event: Event) -> Optional[int]:
+        """Assign an id to `event` and queue (or write) its insert. Returns the id."""
+        with self._lock:
+            if event.id is None:
+                event.id = self._allocate_id()
+            if self.mode == DurabilityMode.EVENT:
+                return self.event_repo.append_event(event)
+            self._inserts[event.id] = event
+            self._buffered()
+            return event.id
+
+    def mark_processed(self, event_id: int, processed_at: float, processed: int = PROCESSED) -> None:
+        """Queue (or write) the processed flag (PROCESSED or DISCARDED) for an event."""
+        with self._lock:
+            if self.mode == DurabilityMode.EVENT:
+                self.event_repo.mark_processed(event_id, processed_at, processed)
+                return
+            pending = self._inserts.get(event_id)
+            if pending is not None:
+                # not written yet: the insert will carry the processed columns
+                pending.processed = processed
+                pending.processed_at = processed_at
+                return
+            self._marks.append((event_id, processed_at, processed))
+            self._buffered()
+
+    def _buffered(self) -> None:
+        now = time.monotonic()
+        if self._oldest is None:
+            self._oldest = now
+        if (
+            self.pending >= self.max_pending
+            or now - self._oldest >= self.max_delay_seconds
+        ):
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered inserts and marks in one transaction.
+
+        Returns the number of buffered writes stored. The buffer is always emptied:
+        if the transaction fails, the writes are retried one by one and those that
+        fail again are quarantined.
+        """
+        with self._lock:
+            if not self._inserts and not self._marks:
+                return 0
+            inserts, marks = list(self._inserts.values()), self._marks
+            self._inserts = {}
+            self._marks = []
+            self._oldest = None
+            if self.event_repo.write_batch(inserts, marks):
+                return len(inserts) + len(marks)
+            written = 0
+            for event in inserts:
+                if self.event_repo.write_batch([event], []):
+                    written += 1
+                else:
+                    logger.error(f"quarantined event {event.id} ({event.event_type}) that cannot be stored")
+                    self.quarantine.append(event)
+            for mark in marks:
+                if self.event_repo.write_batch([], [mark]):
+                    written += 1
+                else:
+                    logger.error(f"quarantined processed mark of event {mark[0]} that cannot be stored")
+                    self.quarantine.append(mark)
+            return written
+
+    def swap_repo(self, event_repo: EventRepository) -> None:
+        """Flush the buffer to the current repository, then write to `event_repo`."""
+        with self._lock:
+            self.flush()
+            self.event_repo = event_repo
+            self._next_id = None
@@ -3,19 +3,150 @@
 Represents queued events and provides a simple repository for persistence.
 """
 
-import json
-from typing import List, Optional
+import sqlite3
+from typing import Iterable, Iterator, List, Optional, Tuple
 import time
 
-from aitown.models.event_model import Event
+from loguru import logger
+
+from aitown.helpers.codec_helper import PayloadCodec, decode_payload, get_codec
+from aitown.models.event_model import PROCESSED, Event
 from aitown.repos.interfaces import RepositoryInterface
 
 
+_INSERT_SQL = (
+    "INSERT INTO event (id, npc_id, event_type, payload, payload_codec, created_at, processed, processed_at) "
+    "VALUES (?,?,?,?,?,?,?,?)"
+)
+
+
 class EventRepository(RepositoryInterface[Event]):
-    """SQLite-backed repository for Event objects."""
-    def __init__(self, conn = None):
+    """SQLite-backed repository for Event objects.
+
+    Payloads are encoded with a PayloadCodec (default `[repos].event_payload_codec`)
+    and the codec name is stored per row in `payload_codec`.
+    """
+    def __init__(self, conn = None, codec: Optional[str] = None):
         super().__init__(conn)
         self.table_name = "event"
+        self.codec: PayloadCodec = get_codec(codec)
+
+    def _to_row(self, event: Event) -> tuple:
+        return (
+            event.id,
+            event.npc_id,
+            event.event_type,
+            self.codec.encode(event.payload),
+            self.codec.name,
+            event.created_at,
+            event.processed,
+            event.processed_at,
+        )
+
+    @staticmethod
+    def _from_row(row) -> Event:
+        return Event(
+            id=row["id"],
+            npc_id=row["npc_id"],
+            event_type=row["event_type"],
+            payload=decode_payload(row["payload"], row["payload_codec"]),
+            created_at=row["created_at"],
+            processed=row["processed"],
+            processed_at=row["processed_at"],
+        )
+
+    def append_event(self, event: Event) -> Optional[int]:
+        """Insert a single event and commit. Returns the row id.
+
+        If `event.id` is set it is used as the row id, otherwise SQLite assigns one.
+        """
+        cur = self.conn.cursor()
+        try:
+            cur.execute(_INSERT_SQL, self._to_row(event))
+            self.conn.commit()
+            return cur.lastrowid
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logger.error(f"Error appending event: {e}")
+            return None
+
+    def write_batch(
+        self, events: Iterable[Event], marks: Iterable[Tuple[int, float, int]]
+    ) -> bool:
+        """Insert `events` and apply processed `marks` (id, processed_at, processed) in one transaction."""
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(_INSERT_SQL, [self._to_row(evt) for evt in events])
+            cur.executemany(
+                "UPDATE event SET processed = ?, processed_at = ? WHERE id = ?",
+                [(processed, processed_at, event_id) for event_id, processed_at, processed in marks],
+            )
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logger.error(f"Error writing event batch: {e}")
+            return False
+
+    def max_id(self) -> int:
+        """Return the highest event id ever stored, or 0 if there was none.
+
+        The AUTOINCREMENT high-water mark in sqlite_sequence is included, so ids of
+        rows archived away by EventArchiver.compact are never handed out again.
+        """
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM event), "
+            "COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'event'), 0))"
+        )
+        return cur.fetchone()[0]
+
+    def iter_events(
+        self,
+        event_type: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        after_id: int = 0,
+        processed_only: bool = False,
+        page_size: int = 1000,
+    ) -> Iterator[Event]:
+        """Stream events in id order, one page at a time.
+
+        Uses keyset pagination (`id > last_id`) so each page is an index range scan
+        no matter how deep into the table it is.
+
+        Args:
+            event_type: only events of this type.
+            since, until: created_at bounds (inclusive, exclusive).
+            after_id: start after this event id.
+            processed_only: only events that were executed (not pending, dropped or
+                coalesced away).
+            page_size: rows fetched per query.
+        """
+        clauses = ["id > ?"]
+        params: list = []
+        if event_type is not None:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if processed_only:
+            clauses.append(f"processed = {PROCESSED}")
+        sql = f"SELECT * FROM event WHERE {' AND '.join(clauses)} ORDER BY id ASC LIMIT ?"
+        last_id = after_id
+        while True:
+            cur = self.conn.cursor()
+            cur.execute(sql, (last_id, *params, page_size))
+            rows = cur.fetchall()
+            for r in rows:
+                yield self._from_row(r)
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
 
     def get_unprocessed(self, limit: int = 100) -> List[Event]:
         """Return up to `limit` unprocessed events ordered by id."""
@@ -23,28 +154,15 @@ class EventRepository(RepositoryInterface[Event]):
         cur.execute(
             "SELECT * FROM event WHERE processed = 0 ORDER BY id ASC LIMIT ?", (limit,)
         )
-        rows = cur.fetchall()
-        events = []
-        for r in rows:
-            events.append(
-                Event(
-                    id=r["id"],
-                    event_type=r["event_type"],
-                    payload=json.dumps(r["payload"]),
-                    created_at=r["created_at"],
-                    processed=r["processed"],
-                    processed_at=r["processed_at"],
-                )
-            )
-        return events
+        return [self._from_row(r) for r in cur.fetchall()]
 
-    def mark_processed(self, event_id: int, processed_at: str) -> None:
-        """Mark the event row as processed with a timestamp.
+    def mark_processed(self, event_id: int, processed_at: str, processed: int = PROCESSED) -> None:
+        """Mark the event row as processed (or DISCARDED) with a timestamp.
         Should be moved to the service layer
         """
         cur = self.conn.cursor()
         cur.execute(
-            "UPDATE event SET processed = 1, processed_at = ? WHERE id = ?",
-            (processed_at, event_id),
+            "UPDATE event SET processed = ?, processed_at = ? WHERE id = ?",
+            (processed, processed_at, event_id),
         )
         self.conn.commit()
@@ -12,6 +12,7 @@ import json
 from loguru import logger
 from aitown.models.interface import Model
 from aitown.helpers.db_helper import load_db
+from aitown.repos.unit_of_work import active_unit_of_work
 
 T = TypeVar('T', bound=Model)
 
@@ -33,7 +34,24 @@ class RepositoryInterface(Generic[T]):
                     break
         except Exception:
             self.model_cls = None
-        
+
+    def _commit(self) -> None:
+        """Commit, unless a UnitOfWork on this connection will commit for us."""
+        uow = active_unit_of_work(self.conn)
+        if uow is None:
+            self.conn.commit()
+        else:
+            uow.deferred_commits += 1
+
+    def _rollback(self) -> None:
+        """Roll back, unless inside a UnitOfWork.
+
+        A failed statement leaves no changes behind, and rolling back here would
+        discard the other actions of the tick; the action's savepoint handles it.
+        """
+        if active_unit_of_work(self.conn) is None:
+            self.conn.rollback()
+
 
     def create(self, obj: T) -> Optional[T]:
         """Persist a new object and return it, or None on failure."""
@@ -48,11 +66,11 @@ class RepositoryInterface(Generic[T]):
                 values[i] = json.dumps(v)
         try:
             cur.execute(f"INSERT INTO {self.table_name} ({columns}) VALUES ({placeholders})", tuple(values))
-            self.conn.commit()
+            self._commit()
             obj.id = cur.lastrowid
             return obj
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._rollback()
             logger.error(f"Error creating object: {e}")
             return None
         
@@ -61,10 +79,10 @@ class RepositoryInterface(Generic[T]):
         cur = self.conn.cursor()
         try:
             cur.execute(f"DELETE FROM {self.table_name} WHERE id = ?", (id,))
-            self.conn.commit()
+            self._commit()
             return cur.rowcount > 0
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._rollback()
             logger.error(f"Error deleting object: {e}")
             return False
 
@@ -90,6 +108,22 @@ class RepositoryInterface(Generic[T]):
             results.append(self.model_cls.model_validate(row_dict))
         return results
 
+    def update_fields(self, id: int, fields: dict) -> bool:
+        """Update only the given columns of one row in a single statement."""
+        if not fields:
+            return True
+        cur = self.conn.cursor()
+        columns = ', '.join(f"{k}=?" for k in fields)
+        values = [json.dumps(v) if isinstance(v, (dict, list)) else v for v in fields.values()]
+        try:
+            cur.execute(f"UPDATE {self.table_name} SET {columns} WHERE id = ?", tuple(values) + (id,))
+            self._commit()
+            return cur.rowcount > 0
+        except sqlite3.Error as e:
+            self._rollback()
+            logger.error(f"Error updating object: {e}")
+            return False
+
     def update(self, id: int, obj: T) -> bool:
         cur = self.conn.cursor()
         data = obj.model_dump()
@@ -101,9 +135,9 @@ class RepositoryInterface(Generic[T]):
                 values[i] = json.dumps(v)
         try:
             cur.execute(f"UPDATE {self.table_name} SET {columns} WHERE id = ?", tuple(values) + (id,))
-            self.conn.commit()
+            self._commit()
             return cur.rowcount > 0
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._rollback()
             logger.error(f"Error updating object: {e}")
             return False
@@ -0,0 +1,178 @@
+"""Append-only economy ledger.
+
+Every purchase, sale and wage is recorded as a `ledger_entry` row with indexed
+npc_id, place_id, item_id and tick columns. `Ledger.record` only buffers the
+entry; `flush()` (called once per tick by SimClock, inside the tick's unit of
+work) inserts the buffered entries with one executemany and folds them into the
+per-day totals of `ledger_daily`, so dashboards read aggregates instead of
+scanning entries, memories or inventories.
+"""
+
+from __future__ import annotations
+
+import enum
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from aitown.repos.unit_of_work import active_unit_of_work, savepoint
+
+
+class LedgerKind(enum.StrEnum):
+    PURCHASE = "purchase"
+    SALE = "sale"
+    WAGE = "wage"
+
+
+@dataclass(frozen=True, slots=True)
+class LedgerEntry:
+    kind: str
+    npc_id: str
+    place_id: str
+    item_id: str
+    # item quantity (hours for wages)
+    amount: int
+    # bronze; positive when credited to the NPC
+    value: int
+    tick: int
+    day: int
+    created_at: float
+
+
+_INSERT = (
+    "INSERT INTO ledger_entry (kind, npc_id, place_id, item_id, amount, value, tick, day, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_AGGREGATE = (
+    "INSERT INTO ledger_daily (day, kind, place_id, item_id, entries, amount, value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(day, kind, place_id, item_id) DO UPDATE SET "
+    "entries = entries + excluded.entries, amount = amount + excluded.amount, value = value + excluded.value"
+)
+
+
+class Ledger:
+    """Buffered writer and reader of the ledger tables.
+
+    Args:
+        conn: database connection (normally ActionExecutor.conn).
+        max_pending: flush early once this many entries are buffered.
+    """
+
+    def __init__(self, conn, max_pending: int = 1000):
+        self.conn = conn
+        self.max_pending = max_pending
+        self.tick = 0
+        self.day = 0
+        self._pending: List[LedgerEntry] = []
+        self._lock = threading.RLock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def begin_tick(self, tick: int, day: int) -> None:
+        """Tick and simulated day stamped on the entries recorded from now on."""
+        self.tick = tick
+        self.day = day
+
+    def record(
+        self,
+        kind: str,
+        npc_id,
+        value: int,
+        place_id=None,
+        item_id=None,
+        amount: int = 0,
+        created_at: Optional[float] = None,
+    ) -> LedgerEntry:
+        entry = LedgerEntry(
+            str(LedgerKind(kind)),
+            str(npc_id),
+            "" if place_id is None else str(place_id),
+            "" if item_id is None else str(item_id),
+            int(amount),
+            int(value),
+            self.tick,
+            self.day,
+            time.time() if created_at is None else created_at,
+        )
+        with self._lock:
+            self._pending.append(entry)
+            if len(self._pending) >= self.max_pending:
+                self.flush()
+        return entry
+
+    def flush(self) -> int:
+        """Write buffered entries and their daily totals in one transaction.
+
+        Returns the number of entries written. On failure the buffer is kept so the
+        next flush retries it, and 0 is returned.
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            entries = self._pending
+            totals: Dict[Tuple[int, str, str, str], List[int]] = {}
+            for e in entries:
+                total = totals.setdefault((e.day, e.kind, e.place_id, e.item_id), [0, 0, 0])
+                total[0] += 1
+                total[1] += e.amount
+                total[2] += e.value
+            uow = active_unit_of_work(self.conn)
+            with savepoint(self.conn) as sp:
+                try:
+                    cur = self.conn.cursor()
+                    cur.executemany(_INSERT, [astuple(e) for e in entries])
+                    cur.executemany(_AGGREGATE, [(*key, *total) for key, total in totals.items()])
+                except sqlite3.Error as e:
+                    # inside a unit of work only the ledger writes are undone
+                    if uow is None:
+                        self.conn.rollback()
+                    else:
+                        sp.rollback()
+                    logger.error(f"Error flushing ledger: {e}")
+                    return 0
+            if uow is None:
+                self.conn.commit()
+            self._pending = []
+            return len(entries)
+
+    def entries(
+        self,
+        npc_id=None,
+        place_id=None,
+        item_id=None,
+        since_tick: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[LedgerEntry]:
+        """Flushed entries, newest first, filtered on the indexed columns."""
+        where, params = [], []
+        for column, value in (("npc_id", npc_id), ("place_id", place_id), ("item_id", item_id)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(str(value))
+        if since_tick is not None:
+            where.append("tick >= ?")
+            params.append(since_tick)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT kind, npc_id, place_id, item_id, amount, value, tick, day, created_at "
+            f"FROM ledger_entry {clause} ORDER BY id DESC LIMIT ?",
+            (*params, limit),
+        )
+        return [LedgerEntry(*row) for row in cur.fetchall()]
+
+    def daily(self, day: Optional[int] = None) -> List[dict]:
+        """Per-day totals by kind, place and item (all days when `day` is None)."""
+        cur = self.conn.cursor()
+        if day is None:
+            cur.execute("SELECT * FROM ledger_daily ORDER BY day, kind, place_id, item_id")
+        else:
+            cur.execute("SELECT * FROM ledger_daily WHERE day = ? ORDER BY kind, place_id, item_id", (day,))
+        return [dict(row) for row in cur.fetchall()]
@@ -26,8 +26,25 @@ from aitown.kernel.event_bus import EventType
 
 cfg = get_config("npc")
 
+def npc_from_row(row) -> NPC:
+    """NPC model of an `npc` row: inventory decoded, ids of other tables as str."""
+    data = {k: v for k, v in dict(row).items() if v is not None}
+    data["inventory"] = json.loads(data.get("inventory") or "{}")
+    for column in ("player_id", "location_id"):
+        if column in data:
+            data[column] = str(data[column])
+    return NPC.model_validate(data)
+
+
 class NpcRepository(RepositoryInterface[NPC]):
     """SQLite-backed repository for NPC objects."""
     def __init__(self, conn = None):
         super().__init__(conn)
         self.table_name = "npc"
+
+    def get_by_id(self, npc_id) -> Optional[NPC]:
+        """Fetch an NPC by id with its inventory decoded, or None if not found."""
+        cur = self.conn.cursor()
+        cur.execute("SELECT * FROM npc WHERE id = ?", (npc_id,))
+        row = cur.fetchone()
+        return npc_from_row(row) if row else None
@@ -0,0 +1,260 @@
+"""Columnar (struct-of-arrays) store of NPC needs and status.
+
+Town-wide rules such as the per-tick needs decay touch every NPC. Instead of one
+repository update per NPC, `NpcStateStore` keeps hunger/energy/mood/status in
+NumPy arrays indexed by NPC slot, applies the rule to all slots at once and
+writes the rows that actually changed back with one `executemany`.
+
+The arrays stay resident between ticks: the first tick loads the whole table,
+later ticks re-read only the rows other writers reported through `invalidate`
+(the action executors do) and NPCs created since.
+
+NumPy is an optional dependency (`pip install aitown-backend[world]`); creating
+a store without it raises ImportError.
+
+    store = NpcStateStore(conn)
+    store.invalidate(written_npc_ids)
+    store.tick()  # refresh, decay, derive status, sync dirty rows
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from loguru import logger
+
+from aitown.helpers.config_helper import get_config
+from aitown.models.effect_model import ATTRIBUTE_MAX, ATTRIBUTE_MIN, NPC_ATTRIBUTES
+from aitown.models.npc_model import NPCStatus
+from aitown.repos.unit_of_work import active_unit_of_work, savepoint
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+cfg_npc = get_config("npc")
+
+STATUSES = tuple(NPCStatus)
+_STATUS_CODE = {str(s): i for i, s in enumerate(STATUSES)}
+_PEACEFUL, _UNWELL, _AWFUL = (
+    _STATUS_CODE[s] for s in (NPCStatus.PEACEFUL, NPCStatus.UNWELL, NPCStatus.AWFUL)
+)
+# statuses the needs rules may replace (sleeping/working belong to the activity scheduler)
+_DERIVED = (_PEACEFUL, _UNWELL, _AWFUL)
+# ids per "WHERE id IN (...)" query, below SQLite's host parameter limit
+_MAX_IN_PARAMS = 500
+_COLUMNS = "id, hunger, energy, mood, status, is_dead"
+
+
+class NpcStateStore:
+    """NPC needs and status as NumPy columns, synced to the `npc` table in bulk.
+
+    Args:
+        conn: connection of the `npc` table.
+        decay: per-tick change of each need (default `[npc].<need>_decay_per_tick`).
+        unwell_threshold / awful_threshold: lowest need below which an NPC is
+            UNWELL / AWFUL (default `[npc].unwell_threshold` / `[npc].awful_threshold`).
+    """
+
+    def __init__(
+        self,
+        conn,
+        decay: Optional[Mapping[str, int]] = None,
+        unwell_threshold: Optional[int] = None,
+        awful_threshold: Optional[int] = None,
+        capacity: int = 64,
+    ):
+        if np is None:
+            raise ImportError("NpcStateStore requires numpy (pip install aitown-backend[world])")
+        self.conn = conn
+        if decay is None:
+            decay = {attr: cfg_npc.get(f"{attr}_decay_per_tick", 0) for attr in NPC_ATTRIBUTES}
+        self.decay: Dict[str, int] = dict(decay)
+        self.unwell_threshold: int = (
+            cfg_npc.get("unwell_threshold", 30) if unwell_threshold is None else unwell_threshold
+        )
+        self.awful_threshold: int = (
+            cfg_npc.get("awful_threshold", 10) if awful_threshold is None else awful_threshold
+        )
+        self.ids: List = []
+        self.slots: Dict[str, int] = {}
+        self.size = 0
+        self.needs = {attr: np.zeros(capacity, dtype=np.int16) for attr in NPC_ATTRIBUTES}
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.dirty = np.zeros(capacity, dtype=bool)
+        # needs and status as last read from / written to the table
+        self.stored_needs = {attr: np.zeros(capacity, dtype=np.int16) for attr in NPC_ATTRIBUTES}
+        self.stored_status = np.zeros(capacity, dtype=np.int8)
+        self.loaded = False
+        # highest npc id read so far; rows above it are new NPCs
+        self.max_id = 0
+        # ids whose rows were written by someone else since they were read
+        self.stale: Set[str] = set()
+
+    def _grow(self, capacity: int) -> None:
+        def grown(column):
+            out = np.zeros(capacity, dtype=column.dtype)
+            out[: len(column)] = column
+            return out
+
+        self.needs = {attr: grown(col) for attr, col in self.needs.items()}
+        self.status = grown(self.status)
+        self.alive = grown(self.alive)
+        self.dirty = grown(self.dirty)
+        self.stored_needs = {attr: grown(col) for attr, col in self.stored_needs.items()}
+        self.stored_status = grown(self.stored_status)
+
+    def slot(self, npc_id) -> Optional[int]:
+        return self.slots.get(str(npc_id))
+
+    def upsert(
+        self, npc_id, hunger=100, energy=100, mood=100, status=NPCStatus.PEACEFUL, is_dead=0
+    ) -> int:
+        """Put one NPC row into the store; returns its slot.
+
+        Changes of a dirty slot that are not synced yet are kept on top of the row:
+        its need deltas since the last read are reapplied, and its status stands
+        unless the row's status changed meanwhile.
+        """
+        i = self.slots.get(str(npc_id))
+        if i is None:
+            if self.size == len(self.status):
+                self._grow(max(2 * self.size, 1))
+            i = self.size
+            self.size += 1
+            self.ids.append(npc_id)
+            self.slots[str(npc_id)] = i
+        code = _STATUS_CODE.get(str(status), _PEACEFUL)
+        for attr, value in (("hunger", hunger), ("energy", energy), ("mood", mood)):
+            pending = int(self.needs[attr][i]) - int(self.stored_needs[attr][i]) if self.dirty[i] else 0
+            self.needs[attr][i] = min(max(value + pending, ATTRIBUTE_MIN), ATTRIBUTE_MAX)
+            self.stored_needs[attr][i] = value
+        if not self.dirty[i] or code != self.stored_status[i]:
+            self.status[i] = code
+        self.stored_status[i] = code
+        self.alive[i] = not is_dead
+        if isinstance(npc_id, int):
+            self.max_id = max(self.max_id, npc_id)
+        return i
+
+    def load(self) -> int:
+        """(Re)load every NPC row with one query; returns the number of NPCs."""
+        try:
+            rows = self.conn.execute(f"SELECT {_COLUMNS} FROM npc").fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error loading NPC state: {e}")
+            return 0
+        for row in rows:
+            self.upsert(*row)
+        self.loaded = True
+        self.stale.clear()
+        return len(rows)
+
+    def invalidate(self, npc_ids: Iterable) -> None:
+        """Mark rows written outside the store; the next `refresh` re-reads them."""
+        self.stale.update(str(npc_id) for npc_id in npc_ids)
+
+    def refresh(self) -> int:
+        """Re-read the invalidated rows and NPCs created since the last read.
+
+        Loads the whole table the first time. Returns the number of rows read.
+        """
+        if not self.loaded:
+            return self.load()
+        stale = list(self.stale)
+        try:
+            cur = self.conn.cursor()
+            rows = cur.execute(f"SELECT {_COLUMNS} FROM npc WHERE id > ?", (self.max_id,)).fetchall()
+            for start in range(0, len(stale), _MAX_IN_PARAMS):
+                chunk = stale[start : start + _MAX_IN_PARAMS]
+                marks = ", ".join("?" * len(chunk))
+                rows += cur.execute(f"SELECT {_COLUMNS} FROM npc WHERE id IN ({marks})", chunk).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error refreshing NPC state: {e}")
+            return 0
+        for row in rows:
+            self.upsert(*row)
+        self.stale.clear()
+        return len(rows)
+
+    def get(self, npc_id) -> Optional[dict]:
+        i = self.slot(npc_id)
+        if i is None:
+            return None
+        state = {attr: int(col[i]) for attr, col in self.needs.items()}
+        state["status"] = str(STATUSES[self.status[i]])
+        return state
+
+    def apply_deltas(self, deltas: Mapping[str, int], mask=None) -> int:
+        """Add `deltas` to every living NPC (or those in `mask`), clamped to 0..100.
+
+        Returns the number of NPCs that changed.
+        """
+        live = self.alive[: self.size] if mask is None else self.alive[: self.size] & mask
+        changed = np.zeros(self.size, dtype=bool)
+        for attr, delta in deltas.items():
+            if not delta or attr not in self.needs:
+                continue
+            col = self.needs[attr][: self.size]
+            updated = np.clip(col.astype(np.int32) + delta, ATTRIBUTE_MIN, ATTRIBUTE_MAX).astype(col.dtype)
+            moved = live & (updated != col)
+            col[moved] = updated[moved]
+            changed |= moved
+        self.dirty[: self.size] |= changed
+        return int(changed.sum())
+
+    def derive_status(self) -> int:
+        """PEACEFUL/UNWELL/AWFUL from the lowest need; returns the number of NPCs that changed."""
+        n = self.size
+        lowest = np.minimum.reduce([col[:n] for col in self.needs.values()])
+        derived = np.where(
+            lowest < self.awful_threshold,
+            _AWFUL,
+            np.where(lowest < self.unwell_threshold, _UNWELL, _PEACEFUL),
+        ).astype(self.status.dtype)
+        status = self.status[:n]
+        changed = self.alive[:n] & np.isin(status, _DERIVED) & (derived != status)
+        status[changed] = derived[changed]
+        self.dirty[:n] |= changed
+        return int(changed.sum())
+
+    def sync(self) -> int:
+        """Write dirty rows back with one executemany; returns the number of rows written."""
+        slots = np.flatnonzero(self.dirty[: self.size])
+        if not len(slots):
+            return 0
+        hunger, energy, mood = (self.needs[attr] for attr in ("hunger", "energy", "mood"))
+        rows = [
+            (int(hunger[i]), int(energy[i]), int(mood[i]), str(STATUSES[self.status[i]]), self.ids[i])
+            for i in slots.tolist()
+        ]
+        uow = active_unit_of_work(self.conn)
+        with savepoint(self.conn) as sp:
+            try:
+                self.conn.executemany("UPDATE npc SET hunger=?, energy=?, mood=?, status=? WHERE id = ?", rows)
+            except sqlite3.Error as e:
+                # inside a unit of work only this sync is undone
+                if uow is None:
+                    self.conn.rollback()
+                else:
+                    sp.rollback()
+                logger.error(f"Error syncing NPC state: {e}")
+                return 0
+        if uow is None:
+            self.conn.commit()
+        self.dirty[slots] = False
+        for attr, col in self.needs.items():
+            self.stored_needs[attr][slots] = col[slots]
+        self.stored_status[slots] = self.status[slots]
+        return len(rows)
+
+    def tick(self) -> int:
+        """Per-tick needs decay and status derivation for the whole town; returns rows synced."""
+        self.refresh()
+        self.apply_deltas({attr: -amount for attr, amount in self.decay.items()})
+        self.derive_status()
+        return self.sync()
+
@@ -0,0 +1,241 @@
+"""Read-mostly in-memory catalog of items, effects, places and roads.
+
+This data is seeded from static_data.yaml and practically never changes while
+the simulation runs, so ActionExecutor reads it from here instead of doing a SQL
+round-trip plus pydantic validation per lookup. Entries are frozen slot
+dataclasses keyed by `str(id)`. A lookup that misses reads the row through to the
+database once. `reload()` swaps in a fresh snapshot after the tables were edited.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from loguru import logger
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogEffect:
+    id: Any
+    name: str
+    attribute: str
+    change: int
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogItem:
+    id: Any
+    name: str
+    value: int
+    type: str
+    effect_ids: Tuple[str, ...]
+    description: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogPlace:
+    id: Any
+    name: str
+    tags: frozenset
+    # {item_id: amount} (read-only) or a tuple of item ids
+    shop_inventory: Any
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogRoad:
+    id: Any
+    from_place: Any
+    to_place: Any
+    direction: str
+
+
+def _json(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value) if value else None
+    except ValueError:
+        return None
+
+
+def _json_list(value) -> list:
+    decoded = _json(value)
+    return list(decoded) if isinstance(decoded, (list, tuple)) else []
+
+
+def _frozen_stock(value):
+    """Shop stock: read-only {item_id: amount} mapping, or a tuple of item ids."""
+    decoded = _json(value)
+    if isinstance(decoded, dict):
+        return MappingProxyType(dict(decoded))
+    return tuple(decoded) if isinstance(decoded, (list, tuple)) else ()
+
+
+def _effect(row: Mapping) -> CatalogEffect:
+    return CatalogEffect(row["id"], row["name"], row["attribute"], int(row["change"]))
+
+
+def _item(row: Mapping) -> CatalogItem:
+    return CatalogItem(
+        row["id"],
+        row["name"],
+        int(row.get("value") or 0),
+        row.get("type") or "MISC",
+        tuple(_json_list(row.get("effect_ids"))),
+        row.get("description"),
+    )
+
+
+def _place(row: Mapping) -> CatalogPlace:
+    return CatalogPlace(
+        row["id"],
+        row["name"],
+        frozenset(_json_list(row.get("tags"))),
+        _frozen_stock(row.get("shop_inventory")),
+    )
+
+
+def _road(row: Mapping) -> CatalogRoad:
+    return CatalogRoad(row["id"], row["from_place"], row["to_place"], row["direction"])
+
+
+_BUILDERS = {"item": _item, "effect": _effect, "place": _place, "road": _road}
+
+
+class StaticCatalog:
+    """O(1) lookups of static game data by id.
+
+    Args:
+        conn: connection the catalog loads from (and reads misses through).
+            Without one the catalog only holds what `from_records` put in it.
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn
+        self._items: Dict[str, CatalogItem] = {}
+        self._effects: Dict[str, CatalogEffect] = {}
+        self._places: Dict[str, CatalogPlace] = {}
+        self._roads_by_place: Dict[str, Tuple[CatalogRoad, ...]] = {}
+        self._roads: Tuple[CatalogRoad, ...] = ()
+        self.loaded = False
+        # bumped on every (re)load so derived indexes (e.g. RoadGraph) can rebuild
+        self.version = 0
+
+    @classmethod
+    def from_records(
+        cls,
+        items: Iterable[Mapping] = (),
+        effects: Iterable[Mapping] = (),
+        places: Iterable[Mapping] = (),
+        roads: Iterable[Mapping] = (),
+    ) -> "StaticCatalog":
+        """Build a catalog from plain dicts (e.g. static_data_helper records)."""
+        catalog = cls()
+        catalog._install(
+            [_item(dict(r)) for r in items],
+            [_effect(dict(r)) for r in effects],
+            [_place(dict(r)) for r in places],
+            [_road(dict(r)) for r in roads],
+        )
+        return catalog
+
+    def _install(self, items, effects, places, roads) -> None:
+        by_place: Dict[str, list] = {}
+        for road in roads:
+            by_place.setdefault(str(road.from_place), []).append(road)
+            if road.to_place != road.from_place:
+                by_place.setdefault(str(road.to_place), []).append(road)
+        # swap whole dicts so readers never see a half-built snapshot
+        self._items = {str(i.id): i for i in items}
+        self._effects = {str(e.id): e for e in effects}
+        self._places = {str(p.id): p for p in places}
+        self._roads_by_place = {k: tuple(v) for k, v in by_place.items()}
+        self._roads = tuple(roads)
+        self.loaded = True
+        self.version += 1
+
+    def _rows(self, table: str, where: str = "", params: tuple = ()) -> list:
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT * FROM {table} {where}", params)
+        return [dict(r) for r in cur.fetchall()]
+
+    def reload(self) -> bool:
+        """(Re)load every table from the database. Returns False on error."""
+        if self.conn is None:
+            return False
+        try:
+            self._install(
+                [_item(r) for r in self._rows("item")],
+                [_effect(r) for r in self._rows("effect")],
+                [_place(r) for r in self._rows("place")],
+                [_road(r) for r in self._rows("road")],
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error loading static catalog: {e}")
+            return False
+        return True
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.reload()
+
+    def _read_through(self, table: str, cache: Dict[str, Any], key: str):
+        if self.conn is None:
+            return None
+        try:
+            rows = self._rows(table, "WHERE id = ?", (key,))
+        except sqlite3.Error as e:
+            logger.error(f"Error reading {table} {key}: {e}")
+            return None
+        if not rows:
+            return None
+        entry = _BUILDERS[table](rows[0])
+        cache[key] = entry
+        return entry
+
+    def item(self, item_id) -> Optional[CatalogItem]:
+        self._ensure_loaded()
+        key = str(item_id)
+        return self._items.get(key) or self._read_through("item", self._items, key)
+
+    def effect(self, effect_id) -> Optional[CatalogEffect]:
+        self._ensure_loaded()
+        key = str(effect_id)
+        return self._effects.get(key) or self._read_through("effect", self._effects, key)
+
+    def place(self, place_id) -> Optional[CatalogPlace]:
+        self._ensure_loaded()
+        key = str(place_id)
+        return self._places.get(key) or self._read_through("place", self._places, key)
+
+    def effects_of(self, item: CatalogItem) -> list:
+        return [self.effect(eff_id) for eff_id in item.effect_ids]
+
+    def roads_from(self, place_id) -> Tuple[CatalogRoad, ...]:
+        """Roads touching `place_id` (either end)."""
+        self._ensure_loaded()
+        return self._roads_by_place.get(str(place_id), ())
+
+    @property
+    def roads(self) -> Tuple[CatalogRoad, ...]:
+        self._ensure_loaded()
+        return self._roads
+
+    @property
+    def items(self) -> Mapping[str, CatalogItem]:
+        self._ensure_loaded()
+        return MappingProxyType(self._items)
+
+    @property
+    def effects(self) -> Mapping[str, CatalogEffect]:
+        self._ensure_loaded()
+        return MappingProxyType(self._effects)
+
+    @property
+    def places(self) -> Mapping[str, CatalogPlace]:
+        self._ensure_loaded()
+        return MappingProxyType(self._places)
@@ -26,7 +26,11 @@ class TownRepository(RepositoryInterface[Town]):
             "UPDATE town SET sim_start_time = ? WHERE id = ?",
             (sim_start_time, town_id),
         )
-        self.conn.commit()
+        self._commit()
+        # lazy import: kernel.sim_clock imports this module
+        from aitown.kernel.sim_clock import invalidate_clock_context
+
+        invalidate_clock_context(town_id)
 
     def get_sim_start_time(self, town_id: str) -> Optional[float]:
         """ This function should be moved to the service layer """
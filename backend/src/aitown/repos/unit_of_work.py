@@ -0,0 +1,119 @@
+"""Unit of work spanning one tick of NPC actions.
+
+While a UnitOfWork is active on a connection, repositories sharing that
+connection skip their per-call commit (see RepositoryInterface._commit), so all
+NPC, memory and inventory writes of a tick's pre_tick land in one transaction.
+Each action runs in its own savepoint: a failed action is rolled back to it
+without touching the actions that succeeded before it.
+
+    with UnitOfWork(conn):
+        with savepoint(conn) as sp:
+            ...
+            if failed:
+                sp.rollback()
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from loguru import logger
+
+# id(conn) -> active unit of work
+_active: Dict[int, "UnitOfWork"] = {}
+_active_lock = threading.Lock()
+
+
+def active_unit_of_work(conn) -> Optional["UnitOfWork"]:
+    return _active.get(id(conn))
+
+
+class Savepoint:
+    """Handle of one SAVEPOINT; `rollback()` undoes everything since it was taken."""
+
+    def __init__(self, conn, name: Optional[str]):
+        self.conn = conn
+        self.name = name
+        self.rolled_back = False
+
+    def __enter__(self) -> "Savepoint":
+        if self.name:
+            self.conn.execute(f"SAVEPOINT {self.name}")
+        return self
+
+    def rollback(self) -> None:
+        if self.name and not self.rolled_back:
+            self.conn.execute(f"ROLLBACK TO {self.name}")
+        self.rolled_back = True
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.name:
+            return False
+        if exc_type is not None:
+            self.rollback()
+        self.conn.execute(f"RELEASE {self.name}")
+        return False
+
+
+def savepoint(conn) -> Savepoint:
+    """Savepoint inside the active unit of work on `conn` (no-op without one)."""
+    uow = active_unit_of_work(conn)
+    return uow.savepoint() if uow is not None else Savepoint(conn, None)
+
+
+class UnitOfWork:
+    """Context manager grouping repository writes on `conn` into one transaction.
+
+    The transaction is committed on exit, also when an exception escapes: actions
+    that completed stay applied, and the failing one has already been rolled back
+    to its savepoint. Nested units of work on the same connection join the outer one.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        # joined an outer unit of work (or could not start): exit does nothing
+        self.nested = False
+        # repository commits skipped because they were folded into this transaction
+        self.deferred_commits = 0
+        self._savepoints = 0
+
+    def __enter__(self) -> "UnitOfWork":
+        with _active_lock:
+            outer = _active.get(id(self.conn))
+            if outer is not None:
+                self.nested = True
+                return outer
+            _active[id(self.conn)] = self
+        try:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+        except sqlite3.Error as e:
+            # e.g. a closed connection: let the repositories fail (or commit) on their own
+            with _active_lock:
+                _active.pop(id(self.conn), None)
+            self.nested = True
+            logger.error(f"Error starting unit of work: {e}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.nested:
+            return False
+        with _active_lock:
+            _active.pop(id(self.conn), None)
+        try:
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logger.error(f"Error committing unit of work: {e}")
+        return False
+
+    def savepoint(self) -> Savepoint:
+        self._savepoints += 1
+        return Savepoint(self.conn, f"uow_{self._savepoints}")
+
+    def rollback(self) -> None:
+        """Discard everything written in this unit of work so far."""
+        self.conn.rollback()
+        self.conn.execute("BEGIN")
@@ -5,30 +5,97 @@ InMemoryEventBus at system startup. It reads the live `NPC_INSTANCE_LIST`
 exposed by `npc_service` and registers each NPC instance's callbacks for
 memory and decision events.
 """
-from typing import Iterable
+import asyncio
+from typing import Iterable, List
 
+from loguru import logger
+
+from aitown.kernel.async_event_bus import AsyncEventBus
 from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.kernel.process_event_bus import ProcessEventBus
+from aitown.repos.event_repo import Event
 from aitown.services.npc_service import NPC_INSTANCE_LIST
 
 
 class EventService:
     @staticmethod
-    def register_all(event_bus: InMemoryEventBus) -> None:
+    def decide_all(event_bus: InMemoryEventBus, events: List[Event]) -> None:
+        """Batch NPC_DECISION subscriber: ask every live NPC for a decision.
+
+        Reads NPC_INSTANCE_LIST at call time, so NPCs created after startup take part
+        without re-registering.
+        """
+        evt = events[0]
+        for npc in list(NPC_INSTANCE_LIST):
+            if event_bus.npc_busy(npc.id):
+                continue
+            try:
+                npc.register_decision_callback(event_bus, evt)
+            except Exception as e:
+                logger.error(f"decision for npc {npc.id} failed: {e}")
+
+    @staticmethod
+    async def decide_all_async(event_bus: AsyncEventBus, events: List[Event]) -> None:
+        """Coroutine variant of decide_all; decisions run concurrently."""
+        evt = events[0]
+        semaphore = asyncio.Semaphore(event_bus.concurrency)
+
+        async def decide(npc):
+            async with semaphore:
+                await npc.register_decision_callback_async(event_bus, evt)
+
+        results = await asyncio.gather(
+            *(decide(npc) for npc in list(NPC_INSTANCE_LIST) if not event_bus.npc_busy(npc.id)),
+            return_exceptions=True,
+        )
+        for res in results:
+            if isinstance(res, Exception):
+                logger.error(f"NPC decision failed: {res}")
+
+    @staticmethod
+    def decide_all_in_workers(event_bus: ProcessEventBus, events: List[Event]) -> None:
+        """Batch NPC_DECISION subscriber for ProcessEventBus: decisions run in its workers."""
+        event_bus.decide([npc for npc in NPC_INSTANCE_LIST if not event_bus.npc_busy(npc.id)])
+
+    @staticmethod
+    def register_all(event_bus: InMemoryEventBus, batch: bool = False) -> None:
         """Register callbacks for every NPC in NPC_INSTANCE_LIST.
 
-        event_bus must implement `subscribe(event_type, callback)`.
+        event_bus must implement `subscribe(event_type, callback)`. With
+        `batch=True` a single batch subscriber (decide_all) serves all NPCs instead
+        of one subscription per NPC. A ProcessEventBus is always wired in batch mode,
+        since its workers only receive NPC snapshots.
         """
         if not hasattr(event_bus, "subscribe"):
             raise ValueError("event_bus does not expose subscribe(event_type, callback)")
 
+        if isinstance(event_bus, ProcessEventBus):
+            event_bus.subscribe_batch(EventType.NPC_DECISION, EventService.decide_all_in_workers)
+            return
+
+        if batch:
+            decider = (
+                EventService.decide_all_async
+                if isinstance(event_bus, AsyncEventBus)
+                else EventService.decide_all
+            )
+            event_bus.subscribe_batch(EventType.NPC_DECISION, decider)
+            return
+
+        use_async = isinstance(event_bus, AsyncEventBus)
         for npc in list(NPC_INSTANCE_LIST):
             # register decision callback
             try:
-                event_bus.subscribe(EventType.NPC_DECISION, npc.register_decision_callback)
+                callback = (
+                    npc.register_decision_callback_async
+                    if use_async
+                    else npc.register_decision_callback
+                )
+                event_bus.subscribe(EventType.NPC_DECISION, callback)
             except Exception:
                 pass
 
 
-def register_all(event_bus: InMemoryEventBus) -> None:
+def register_all(event_bus: InMemoryEventBus, batch: bool = False) -> None:
     """Convenience wrapper for procedural startup scripts."""
-    EventService.register_all(event_bus)
+    EventService.register_all(event_bus, batch=batch)
@@ -132,7 +132,7 @@ def test_npc_action_sequence_end_to_end(monkeypatch):
     assert updated.location_id == "place:home"
     assert updated.energy == 57
     assert updated.mood == 56
-    assert updated.inventory.get("item_silver_coin") == 2
+    assert updated.coins().get("item_silver_coin") == 2
     assert "item:snack" not in updated.inventory
     assert len(memory_repo.list_by_npc("npc:hero")) == 5
 
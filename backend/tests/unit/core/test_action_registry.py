@@ -0,0 +1,118 @@
+import functools
+import json
+from collections import deque
+
+import pytest
+
+from aitown.helpers.db_helper import init_db
+from aitown.kernel.action_registry import ACTIONS, ActionRegistry, ActionSpec, InvalidAction
+from aitown.kernel.action_rules import ActionContext, can_buy, buy
+from aitown.kernel.batch_executor import load_npc
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.kernel.npc_actions import ActionExecutor
+from aitown.repos.event_repo import Event
+from aitown.repos.static_catalog import StaticCatalog
+
+
+def test_executor_actions_are_registered_with_their_schemas():
+    assert {"move", "move_to", "eat", "sleep", "work", "buy", "sell", "idle"} <= set(ACTIONS.specs)
+    eat = ACTIONS.get("eat")
+    assert eat.handler is ActionExecutor.eat
+    assert [f for f, _ in eat.fields] == ["npc_id", "item_id", "item_amount"]
+    buy_spec = ACTIONS.get("buy")
+    assert (buy_spec.precondition, buy_spec.delta) == (can_buy, buy)
+    assert buy_spec.params({"npc_id": "1", "item_id": "2", "item_amount": 3}) == {"item_id": "2", "item_amount": 3}
+
+
+def test_validate_normalizes_and_rejects():
+    payload = ACTIONS.validate({"action_type": "buy", "npc_id": 7, "item_id": 3, "item_amount": "2", "why": "hungry"})
+    assert payload == {"action_type": "buy", "npc_id": "7", "item_id": "3", "item_amount": 2, "why": "hungry"}
+
+    bad = [
+        "idle",
+        {"action_type": None, "npc_id": "1"},
+        {"action_type": "fly", "npc_id": "1"},
+        {"action_type": "eat", "npc_id": "1", "item_id": "1"},
+        {"action_type": "eat", "npc_id": "1", "item_id": "1", "item_amount": 0},
+        {"action_type": "sleep", "npc_id": "1", "duration_hours": True},
+        {"action_type": "move", "npc_id": "1", "place_id": ""},
+    ]
+    for payload in bad:
+        with pytest.raises(InvalidAction):
+            ACTIONS.validate(payload)
+    # not a registry action: left to custom subscribers
+    assert ACTIONS.validate({"action": "do_something"}) == {"action": "do_something"}
+
+
+def test_custom_action_dispatch():
+    registry = ActionRegistry()
+    calls = []
+
+    def wave(npc_id, times):
+        calls.append((npc_id, times))
+        return True
+
+    registry.register(ActionSpec("wave", (("npc_id", str), ("times", int)), wave))
+    spec = registry.get("wave")
+    assert spec.handler(**spec.arguments(registry.validate({"action_type": "wave", "npc_id": 1, "times": 2})))
+    assert calls == [("1", 2)]
+
+
+def test_bus_rejects_invalid_actions_at_publish():
+    bus = InMemoryEventBus(durability="event")
+    bus.action_validator = ACTIONS.validate
+    bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id="1", payload={"action_type": "eat", "npc_id": "1"}))
+    bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id="1", payload={"action_type": "idle", "npc_id": 1}))
+    assert bus.counters["rejected"] == 1
+    [evt] = bus.drain(EventType.NPC_ACTION)
+    assert evt.payload == {"action_type": "idle", "npc_id": "1"}
+
+
+@pytest.fixture
+def world():
+    conn = init_db(":memory:")
+    conn.execute("INSERT INTO item (id, name, value, type) VALUES (1, 'Bread', 3, 'CONSUMABLE')")
+    conn.execute(
+        "INSERT INTO place (id, name, tags, shop_inventory) VALUES (1, 'Market', ?, ?)",
+        (json.dumps(["SHOP"]), json.dumps({"1": 2})),
+    )
+    conn.execute("INSERT INTO place (id, name, tags) VALUES (2, 'Home', '[]')")
+    conn.execute("INSERT INTO place (id, name, tags) VALUES (3, 'Forest', '[]')")
+    conn.execute("INSERT INTO road (id, from_place, to_place, direction) VALUES (1, 1, 2, 'two-way')")
+    conn.execute("INSERT INTO npc (id, name, location_id, balance) VALUES (1, 'Ann', 1, 5)")
+    conn.commit()
+    context = ActionContext(StaticCatalog(conn))
+    return context, ACTIONS.validator(context, functools.partial(load_npc, conn))
+
+
+def test_validator_rejects_actions_whose_preconditions_fail(world):
+    context, validate = world
+    assert validate({"action_type": "move", "npc_id": 1, "place_id": 2})["place_id"] == "2"
+    assert validate({"action_type": "buy", "npc_id": 1, "item_id": 1, "item_amount": 1})
+    for payload in (
+        {"action_type": "move", "npc_id": 1, "place_id": 3},  # no road
+        {"action_type": "buy", "npc_id": 1, "item_id": 1, "item_amount": 2},  # 6 > balance 5
+        {"action_type": "eat", "npc_id": 1, "item_id": 1, "item_amount": 1},  # nothing to eat
+        {"action_type": "sell", "npc_id": 1, "item_id": 1, "item_amount": 1},
+        {"action_type": "move", "npc_id": 9, "place_id": 2},  # no such NPC
+        {"action_type": "idle", "npc_id": 9},
+    ):
+        with pytest.raises(InvalidAction):
+            validate(payload)
+
+
+def test_validator_sees_shops_restocked(world):
+    context, validate = world
+    context.take_stock(1, 1, 2)
+    assert context.stock_left(1, 1) == 0
+    # the action runs after the next restock
+    assert validate({"action_type": "buy", "npc_id": 1, "item_id": 1, "item_amount": 1})
+
+
+def test_rejected_autopilot_move_ends_the_route(world):
+    context, validate = world
+    bus = InMemoryEventBus(durability="event")
+    bus.action_validator = validate
+    context.routes.routes["1"] = deque(["3"])
+    assert context.routes.advance(bus, []) == 0
+    assert bus.counters["rejected"] == 1 and not context.routes.is_travelling(1)
@@ -0,0 +1,75 @@
+from aitown.kernel.activity_scheduler import ActivityScheduler
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
+
+
+def test_activity_holds_npc_for_its_duration():
+    scheduler = ActivityScheduler()
+    scheduler.tick()
+    scheduler.start("npc:1", "sleep", 3)
+    scheduler.start("npc:2", "work", 1)
+    assert scheduler.is_busy("npc:1") and scheduler.activity("npc:1") == "sleep"
+    assert not scheduler.is_busy("npc:2")
+
+    assert scheduler.tick() == []
+    assert scheduler.remaining("npc:1") == 1
+    assert scheduler.tick() == [("npc:1", "sleep")]
+    assert not scheduler.is_busy("npc:1") and scheduler.remaining("npc:1") == 0
+
+
+def test_busy_npc_costs_one_decision_per_activity():
+    class FakeNPC:
+        def __init__(self, npc_id):
+            self.id = npc_id
+            self.asked = 0
+
+        def decide(self, bus, evt):
+            self.asked += 1
+
+    scheduler = ActivityScheduler()
+    sleeper, other = FakeNPC("npc:1"), FakeNPC("npc:2")
+    bus = InMemoryEventBus(durability="event")
+    bus.busy_checks.append(scheduler.is_busy)
+    bus.subscribe(EventType.NPC_DECISION, sleeper.decide)
+    bus.subscribe(EventType.NPC_DECISION, other.decide)
+
+    for tick in range(8):
+        scheduler.tick()
+        if tick == 0:
+            scheduler.start("npc:1", "sleep", 8)
+        bus.post_tick()
+    # asked only once the 8 hours are over
+    assert (sleeper.asked, other.asked) == (1, 8)
+
+
+def test_resumed_activities_end_at_the_next_tick():
+    scheduler = ActivityScheduler()
+    scheduler.start("npc:1", "work", 4)
+    assert scheduler.resume([("npc:1", "sleep"), ("npc:2", "sleep")]) == 1
+    assert scheduler.activity("npc:1") == "work" and scheduler.is_busy("npc:2")
+    assert scheduler.tick() == [("npc:2", "sleep")]
+
+
+def test_clock_resets_statuses_stored_by_an_earlier_run():
+    from aitown.helpers.db_helper import init_db
+    from aitown.kernel.npc_actions import ActionExecutor
+    from aitown.kernel.sim_clock import SimClock
+
+    conn = init_db(":memory:")
+    conn.execute("INSERT INTO npc (id, name, status) VALUES (1, 'A', 'sleeping')")
+    conn.execute("INSERT INTO npc (id, name, status) VALUES (2, 'B', 'peaceful')")
+    conn.commit()
+    live_conn = ActionExecutor.conn
+    ActionExecutor.bind(conn)
+    try:
+        clock = SimClock(conn=conn)
+        asked = []
+        clock.event_bus.subscribe(EventType.NPC_DECISION, lambda bus, evt: asked.append(
+            [npc_id for npc_id in ("1", "2") if not bus.npc_busy(npc_id)]
+        ))
+        clock.step(1)
+        statuses = [r[0] for r in conn.execute("SELECT status FROM npc ORDER BY id")]
+    finally:
+        ActionExecutor.bind(live_conn)
+    # the sleeper is woken up before the first decisions instead of deciding while "sleeping"
+    assert statuses == ["peaceful", "peaceful"]
+    assert asked == [["1", "2"]]
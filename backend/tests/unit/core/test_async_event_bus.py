@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+
+from aitown.helpers.db_helper import init_db
+from aitown.kernel.async_event_bus import AsyncEventBus
+from aitown.kernel.event_bus import EventType
+from aitown.kernel.sim_clock import SimClock
+from aitown.repos.event_repo import Event, EventRepository
+
+
+def _bus(**kwargs) -> AsyncEventBus:
+    bus = AsyncEventBus(**kwargs)
+    bus.event_repo = EventRepository(init_db(":memory:"))
+    return bus
+
+
+def test_post_tick_runs_decisions_concurrently():
+    bus = _bus(concurrency=8, decision_deadline_seconds=0)
+
+    async def decide(bus, evt):
+        await asyncio.sleep(0.2)
+        bus.publish(Event(event_type=EventType.NPC_ACTION, payload={"action_type": "idle"}))
+
+    for _ in range(5):
+        bus.subscribe(EventType.NPC_DECISION, decide)
+
+    t0 = time.perf_counter()
+    asyncio.run(bus.post_tick())
+    assert time.perf_counter() - t0 < 0.6
+    assert len(bus.drain(EventType.NPC_ACTION)) == 5
+
+
+def test_concurrency_limit_is_respected():
+    bus = _bus(concurrency=2, decision_deadline_seconds=0)
+    running = []
+    peak = []
+
+    async def decide(bus, evt):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    for _ in range(6):
+        bus.subscribe(EventType.NPC_DECISION, decide)
+
+    asyncio.run(bus.post_tick())
+    assert max(peak) == 2
+
+
+def test_deadline_cancels_slow_decisions():
+    bus = _bus(concurrency=4, decision_deadline_seconds=0.05)
+    finished = []
+
+    async def fast(bus, evt):
+        finished.append("fast")
+
+    async def slow(bus, evt):
+        await asyncio.sleep(5)
+        finished.append("slow")
+
+    bus.subscribe(EventType.NPC_DECISION, fast)
+    bus.subscribe(EventType.NPC_DECISION, slow)
+
+    asyncio.run(bus.post_tick())
+    assert finished == ["fast"]
+    assert bus.timed_out == 1
+
+
+def test_sync_subscribers_run_in_threads():
+    bus = _bus(concurrency=4, decision_deadline_seconds=0)
+    called = []
+
+    def decide(bus, evt):
+        called.append(evt.event_type)
+
+    bus.subscribe(EventType.NPC_DECISION, decide)
+    asyncio.run(bus.post_tick())
+    assert called == [EventType.NPC_DECISION]
+
+
+def test_sim_clock_awaits_async_bus():
+    clock = SimClock()
+    clock.event_bus = _bus(concurrency=4, decision_deadline_seconds=0)
+    applied = []
+
+    async def decide(bus, evt):
+        bus.publish(Event(event_type=EventType.NPC_ACTION, payload={"n": clock.tick_count}))
+
+    def apply(bus, evt):
+        applied.append(evt.payload["n"])
+        evt.processed = 1
+
+    clock.event_bus.subscribe(EventType.NPC_DECISION, decide)
+    clock.event_bus.subscribe(EventType.NPC_ACTION, apply)
+
+    clock.step(3)
+    assert clock.tick_count == 3
+    assert applied == [0, 1]
+
+    asyncio.run(clock.astep(1))
+    assert clock.tick_count == 4
+    assert applied == [0, 1, 2]
+
+
+def test_deadline_idle_policy_publishes_fallback():
+    bus = _bus(concurrency=4, decision_deadline_seconds=0.05)
+    bus.deferred_policy = "idle"
+
+    class SlowNPC:
+        id = "npc:1"
+
+        async def decide(self, bus, evt):
+            await asyncio.sleep(5)
+
+    bus.subscribe(EventType.NPC_DECISION, SlowNPC().decide)
+    asyncio.run(bus.post_tick())
+    assert bus.deferred == 1 and bus.counters["deferred"] == 1
+    actions = bus.drain(EventType.NPC_ACTION)
+    assert [(e.npc_id, e.payload["action_type"]) for e in actions] == [("npc:1", "idle")]
+
+
+def test_thread_that_missed_the_deadline_is_not_asked_again():
+    bus = _bus(concurrency=4, decision_deadline_seconds=0.05)
+    release = threading.Event()
+    calls = []
+
+    def decide(bus, evt):
+        calls.append(evt.created_at)
+        release.wait(5)
+
+    async def ticks():
+        await bus.post_tick()
+        await bus.post_tick()
+        assert len(calls) == 1
+        assert bus.deferred == 1 and bus.counters["deferred"] == 2
+        assert bus._dispatch_thread is None
+        release.set()
+        while bus._threads:
+            await asyncio.sleep(0.01)
+        await bus.post_tick()
+
+    bus.subscribe(EventType.NPC_DECISION, decide)
+    asyncio.run(ticks())
+    assert len(calls) == 2
+
+
+def test_deadline_idle_policy_falls_back_for_undecided_npcs_of_a_batch():
+    bus = _bus(concurrency=4, decision_deadline_seconds=0.05)
+    bus.deferred_policy = "idle"
+
+    async def decide_all(bus, events):
+        for npc_id in ("a", "b"):
+            bus.npc_busy(npc_id)
+        bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id="a", payload={"action_type": "work"}))
+        await asyncio.sleep(5)
+
+    bus.subscribe_batch(EventType.NPC_DECISION, decide_all)
+    asyncio.run(bus.post_tick())
+    assert bus.deferred == 1
+    actions = bus.drain(EventType.NPC_ACTION)
+    assert [(e.npc_id, e.payload["action_type"]) for e in actions] == [("a", "work"), ("b", "idle")]
@@ -0,0 +1,156 @@
+import json
+
+import pytest
+
+from aitown.helpers.db_helper import init_db
+from aitown.kernel.action_rules import ActionContext
+from aitown.kernel.batch_executor import BatchActionExecutor
+from aitown.repos.event_repo import Event
+from aitown.repos.ledger import Ledger
+from aitown.repos.static_catalog import StaticCatalog
+
+
+@pytest.fixture
+def conn():
+    conn = init_db(":memory:")
+    conn.execute("INSERT INTO effect (id, name, attribute, change) VALUES (1, 'Hunger +10', 'hunger', 10)")
+    conn.execute(
+        "INSERT INTO item (id, name, value, type, effect_ids) VALUES (1, 'Bread', 3, 'CONSUMABLE', ?)",
+        (json.dumps(["1"]),),
+    )
+    conn.execute(
+        "INSERT INTO place (id, name, tags, shop_inventory) VALUES (1, 'Market', ?, ?)",
+        (json.dumps(["SHOP"]), json.dumps({"1": 3})),
+    )
+    conn.execute("INSERT INTO place (id, name, tags) VALUES (2, 'Home', ?)", (json.dumps(["HOUSE"]),))
+    conn.execute("INSERT INTO road (id, from_place, to_place, direction) VALUES (1, 1, 2, 'two-way')")
+    wallet = json.dumps({"item_bronze_coin": 20})
+    for npc_id in (1, 2, 3):
+        conn.execute(
+            "INSERT INTO npc (id, name, location_id, hunger, inventory) VALUES (?, ?, 1, 50, ?)",
+            (npc_id, f"npc{npc_id}", wallet),
+        )
+    conn.commit()
+    return conn
+
+
+def _action(npc_id, action_type, **payload):
+    payload = {"action_type": action_type, "npc_id": str(npc_id), **payload}
+    return Event(event_type="NPC_ACTION", npc_id=str(npc_id), payload=payload)
+
+
+def _npc(conn, npc_id) -> dict:
+    row = dict(conn.execute("SELECT * FROM npc WHERE id = ?", (npc_id,)).fetchone())
+    row["inventory"] = json.loads(row["inventory"])
+    return row
+
+
+def test_stock_conflicts_resolve_in_event_order(conn):
+    executor = BatchActionExecutor(conn, ActionContext(StaticCatalog(conn)))
+    events = [
+        _action(2, "buy", item_id="1", item_amount=2),
+        _action(1, "buy", item_id="1", item_amount=2),
+        _action(3, "buy", item_id="1", item_amount=1),
+    ]
+    assert executor.execute(None, events) == 3
+    assert all(evt.processed for evt in events)
+    # npc 2 came first and got 2 of the 3 loaves; npc 1 found too few left, npc 3 got the last one
+    # (the legacy coin items are folded into the balance)
+    assert (_npc(conn, 2)["inventory"], _npc(conn, 2)["balance"]) == ({"1": 2}, 14)
+    assert (_npc(conn, 1)["inventory"], _npc(conn, 1)["balance"]) == ({}, 20)
+    assert (_npc(conn, 3)["inventory"], _npc(conn, 3)["balance"]) == ({"1": 1}, 17)
+    memories = [r[0] for r in conn.execute("SELECT content FROM memory_entry WHERE npc_id = '1'")]
+    assert memories == ["npc1 在 Market 放松了一下， 心情变好了"]
+
+
+def test_actions_of_one_npc_apply_in_order_with_one_load(conn):
+    executor = BatchActionExecutor(conn, ActionContext(StaticCatalog(conn)))
+    events = [
+        _action(1, "buy", item_id="1", item_amount=1),
+        _action(1, "eat", item_id="1", item_amount=1),
+        _action(1, "move", place_id=2),
+        _action(1, "sleep", duration_hours=1),
+    ]
+    statements = []
+    conn.set_trace_callback(statements.append)
+    executor.execute(None, events)
+    conn.set_trace_callback(None)
+
+    npc = _npc(conn, 1)
+    assert npc["hunger"] == 60 and npc["location_id"] == 2 and npc["status"] == "sleeping"
+    assert npc["inventory"] == {} and npc["balance"] == 17
+    assert sum("FROM npc WHERE id IN" in s for s in statements) == 1
+    assert conn.execute("SELECT COUNT(*) FROM memory_entry").fetchone()[0] == 4
+
+
+def test_invalid_payload_falls_back_to_idle(conn):
+    executor = BatchActionExecutor(conn, ActionContext(StaticCatalog(conn)))
+    evt = _action(1, "eat", item_id="1")
+    assert executor.execute(None, [evt]) == 1
+    assert _npc(conn, 1)["mood"] == 100 and _npc(conn, 1)["energy"] == 95
+
+
+def test_successful_trades_reach_the_ledger(conn):
+    ledger = Ledger(conn)
+    executor = BatchActionExecutor(conn, ActionContext(StaticCatalog(conn), ledger=ledger))
+    events = [
+        _action(1, "buy", item_id="1", item_amount=2),
+        _action(2, "buy", item_id="1", item_amount=2),
+        _action(1, "sell", item_id="1", item_amount=1),
+    ]
+    assert executor.execute(None, events) == 3
+    assert ledger.flush() == 2
+    assert [(e.kind, e.npc_id, e.value) for e in ledger.entries()] == [("sale", "1", 3), ("purchase", "1", -6)]
+
+
+def test_entries_are_stamped_with_the_context_clock(conn):
+    ledger = Ledger(conn)
+    executor = BatchActionExecutor(conn, ActionContext(StaticCatalog(conn), ledger=ledger, clock=lambda: 1234.0))
+    events = [_action(1, "buy", item_id="1", item_amount=1)]
+    executor.execute(None, events)
+    ledger.flush()
+    assert events[0].processed_at == 1234.0
+    assert [e.created_at for e in ledger.entries()] == [1234.0]
+    assert [r[0] for r in conn.execute("SELECT created_at FROM memory_entry")] == [1234.0]
+
+
+def test_failed_write_leaves_routes_activities_stock_and_ledger_untouched(conn):
+    ledger = Ledger(conn)
+    context = ActionContext(StaticCatalog(conn), ledger=ledger)
+    executor = BatchActionExecutor(conn, context)
+    executor._write = lambda npcs, memories, now: False
+    events = [
+        _action(1, "buy", item_id="1", item_amount=3),
+        _action(2, "move_to", place_id="2"),
+        _action(3, "sleep", duration_hours=4),
+    ]
+    assert executor.execute(None, events) == 0
+    assert not any(evt.processed for evt in events)
+    assert context.stock_left(1, "1") == 3
+    assert not context.routes.is_travelling(2) and not context.activities.is_busy(3)
+    assert ledger.pending == 0
+
+    # the retry next tick applies every action exactly once
+    del executor._write
+    assert executor.execute(None, events) == 3
+    assert context.stock_left(1, "1") == 0 and context.activities.is_busy(3)
+    assert _npc(conn, 1)["inventory"] == {"1": 3} and ledger.pending == 1
+
+
+def test_malformed_events_are_marked_processed(conn):
+    executor = BatchActionExecutor(conn, ActionContext(StaticCatalog(conn)))
+    evt = _action(1, "idle")
+    evt.payload = "eat everything"
+    assert executor.execute(None, [evt]) == 1
+    assert evt.processed == 1
+
+
+def test_shops_restock_when_a_tick_begins(conn):
+    context = ActionContext(StaticCatalog(conn))
+    executor = BatchActionExecutor(conn, context)
+    executor.execute(None, [_action(1, "buy", item_id="1", item_amount=3)])
+    executor.execute(None, [_action(2, "buy", item_id="1", item_amount=1)])
+    assert _npc(conn, 2)["inventory"] == {}
+    context.begin_tick()
+    executor.execute(None, [_action(2, "buy", item_id="1", item_amount=1)])
+    assert _npc(conn, 2)["inventory"] == {"1": 1}
@@ -0,0 +1,37 @@
+from aitown.kernel.dispatcher import SubscriberTable
+
+
+def cb_a(bus, evt):
+    pass
+
+
+def cb_b(bus, evt):
+    pass
+
+
+def test_add_compiles_frozen_tuples():
+    table = SubscriberTable()
+    table.add("X", cb_a)
+    table.add("X", cb_b)
+    table.add_batch("X", cb_a)
+    assert table.get("X") == (cb_a, cb_b)
+    assert table.batch("X") == (cb_a,)
+    assert table.get("missing") == ()
+
+
+def test_remove_and_clear():
+    table = SubscriberTable()
+    table.add("X", cb_a)
+    table.add_batch("X", cb_b)
+    compiled = table.get("X")
+
+    assert table.remove("X", cb_a) is True
+    assert table.remove("X", cb_b) is True
+    assert table.remove("X", cb_b) is False
+    assert table.get("X") == () and table.batch("X") == ()
+    # previously handed-out tuples are unaffected by later changes
+    assert compiled == (cb_a,)
+
+    table.add("Y", cb_a)
+    table.clear()
+    assert table.get("Y") == ()
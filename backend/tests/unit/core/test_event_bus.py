@@ -1,4 +1,8 @@
+import threading
+import time
+
 from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.models.event_model import DISCARDED
 from aitown.repos.event_repo import Event
 
 
@@ -50,10 +54,10 @@ def test_pre_tick_processes_actions():
 
 
 def test_on_tick_marks_processed_events():
-    bus = InMemoryEventBus()
+    bus = InMemoryEventBus(durability="event")
     # Mock event_repo.mark_processed
     marked = []
-    bus.event_repo.mark_processed = lambda id, ts: marked.append((id, ts))
+    bus.event_repo.mark_processed = lambda id, ts, processed=1: marked.append((id, ts))
 
     event1 = Event(event_type=EventType.NPC_DECISION, payload={}, processed=0)
     event2 = Event(event_type=EventType.NPC_ACTION, payload={}, processed=1, id=2)
@@ -100,3 +104,299 @@ def test_publish_sets_created_at_when_zero():
     assert event.created_at == 0
     bus.publish(event)
     assert event.created_at != 0
+
+
+def test_pre_tick_moves_processed_actions_out_of_queue():
+    bus = InMemoryEventBus()
+
+    def mark_done(bus, evt):
+        if evt.payload.get("done"):
+            evt.processed = 1
+
+    bus.subscribe(EventType.NPC_ACTION, mark_done)
+    done = Event(event_type=EventType.NPC_ACTION, payload={"done": True})
+    pending = Event(event_type=EventType.NPC_ACTION, payload={})
+    bus.events = [done, pending]
+
+    bus.pre_tick()
+    assert list(bus.queues[EventType.NPC_ACTION]) == [pending]
+    assert bus.processed == [done]
+
+
+def test_on_tick_only_touches_processed_events():
+    bus = InMemoryEventBus(durability="event")
+    marked = []
+    bus.event_repo.mark_processed = lambda id, ts, processed=1: marked.append(id)
+
+    backlog = [Event(event_type=EventType.NPC_DECISION, payload={}) for _ in range(5)]
+    done = Event(event_type=EventType.NPC_ACTION, payload={}, processed=1, id=7)
+    bus.events = backlog + [done]
+
+    bus.on_tick()
+    assert marked == [7]
+    assert bus.processed == []
+    assert bus.drain(EventType.NPC_DECISION) == backlog
+    assert bus.drain(EventType.NPC_ACTION) == []
+
+
+def _action(npc_id, n=0):
+    return Event(event_type=EventType.NPC_ACTION, npc_id=npc_id, payload={"n": n})
+
+
+def test_full_bus_drops_oldest_action_of_same_npc():
+    bus = InMemoryEventBus(capacity=3, overflow_policy="drop_oldest")
+    a1, b1, a2, a3 = _action("a", 1), _action("b", 1), _action("a", 2), _action("a", 3)
+    for evt in (a1, b1, a2, a3):
+        bus.publish(evt)
+
+    assert bus.pending == 3
+    assert bus.drain(EventType.NPC_ACTION) == [b1, a2, a3]
+    assert bus.counters == {"dropped": 1, "coalesced": 0, "deferred": 0, "rejected": 0}
+    # stored as discarded, so replay does not execute it
+    assert a1.processed == DISCARDED and a1 in bus.processed
+
+
+def test_full_bus_drops_globally_oldest_when_npc_has_nothing_pending():
+    bus = InMemoryEventBus(capacity=2, overflow_policy="drop_oldest")
+    a1, b1, c1 = _action("a"), _action("b"), _action("c")
+    for evt in (a1, b1, c1):
+        bus.publish(evt)
+    assert bus.drain(EventType.NPC_ACTION) == [b1, c1]
+    assert bus.counters["dropped"] == 1
+
+
+def test_full_bus_coalesces_to_latest_action_per_npc():
+    bus = InMemoryEventBus(capacity=3, overflow_policy="coalesce")
+    seen = []
+
+    def apply(bus, evt):
+        seen.append(evt.payload["n"])
+        evt.processed = 1
+
+    bus.subscribe(EventType.NPC_ACTION, apply)
+    for n in range(3):
+        bus.publish(_action("a", n))
+    bus.publish(_action("a", 3))
+
+    assert bus.pending == 1
+    assert bus.counters == {"dropped": 0, "coalesced": 3, "deferred": 0, "rejected": 0}
+    bus.pre_tick()
+    assert seen == [3]
+    assert bus.pending == 0
+
+
+def test_block_policy_waits_for_pre_tick():
+    import threading
+
+    bus = InMemoryEventBus(capacity=1, overflow_policy="block")
+    bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: setattr(evt, "processed", 1))
+    bus.publish(_action("a", 1))
+
+    blocked = _action("b", 2)
+    publisher = threading.Thread(target=bus.publish, args=(blocked,))
+    publisher.start()
+    publisher.join(0.1)
+    assert publisher.is_alive()
+
+    bus.pre_tick()
+    publisher.join(2)
+    assert not publisher.is_alive()
+    assert bus.drain(EventType.NPC_ACTION) == [blocked]
+    assert bus.counters == {"dropped": 0, "coalesced": 0, "deferred": 0, "rejected": 0}
+
+
+def test_block_policy_inside_tick_falls_back_to_dropping():
+    bus = InMemoryEventBus(capacity=1, overflow_policy="block")
+    bus.publish(_action("a", 1))
+
+    def decide(bus, evt):
+        bus.publish(_action("a", 2))
+
+    bus.subscribe(EventType.NPC_DECISION, decide)
+    bus.post_tick()
+    assert [e.payload["n"] for e in bus.drain(EventType.NPC_ACTION)] == [2]
+    assert bus.counters["dropped"] == 1
+
+
+def test_block_policy_with_deadline_does_not_wait_on_the_clock_thread():
+    bus = InMemoryEventBus(capacity=1, overflow_policy="block", decision_deadline_seconds=0.5)
+    bus.publish(_action("a", 1))
+    for n in (2, 3, 4):
+        bus.subscribe(EventType.NPC_DECISION, lambda bus, evt, n=n: bus.publish(_action("a", n)))
+
+    started = time.monotonic()
+    bus.post_tick()
+    # results are published on the clock thread, which must not block on a full bus
+    assert time.monotonic() - started < bus.block_timeout_seconds
+    assert [e.payload["n"] for e in bus.drain(EventType.NPC_ACTION)] == [4]
+
+
+def test_coalescing_executes_only_latest_action_per_npc():
+    bus = InMemoryEventBus(durability="event", action_coalescing="latest")
+    marked = []
+    bus.event_repo.mark_processed = lambda id, ts, processed=1: marked.append(id)
+    executed = []
+
+    def apply(bus, evt):
+        executed.append((evt.npc_id, evt.payload["n"]))
+        evt.processed = 1
+
+    bus.subscribe(EventType.NPC_ACTION, apply)
+    events = [_action("a", 1), _action("b", 1), _action("a", 2), _action("a", 3)]
+    for i, evt in enumerate(events, start=1):
+        evt.id = i
+    bus.events = events
+
+    bus.pre_tick()
+    assert executed == [("b", 1), ("a", 3)]
+    assert bus.counters["coalesced"] == 2
+
+    bus.on_tick()
+    assert sorted(marked) == [1, 2, 3, 4]
+
+
+def test_coalescing_merge_uses_configured_merger():
+    def merger(events):
+        return {"action_type": "eat", "npc_id": "a", "item_amount": sum(e.payload["n"] for e in events)}
+
+    bus = InMemoryEventBus(action_coalescing="merge", action_merger=merger)
+    executed = []
+    bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: executed.append(evt.payload))
+    bus.events = [_action("a", 1), _action("a", 2)]
+
+    bus.pre_tick()
+    assert executed == [{"action_type": "eat", "npc_id": "a", "item_amount": 3}]
+
+
+def test_coalescing_off_executes_every_action():
+    bus = InMemoryEventBus(action_coalescing="off")
+    executed = []
+    bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: executed.append(evt.payload["n"]))
+    bus.events = [_action("a", 1), _action("a", 2)]
+
+    bus.pre_tick()
+    assert executed == [1, 2]
+
+
+def test_batch_subscribers_receive_whole_tick():
+    bus = InMemoryEventBus()
+    per_event = []
+    batches = []
+
+    def apply_all(bus, events):
+        batches.append([e.payload["n"] for e in events])
+        for evt in events:
+            evt.processed = 1
+
+    bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: per_event.append(evt.payload["n"]))
+    bus.subscribe_batch(EventType.NPC_ACTION, apply_all)
+    bus.events = [_action("a", 1), _action("b", 2)]
+
+    bus.pre_tick()
+    assert per_event == [1, 2]
+    assert batches == [[1, 2]]
+    assert bus.pending == 0 and len(bus.processed) == 2
+
+
+def test_batch_decision_subscriber_called_once_per_tick():
+    bus = InMemoryEventBus()
+    calls = []
+    bus.subscribe_batch(EventType.NPC_DECISION, lambda bus, events: calls.append(events))
+    bus.post_tick()
+    assert len(calls) == 1
+    assert [e.event_type for e in calls[0]] == [EventType.NPC_DECISION]
+
+
+def test_unsubscribe_removes_callback():
+    bus = InMemoryEventBus()
+    called = []
+    cb = lambda bus, evt: called.append(evt)
+    bus.subscribe(EventType.NPC_DECISION, cb)
+    assert bus.unsubscribe(EventType.NPC_DECISION, cb) is True
+    bus.post_tick()
+    assert called == []
+
+
+class _SlowNPC:
+    def __init__(self, npc_id, release):
+        self.id = npc_id
+        self.release = release
+
+    def decide(self, bus, evt):
+        self.release.wait(5)
+        bus.publish(_action(self.id, 99))
+
+
+def _deadline_bus(policy):
+    return InMemoryEventBus(durability="tick", decision_deadline_seconds=0.05, deferred_policy=policy)
+
+
+def test_deadline_carries_slow_decisions_to_next_tick():
+    bus = _deadline_bus("carry")
+    release = threading.Event()
+    slow = _SlowNPC("slow", release)
+    bus.subscribe(EventType.NPC_DECISION, lambda bus, evt: bus.publish(_action("fast", 1)))
+    bus.subscribe(EventType.NPC_DECISION, slow.decide)
+
+    bus.post_tick()
+    assert bus.deferred == 1
+    assert [e.npc_id for e in bus.drain(EventType.NPC_ACTION)] == ["fast"]
+
+    # still running: not asked again, counted as deferred again
+    bus.post_tick()
+    assert bus.deferred == 1
+    assert [e.npc_id for e in bus.drain(EventType.NPC_ACTION)] == ["fast", "fast"]
+
+    release.set()
+    time.sleep(0.05)
+    bus.post_tick()
+    assert bus.deferred == 0
+    assert [e.npc_id for e in bus.drain(EventType.NPC_ACTION)][2:] == ["slow", "fast", "slow"]
+    assert bus.counters["deferred"] == 2
+
+
+def test_deadline_idle_policy_replaces_late_decision():
+    bus = _deadline_bus("idle")
+    release = threading.Event()
+    slow = _SlowNPC("slow", release)
+    bus.subscribe(EventType.NPC_DECISION, slow.decide)
+
+    bus.post_tick()
+    release.set()
+    time.sleep(0.05)
+    actions = bus.drain(EventType.NPC_ACTION)
+    assert [(e.npc_id, e.payload["action_type"]) for e in actions] == [("slow", "idle")]
+
+
+def test_deadline_repeat_policy_reuses_last_action():
+    bus = _deadline_bus("repeat")
+    bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: setattr(evt, "processed", 1))
+    bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id="slow", payload={"action_type": "work", "duration_hours": 2}))
+    bus.pre_tick()
+
+    release = threading.Event()
+    bus.subscribe(EventType.NPC_DECISION, _SlowNPC("slow", release).decide)
+    bus.post_tick()
+    release.set()
+    assert [e.payload for e in bus.drain(EventType.NPC_ACTION)] == [
+        {"action_type": "work", "duration_hours": 2}
+    ]
+
+
+def test_deadline_falls_back_per_npc_of_a_batch_decider():
+    bus = _deadline_bus("idle")
+    bus.busy_checks.append(lambda npc_id: npc_id == "busy")
+    release = threading.Event()
+
+    def decide_all(bus, events):
+        npcs = [npc_id for npc_id in ("a", "busy", "b") if not bus.npc_busy(npc_id)]
+        release.wait(5)
+        for npc_id in npcs:
+            bus.publish(_action(npc_id, 99))
+
+    bus.subscribe_batch(EventType.NPC_DECISION, decide_all)
+    bus.post_tick()
+    release.set()
+    assert bus.deferred == 2
+    actions = bus.drain(EventType.NPC_ACTION)
+    assert [(e.npc_id, e.payload["action_type"]) for e in actions] == [("a", "idle"), ("b", "idle")]
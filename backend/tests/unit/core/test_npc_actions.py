@@ -196,7 +196,8 @@ def test_work_rewards_currency_and_consumes_stats(action_env):
     updated = npc_repo.get_by_id("npc:5")
     assert updated.energy == 60
     assert updated.mood == 60
-    assert updated.inventory["item_silver_coin"] == 4
+    assert updated.balance == 40
+    assert updated.coins() == {"item_silver_coin": 4}
     memories = memory_repo.list_by_npc("npc:5")
     assert len(memories) == 1
     assert "工作" in memories[0].content
@@ -224,7 +225,8 @@ def test_work_increments_existing_coin_stack(action_env):
 
     assert ActionExecutor.work("npc:11", 1) is True
     updated = npc_repo.get_by_id("npc:11")
-    assert updated.inventory["item_silver_coin"] == 3
+    assert updated.coins()["item_silver_coin"] == 3
+    assert "item_silver_coin" not in updated.inventory
 
 
 def test_event_listener_falls_back_to_idle_on_failure(action_env):
@@ -402,6 +404,7 @@ def test_buy_success_updates_inventory_and_coins(action_env, monkeypatch):
 
     updated = npc_repo.get_by_id("npc:buyer")
     assert updated.inventory.get("item:potion") == 5
+    assert updated.balance == 10
     assert updated.inventory.get("item_bronze_coin", 0) == 0
     memories = memory_repo.list_by_npc("npc:buyer")
     assert memories and "买了" in memories[0].content
@@ -576,10 +579,13 @@ def test_sell_success_distributes_coins(action_env, monkeypatch):
     assert ActionExecutor.sell("npc:seller", "item:relic", 2) is True
 
     updated = npc_repo.get_by_id("npc:seller")
-    assert updated.inventory.get("item_platinum_coin") == 1
-    assert updated.inventory.get("item_gold_coin") == 2
-    assert updated.inventory.get("item_silver_coin") == 3
-    assert updated.inventory.get("item_bronze_coin") == 4
+    assert updated.balance == 1234
+    assert updated.coins() == {
+        "item_platinum_coin": 1,
+        "item_gold_coin": 2,
+        "item_silver_coin": 3,
+        "item_bronze_coin": 4,
+    }
     assert updated.inventory.get("item:relic") == 0
     memories = memory_repo.list_by_npc("npc:seller")
     assert memories and "卖了" in memories[0].content
@@ -829,10 +835,8 @@ def test_event_listener_handles_sell(action_env, monkeypatch):
     ActionExecutor.event_listener(None, event)
 
     updated = npc_repo.get_by_id("npc:event-seller")
-    assert updated.inventory.get("item_platinum_coin", 0) == 0
-    assert updated.inventory.get("item_gold_coin", 0) == 0
-    assert updated.inventory.get("item_silver_coin", 0) == 5
-    assert updated.inventory.get("item_bronze_coin", 0) == 0
+    assert updated.balance == 50
+    assert updated.coins() == {"item_silver_coin": 5}
     assert updated.inventory.get("item:event_sell", 0) == 0
     assert event.processed == 1
     assert memory_repo.list_by_npc("npc:event-seller")
@@ -939,7 +943,7 @@ def test_event_listener_handles_work(action_env, monkeypatch):
     ActionExecutor.event_listener(None, event)
 
     updated = npc_repo.get_by_id("npc:event-worker")
-    assert updated.inventory.get("item_silver_coin") == 2
+    assert updated.coins().get("item_silver_coin") == 2
     assert memory_repo.list_by_npc("npc:event-worker")
 
 
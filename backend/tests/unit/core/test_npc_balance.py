@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from aitown.helpers.db_helper import init_db
+from aitown.kernel.npc_actions import ActionExecutor
+
+
+@pytest.fixture
+def conn():
+    conn = init_db(":memory:")
+    conn.execute(
+        "INSERT INTO item (id, name, value, type, effect_ids) VALUES (1, 'Bread', 3, 'CONSUMABLE', '[]')"
+    )
+    conn.execute(
+        "INSERT INTO place (id, name, tags, shop_inventory) VALUES (1, 'Market', ?, ?)",
+        (json.dumps(["SHOP", "WORKABLE"]), json.dumps({"1": 10})),
+    )
+    # an old save: money still held as coin items
+    legacy = json.dumps({"item_silver_coin": 2, "item_bronze_coin": 5, "1": 1})
+    conn.execute("INSERT INTO npc (id, name, location_id, inventory) VALUES (1, 'old', 1, ?)", (legacy,))
+    conn.execute("INSERT INTO npc (id, name, location_id, balance) VALUES (2, 'new', 1, 4)")
+    conn.commit()
+    live_conn = ActionExecutor.conn
+    ActionExecutor.bind(conn)
+    yield conn
+    ActionExecutor.bind(live_conn)
+
+
+def _money(conn, npc_id):
+    row = conn.execute("SELECT balance, inventory FROM npc WHERE id = ?", (npc_id,)).fetchone()
+    return row[0], json.loads(row[1])
+
+
+def test_legacy_coin_items_are_folded_into_the_balance(conn):
+    assert ActionExecutor.buy("1", "1", 2)
+    # 25 bronze of coins, minus 2 loaves at 3
+    assert _money(conn, 1) == (19, {"1": 3})
+
+
+def test_work_and_sell_credit_the_balance(conn):
+    assert ActionExecutor.work("1", 1)
+    assert ActionExecutor.sell("1", "1", 1)
+    assert _money(conn, 1) == (25 + 20 + 3, {"1": 0})
+    ActionExecutor.ledger.flush()
+    assert [(e.kind, e.value) for e in ActionExecutor.ledger.entries(npc_id=1)] == [("sale", 3), ("wage", 20)]
+
+
+def test_purchase_beyond_the_balance_is_refused(conn):
+    assert not ActionExecutor.buy("2", "1", 2)
+    assert _money(conn, 2) == (4, {})
+    assert conn.execute("SELECT COUNT(*) FROM ledger_entry").fetchone()[0] == 0
+
+
+def test_coins_are_materialized_from_the_balance(conn):
+    ActionExecutor.work("1", 1)
+    npc = ActionExecutor.npc_repo.get_by_id(1)
+    assert npc.balance == 45 and "item_silver_coin" not in npc.inventory
+    assert npc.coins() == {"item_silver_coin": 4, "item_bronze_coin": 5}
+
+
+def test_actions_of_unknown_npcs_fail(conn):
+    assert not ActionExecutor.perform("work", "9", duration_hours=1)
+    assert conn.execute("SELECT COUNT(*) FROM ledger_entry").fetchone()[0] == 0
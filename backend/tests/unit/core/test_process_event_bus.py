@@ -0,0 +1,81 @@
+import os
+import time
+
+import pytest
+
+from aitown.kernel.event_bus import EventType
+from aitown.kernel.process_event_bus import ProcessEventBus
+from aitown.models.npc_model import NPC, parse_action_payload
+
+
+def _slow_decider(npc_data):
+    # later NPCs answer first, so completion order differs from submit order
+    time.sleep(0.05 * (10 - npc_data["id"]) / 10)
+    return {"action_type": "move", "npc_id": npc_data["id"], "pid": os.getpid()}
+
+
+def _failing_decider(npc_data):
+    if npc_data["id"] == 2:
+        raise RuntimeError("boom")
+    return {"action_type": "work", "npc_id": npc_data["id"]}
+
+
+@pytest.fixture
+def bus_factory():
+    buses = []
+
+    def make(**kwargs):
+        bus = ProcessEventBus(durability="tick", **kwargs)
+        buses.append(bus)
+        return bus
+
+    yield make
+    for bus in buses:
+        bus.close()
+
+
+def test_partition_is_stable():
+    bus = ProcessEventBus(workers=4)
+    assert [bus.partition(f"npc:{i}") for i in range(8)] == [
+        bus.partition(f"npc:{i}") for i in range(8)
+    ]
+    assert all(0 <= bus.partition(i) < 4 for i in range(100))
+
+
+def test_actions_are_published_in_submit_order(bus_factory):
+    bus = bus_factory(workers=3, decider=_slow_decider)
+    npcs = [NPC(id=i) for i in range(10)]
+
+    assert bus.decide(npcs) == 10
+    actions = bus.drain(EventType.NPC_ACTION)
+    assert [a.payload["npc_id"] for a in actions] == list(range(10))
+    assert [a.npc_id for a in actions] == [str(i) for i in range(10)]
+    assert os.getpid() not in {a.payload["pid"] for a in actions}
+    # the same NPC is always served by the same worker
+    pids = {a.npc_id: a.payload["pid"] for a in actions}
+    bus.decide(npcs)
+    again = bus.drain(EventType.NPC_ACTION)[10:]
+    assert {a.npc_id: a.payload["pid"] for a in again} == pids
+
+
+def test_failing_decision_falls_back_to_idle(bus_factory):
+    bus = bus_factory(workers=2, decider=_failing_decider)
+    bus.decide([NPC(id=1), NPC(id=2)])
+    assert [a.payload["action_type"] for a in bus.drain(EventType.NPC_ACTION)] == ["work", "idle"]
+
+
+def test_close_stops_workers(bus_factory):
+    bus = bus_factory(workers=2, decider=_failing_decider)
+    bus.decide([NPC(id=1)])
+    procs = list(bus._procs)
+    bus.close()
+    assert not any(p.is_alive() for p in procs)
+    # restarts lazily
+    assert bus.decide([NPC(id=1)]) == 1
+
+
+def test_parse_action_payload():
+    assert parse_action_payload('{"action_type": "eat"}', 7) == {"action_type": "eat", "npc_id": 7}
+    assert parse_action_payload('ok: {"action_type": "eat"} done', 7)["action_type"] == "eat"
+    assert parse_action_payload("", 7) == {"action_type": "idle", "npc_id": 7}
+    assert parse_action_payload("nonsense", 7) == {"action_type": "idle", "npc_id": 7}
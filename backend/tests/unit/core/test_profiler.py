@@ -0,0 +1,67 @@
+import pytest
+
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.kernel.profiler import (
+    LatencyHistogram,
+    TickProfiler,
+    bucket_index,
+    bucket_value,
+)
+
+
+def test_buckets_are_monotonic_with_bounded_error():
+    previous = -1
+    for micros in list(range(0, 200)) + [10**3, 10**4, 10**6, 123_456_789]:
+        idx = bucket_index(micros)
+        assert idx >= previous
+        previous = idx
+        upper = bucket_value(idx)
+        assert micros <= upper <= micros * 1.07 + 1
+
+
+def test_histogram_percentiles_and_rolling_window():
+    now = [0.0]
+    hist = LatencyHistogram(window_seconds=10.0, slots=5, time_fn=lambda: now[0])
+    for ms in range(1, 101):
+        hist.record(ms / 1000)
+    snap = hist.snapshot()
+    assert snap["count"] == 100
+    assert snap["p50"] == pytest.approx(0.050, rel=0.05)
+    assert snap["p99"] == pytest.approx(0.099, rel=0.05)
+    assert snap["max"] == pytest.approx(0.100, rel=0.05)
+
+    now[0] = 8.0
+    hist.record(0.5)
+    assert hist.snapshot()["count"] == 101
+    # the first slot has aged out of the 10s window
+    now[0] = 10.5
+    snap = hist.snapshot()
+    assert snap["count"] == 1 and snap["max"] == pytest.approx(0.5, rel=0.05)
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = TickProfiler(enabled=False)
+    with profiler.measure("phase", "pre_tick"):
+        pass
+    profiler.record("tick", 1.0)
+    assert profiler.stats() == {}
+
+
+def test_bus_records_subscriber_timings(monkeypatch):
+    import aitown.kernel.event_bus as bus_mod
+
+    profiler = TickProfiler(enabled=True, log_every_ticks=1)
+    monkeypatch.setattr(bus_mod, "PROFILER", profiler)
+
+    def decide(bus, evt):
+        pass
+
+    bus = InMemoryEventBus()
+    bus.subscribe(EventType.NPC_DECISION, decide)
+    bus.post_tick()
+    bus.post_tick()
+
+    stats = profiler.stats()
+    key = f"subscriber:{decide.__qualname__}"
+    assert stats[key]["count"] == 2
+    profiler.maybe_log(1)
@@ -0,0 +1,129 @@
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.kernel.road_graph import RoadGraph, RoutePlanner
+from aitown.repos.event_repo import Event
+from aitown.repos.static_catalog import StaticCatalog
+
+# 1 - 2 - 3 - 4, plus a shortcut 1 - 5 - 4 and an isolated 6
+ROADS = [
+    {"id": 1, "from_place": 1, "to_place": 2, "direction": "two-way"},
+    {"id": 2, "from_place": 2, "to_place": 3, "direction": "two-way"},
+    {"id": 3, "from_place": 3, "to_place": 4, "direction": "two-way"},
+    {"id": 4, "from_place": 1, "to_place": 5, "direction": "two-way"},
+    {"id": 5, "from_place": 5, "to_place": 4, "direction": "two-way"},
+]
+
+
+def make_catalog(roads=ROADS):
+    places = [{"id": i, "name": f"P{i}"} for i in range(1, 7)]
+    return StaticCatalog.from_records(places=places, roads=roads)
+
+
+def test_shortest_path_uses_fewest_hops():
+    graph = RoadGraph(make_catalog().roads)
+    assert graph.neighbors(1) == ("2", "5")
+    assert graph.connected(2, 1) and not graph.connected(1, 3)
+    assert graph.shortest_path(1, 4) == ["5", "4"]
+    assert graph.shortest_path("3", 1) == ["2", "1"]
+    assert graph.shortest_path(1, 1) == []
+    assert graph.shortest_path(1, 6) is None
+
+
+def test_planner_rebuilds_graph_after_catalog_reload():
+    catalog = make_catalog()
+    planner = RoutePlanner(catalog)
+    assert planner.graph.shortest_path(1, 4) == ["5", "4"]
+    catalog._install([], [], list(catalog.places.values()), [r for r in catalog.roads if r.id != 4])
+    assert planner.graph.shortest_path(1, 4) == ["2", "3", "4"]
+
+
+def test_routes_advance_one_hop_per_tick_and_mark_npc_busy():
+    planner = RoutePlanner(make_catalog())
+    bus = InMemoryEventBus(durability="event")
+    bus.busy_checks.append(planner.is_travelling)
+
+    assert planner.plan("npc:1", 1, 4) == ["5", "4"]
+    assert planner.next_hop("npc:1") == "5"  # taken by move_to itself
+    assert bus.npc_busy("npc:1") and not bus.npc_busy("npc:2")
+
+    assert planner.advance(bus, []) == 1
+    [evt] = bus.drain(EventType.NPC_ACTION)
+    assert evt.payload == {"action_type": "move", "npc_id": "npc:1", "place_id": "4"}
+    # still busy until the last move has been executed
+    assert bus.npc_busy("npc:1")
+    planner.settle("npc:1")
+    assert not planner.is_travelling("npc:1")
+
+
+def test_lost_hops_end_the_trip():
+    planner = RoutePlanner(make_catalog())
+
+    def full_bus(policy):
+        bus = InMemoryEventBus(durability="event", capacity=1, overflow_policy=policy)
+        bus.discard_listeners.append(planner.discarded)
+        return bus
+
+    # a route whose last move was never executed is dropped instead of kept forever
+    planner.plan("npc:1", 1, 5)
+    planner.next_hop("npc:1")
+    assert planner.advance(full_bus("drop_oldest"), []) == 0 and not planner.is_travelling("npc:1")
+
+    # the hop does not fit on the full bus
+    bus = full_bus("drop_oldest")
+    bus.publish(Event(event_type="TOWN", payload={}))
+    planner.plan("npc:2", 1, 4)
+    assert planner.advance(bus, []) == 0 and not planner.is_travelling("npc:2")
+
+    # the queued hop is dropped to make room for another NPC's action
+    bus = full_bus("drop_oldest")
+    planner.plan("npc:3", 1, 4)
+    assert planner.advance(bus, []) == 1 and planner.is_travelling("npc:3")
+    bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id="npc:9", payload={"action_type": "idle"}))
+    assert not planner.is_travelling("npc:3")
+
+    # the queued hop is coalesced away
+    bus = full_bus("coalesce")
+    planner.plan("npc:4", 1, 4)
+    assert planner.advance(bus, []) == 1
+    move = {"action_type": "move", "npc_id": "npc:4", "place_id": "2"}
+    bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id="npc:4", payload=move))
+    assert not planner.is_travelling("npc:4")
+
+
+def test_hop_rejected_after_a_deferred_decision_ends_the_trip():
+    planner = RoutePlanner(make_catalog())
+    bus = InMemoryEventBus(durability="event", decision_deadline_seconds=5.0)
+    bus.discard_listeners.append(planner.discarded)
+    bus.subscribe_batch(EventType.NPC_DECISION, planner.advance)
+
+    def reject(payload):
+        raise ValueError("road closed")
+
+    bus.action_validator = reject
+    planner.plan("npc:1", 1, 4)
+    bus.post_tick()
+    assert bus.counters["rejected"] == 1 and not planner.is_travelling("npc:1")
+
+
+def test_unreachable_or_same_place_leaves_no_route():
+    planner = RoutePlanner(make_catalog())
+    assert planner.plan("npc:1", 1, 6) is None
+    assert planner.plan("npc:1", 4, 4) == []
+    assert not planner.is_travelling("npc:1")
+
+
+def test_busy_npcs_are_not_asked_for_decisions():
+    class FakeNPC:
+        def __init__(self, npc_id):
+            self.id = npc_id
+            self.asked = 0
+
+        def decide(self, bus, evt):
+            self.asked += 1
+
+    walker, thinker = FakeNPC("npc:1"), FakeNPC("npc:2")
+    bus = InMemoryEventBus(durability="event")
+    bus.busy_checks.append(lambda npc_id: npc_id == "npc:1")
+    bus.subscribe(EventType.NPC_DECISION, walker.decide)
+    bus.subscribe(EventType.NPC_DECISION, thinker.decide)
+    bus.post_tick()
+    assert (walker.asked, thinker.asked) == (0, 1)
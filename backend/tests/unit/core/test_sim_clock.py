@@ -2,7 +2,7 @@ import time
 
 import pytest
 
-from aitown.kernel.event_bus import EventType
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
 from aitown.kernel.sim_clock import ClockError, SimClock
 from aitown.repos.event_repo import Event
 from aitown.helpers.db_helper import init_db
@@ -115,3 +115,248 @@ def test_get_town_time_from_timestamp_returns_formatted():
     ts = (24 + 5) * 90.0
     s = SimClock.get_town_time_from_timestamp(ts)
     assert "第1天05点" in s
+
+
+def _replay_clock():
+    from aitown.repos.event_repo import EventRepository
+
+    clock = SimClock()
+    clock.event_bus.dispatch.clear()
+    clock.event_bus.event_repo = EventRepository(init_db(":memory:"))
+    return clock
+
+
+def test_replay_streams_processed_actions_in_order():
+    clock = _replay_clock()
+    repo = clock.event_bus.event_repo
+    for n in range(7):
+        repo.append_event(
+            Event(event_type=EventType.NPC_ACTION, payload={"n": n}, created_at=float(n), processed=1)
+        )
+    repo.append_event(Event(event_type=EventType.NPC_DECISION, payload={"n": -1}, processed=1))
+    repo.append_event(Event(event_type=EventType.NPC_ACTION, payload={"n": -2}, processed=0))
+
+    seen = []
+    clock.event_bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: seen.append(evt.payload["n"]))
+
+    assert clock.replay(page_size=3) == 7
+    assert seen == list(range(7))
+    assert clock.tick_count == 0
+
+
+def test_replay_honours_time_range_and_explicit_events():
+    clock = _replay_clock()
+    repo = clock.event_bus.event_repo
+    for n in range(5):
+        repo.append_event(
+            Event(event_type=EventType.NPC_ACTION, payload={"n": n}, created_at=float(n), processed=1)
+        )
+    seen = []
+    clock.event_bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: seen.append(evt.payload["n"]))
+
+    assert clock.replay(since=1.0, until=4.0, page_size=2) == 3
+    assert seen == [1, 2, 3]
+
+    seen.clear()
+    assert clock.replay(events=[Event(event_type=EventType.NPC_ACTION, payload={"n": 9})]) == 1
+    assert seen == [9]
+
+
+def test_replay_skips_discarded_actions_and_begins_each_tick(monkeypatch):
+    from aitown.kernel.npc_actions import ActionExecutor
+    from aitown.models.event_model import DISCARDED
+
+    clock = _replay_clock()
+    monkeypatch.setattr(clock, "tick_interval_seconds", 90.0)
+    repo = clock.event_bus.event_repo
+    for n, processed, processed_at in [(0, 1, 100.0), (1, DISCARDED, 100.5), (2, 1, 101.0), (3, 1, 190.0)]:
+        repo.append_event(
+            Event(event_type=EventType.NPC_ACTION, payload={"n": n}, processed=processed, processed_at=processed_at)
+        )
+    seen = []
+    clock.event_bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: seen.append(evt.payload["n"]))
+    clock.event_bus.subscribe_batch(
+        EventType.NPC_ACTION, lambda bus, evts: seen.append([evt.payload["n"] for evt in evts])
+    )
+    monkeypatch.setattr(ActionExecutor, "begin_tick", lambda tick, day: seen.append(("tick", tick)))
+
+    assert clock.replay() == 3
+    # the dropped action is not executed; batches do not span ticks
+    assert seen == [("tick", 0), 0, 2, [0, 2], ("tick", 1), 3, [3]]
+
+
+def test_replay_does_not_write_ledger_entries_twice():
+    from aitown.kernel.npc_actions import ActionExecutor
+    from aitown.repos.ledger import LedgerKind
+
+    live_conn = ActionExecutor.conn
+    ActionExecutor.bind(init_db(":memory:"))
+    try:
+        clock = _replay_clock()
+        context = ActionExecutor.context
+        context.record(LedgerKind.WAGE, 1, 20)
+        # a replayed wage goes through the same rules as the live one did
+        clock.event_bus.subscribe(EventType.NPC_ACTION, lambda bus, evt: context.record(LedgerKind.WAGE, 1, 20))
+
+        assert clock.replay(events=[Event(event_type=EventType.NPC_ACTION, payload={"n": 1})]) == 1
+        context.commit()
+        assert context.ledger is ActionExecutor.ledger
+        # only the live record reached the ledger
+        assert ActionExecutor.ledger.flush() == 1
+    finally:
+        ActionExecutor.bind(live_conn)
+
+
+def test_virtual_clock_derives_time_from_ticks():
+    clock = SimClock(virtual=True)
+    clock._start_ts = 1000.0
+    seen = []
+    clock.event_bus.subscribe(EventType.NPC_DECISION, lambda bus, evt: seen.append(evt.created_at))
+
+    clock.step(3)
+    assert clock.now() == 1000.0 + 3 * clock.tick_interval_seconds
+    assert seen == [1000.0 + i * clock.tick_interval_seconds for i in range(3)]
+
+
+def test_fast_forward_runs_whole_days_without_sleeping():
+    clock = SimClock(virtual=True)
+    started = time.perf_counter()
+    report = clock.fast_forward(days=2)
+    assert time.perf_counter() - started < clock.tick_interval_seconds
+    assert report["ticks"] == 48 and clock.tick_count == 48
+    assert report["ticks_per_second"] > 0
+    assert clock.town_time() == "第2天00点"
+
+    with pytest.raises(ClockError):
+        clock.fast_forward(ticks=-1)
+
+
+def test_headless_run_reports_throughput():
+    from aitown.kernel.headless import run
+
+    report = run(ticks=5)
+    assert report["ticks"] == 5
+    assert report["town_time"] == "第0天05点"
+
+
+def test_headless_run_decides_for_stored_npcs_on_a_scratch_copy(tmp_path, monkeypatch):
+    import aitown.kernel.sim_clock as scmod
+    from aitown.kernel.headless import run
+    from aitown.kernel.npc_actions import ActionExecutor
+    from aitown.models.npc_model import NPC
+
+    db = tmp_path / "town.db"
+    conn = init_db(str(db))
+    conn.execute("INSERT INTO town (id, name, sim_start_time) VALUES (1, 'X', 42.0)")
+    conn.execute("INSERT INTO place (id, name, tags) VALUES (1, 'Square', '[]')")
+    conn.execute("INSERT INTO npc (id, name, location_id) VALUES (1, 'A', 1)")
+    conn.execute("INSERT INTO npc (id, name, location_id, is_dead) VALUES (2, 'B', 1, 1)")
+    conn.commit()
+    conn.close()
+    live_conn = ActionExecutor.conn
+
+    decisions = []
+
+    def decide(self, event_bus, event):
+        decisions.append((self.id, event.created_at))
+        payload = {"action_type": "idle", "npc_id": str(self.id)}
+        event_bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id=str(self.id), payload=payload))
+
+    monkeypatch.setattr(NPC, "register_decision_callback", decide)
+    monkeypatch.setitem(scmod.cfg_kernel, "batch_actions", True)
+    monkeypatch.setitem(scmod.cfg_town, "town_id", 1)
+
+    report = run(ticks=3, db_path=str(db), llm=True)
+    assert report["npcs"] == 1
+    assert [npc_id for npc_id, _ in decisions] == [1, 1, 1]
+    # virtual time: one tick interval apart
+    interval = scmod.cfg_kernel.get("tick_interval_seconds", 90.0)
+    assert decisions[1][1] - decisions[0][1] == pytest.approx(interval)
+
+    # the stored town is untouched and the executor is back on the live database
+    conn = init_db(str(db))
+    assert conn.execute("SELECT sim_start_time FROM town").fetchone()[0] == 42.0
+    assert conn.execute("SELECT COUNT(*) FROM memory_entry").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM event").fetchone()[0] == 0
+    conn.close()
+    assert ActionExecutor.conn is live_conn
+
+
+def test_headless_run_decides_offline_and_reproducibly(tmp_path, monkeypatch):
+    import aitown.helpers.llm_helper as llm
+    import aitown.kernel.sim_clock as scmod
+    from aitown.kernel.headless import run
+
+    db = tmp_path / "town.db"
+    conn = init_db(str(db))
+    conn.execute("INSERT INTO town (id, name) VALUES (1, 'X')")
+    conn.execute("INSERT INTO item (id, name, value, type) VALUES (1, 'Bread', 3, 'CONSUMABLE')")
+    conn.execute("INSERT INTO place (id, name, tags, shop_inventory) VALUES (1, 'Market', ?, ?)", ('["SHOP", "WORKABLE"]', '{"1": 5}'))
+    conn.execute("INSERT INTO place (id, name, tags) VALUES (2, 'Home', '[]')")
+    conn.execute("INSERT INTO road (id, from_place, to_place, direction) VALUES (1, 1, 2, 'two-way')")
+    conn.executemany("INSERT INTO npc (id, name, location_id, balance) VALUES (?, ?, 1, 10)", [(1, "A"), (2, "B")])
+    conn.commit()
+    conn.close()
+
+    def no_llm(*args, **kwargs):
+        raise AssertionError("headless runs decide offline by default")
+
+    published = []
+    publish = InMemoryEventBus.publish
+
+    def spy(bus, event):
+        if event.event_type == EventType.NPC_ACTION:
+            published[-1].append(dict(event.payload))
+        return publish(bus, event)
+
+    monkeypatch.setattr(llm, "generate", no_llm)
+    monkeypatch.setattr(InMemoryEventBus, "publish", spy)
+    monkeypatch.setitem(scmod.cfg_town, "town_id", 1)
+    for _ in range(2):
+        published.append([])
+        report = run(ticks=12, db_path=str(db), seed=7)
+        assert report["decider"] == "random (seed 7)"
+        assert report["rejected_events"] == 0
+    assert published[0] == published[1]
+    assert len({payload["action_type"] for payload in published[0]}) > 1
+
+
+def test_clock_context_is_cached_until_start_time_changes(monkeypatch):
+    import aitown.kernel.sim_clock as scmod
+
+    conn = init_db(":memory:")
+    conn.execute("INSERT INTO town (id, name, sim_start_time) VALUES (1, 'X', 0.0)")
+    conn.commit()
+    opened = []
+
+    def repo_factory(*args, **kwargs):
+        opened.append(1)
+        return TownRepository(conn)
+
+    monkeypatch.setattr(scmod, "TownRepository", repo_factory)
+    monkeypatch.setitem(scmod.cfg_town, "town_id", 1)
+    scmod.invalidate_clock_context()
+
+    interval = scmod.cfg_kernel.get("tick_interval_seconds", 90.0)
+    assert SimClock.get_town_time_from_timestamp(29 * interval) == "第1天05点"
+    assert SimClock.get_town_times_from_timestamps([0.0, interval, 25 * interval]) == [
+        "第0天00点",
+        "第0天01点",
+        "第1天01点",
+    ]
+    assert len(opened) == 1
+
+    TownRepository(conn).set_sim_start_time(1, 24 * interval)
+    assert SimClock.get_town_time_from_timestamp(29 * interval) == "第0天05点"
+    assert len(opened) == 2
+    scmod.invalidate_clock_context()
+
+
+def test_clock_context_requires_start_time(monkeypatch):
+    import aitown.kernel.sim_clock as scmod
+
+    conn = init_db(":memory:")
+    monkeypatch.setattr(scmod, "TownRepository", lambda *a, **k: TownRepository(conn))
+    scmod.invalidate_clock_context()
+    with pytest.raises(ClockError):
+        scmod.get_clock_context(42)
@@ -0,0 +1,44 @@
+import pytest
+
+from aitown.kernel.tick_scheduler import TickScheduler
+
+
+def test_deadlines_are_absolute():
+    sched = TickScheduler(10.0, max_catchup_ticks=4)
+    sched.start(now=100.0)
+    assert sched.due(now=100.0) == 1
+    # a tick that took 3s does not shift the next deadline
+    sched.record(3.0)
+    assert sched.time_until_next(now=103.0) == pytest.approx(7.0)
+    assert sched.due(now=105.0) == 0
+    assert sched.due(now=110.5) == 1
+    assert sched.stats["last_lateness"] == pytest.approx(0.5)
+    assert sched.next_deadline == 120.0
+
+
+def test_catch_up_is_capped_per_wakeup():
+    sched = TickScheduler(10.0, max_catchup_ticks=2)
+    sched.start(now=0.0)
+    # 6 deadlines (0..50) are due at t=55
+    assert sched.due(now=55.0) == 3
+    assert sched.due(now=55.0) == 3
+    assert sched.due(now=55.0) == 0
+    assert sched.stats["catchup_ticks"] == 4
+    assert sched.stats["skipped_ticks"] == 0
+
+
+def test_without_catch_up_missed_ticks_are_skipped_in_phase():
+    sched = TickScheduler(10.0, max_catchup_ticks=0)
+    sched.start(now=0.0)
+    assert sched.due(now=35.0) == 1
+    assert sched.stats["skipped_ticks"] == 3
+    assert sched.next_deadline == 40.0
+
+
+def test_record_tracks_overruns():
+    sched = TickScheduler(1.0, max_catchup_ticks=0)
+    assert sched.record(0.5) == 0.0
+    assert sched.record(1.25) == pytest.approx(0.25)
+    assert sched.stats["ticks"] == 2
+    assert sched.stats["overruns"] == 1
+    assert sched.stats["max_overrun"] == pytest.approx(0.25)
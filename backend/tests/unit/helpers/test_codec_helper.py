@@ -0,0 +1,32 @@
+import pytest
+
+from aitown.helpers import codec_helper
+from aitown.helpers.codec_helper import CODECS, decode_payload, get_codec
+
+PAYLOAD = {"action_type": "buy", "npc_id": "npc:1", "item_id": "item_bread", "item_amount": 2}
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_codec_roundtrip(name):
+    codec = get_codec(name)
+    assert codec.name == name
+    assert decode_payload(codec.encode(PAYLOAD), name) == PAYLOAD
+
+
+def test_unknown_codec_falls_back_to_json():
+    assert get_codec("no-such-codec").name == "json"
+
+
+def test_default_codec_comes_from_config(monkeypatch):
+    monkeypatch.setattr(codec_helper, "get_config", lambda section: {"event_payload_codec": "json"})
+    assert get_codec().name == "json"
+
+
+def test_decode_legacy_rows_without_codec():
+    assert decode_payload('{"a": 1}', None) == {"a": 1}
+    assert decode_payload(None, None) == {}
+
+
+def test_decode_with_missing_codec_raises():
+    with pytest.raises(ValueError):
+        decode_payload(b"\x80", "not-installed")
@@ -0,0 +1,24 @@
+from aitown.helpers.currency_helper import (
+    deduct_cost_low_first,
+    fold_coins,
+    materialize_coins,
+    split_amount_to_coins,
+)
+
+
+def test_materialize_coins_skips_empty_denominations():
+    assert materialize_coins(1204) == {"item_platinum_coin": 1, "item_gold_coin": 2, "item_bronze_coin": 4}
+    assert materialize_coins(0) == {}
+    assert split_amount_to_coins(30)["item_silver_coin"] == 3
+
+
+def test_fold_coins_moves_coin_items_into_balance():
+    inventory = {"item_silver_coin": 2, "item_bronze_coin": 3, "item:bread": 1}
+    assert fold_coins(inventory) == ({"item:bread": 1}, 23)
+    plain = {"item:bread": 1}
+    assert fold_coins(plain)[0] is plain and fold_coins(plain)[1] == 0
+
+
+def test_deduct_cost_low_first_uses_small_coins_first():
+    inv, ok = deduct_cost_low_first({"item_bronze_coin": 12, "item_silver_coin": 1}, 12)
+    assert ok and inv == {"item_bronze_coin": 0, "item_silver_coin": 1}
@@ -367,3 +367,34 @@ def test_load_db_row_factory_assignment_ignored(monkeypatch, tmp_path):
     conn = initmod.load_db()
     assert conn is not None
     conn.close()
+
+
+def test_init_db_adds_columns_missing_from_older_databases(tmp_path):
+    path = str(tmp_path / "old.db")
+    # the schema as it was before npc.balance, event.npc_id and event.payload_codec existed
+    schema = initmod._migration_path().read_text(encoding="utf-8")
+    removed = {
+        "  balance INTEGER DEFAULT 0,\n": "",
+        "  npc_id TEXT,\n  event_type": "  event_type",
+        "  payload_codec TEXT DEFAULT 'json',\n": "",
+    }
+    for added, before in removed.items():
+        assert added in schema
+        schema = schema.replace(added, before)
+    old = sqlite3.connect(path)
+    old.executescript(schema)
+    old.execute("INSERT INTO event (event_type, payload) VALUES ('NPC_ACTION', '{}')")
+    old.commit()
+    assert "balance" not in {row[1] for row in old.execute("PRAGMA table_info(npc)")}
+    assert {"npc_id", "payload_codec"}.isdisjoint(row[1] for row in old.execute("PRAGMA table_info(event)"))
+    old.close()
+
+    conn = initmod.init_db(path)
+    assert "balance" in {row[1] for row in conn.execute("PRAGMA table_info(npc)")}
+    # events written by the current code land in the upgraded table
+    conn.execute("INSERT INTO event (npc_id, event_type, payload, payload_codec) VALUES ('1', 'NPC_ACTION', '{}', 'json')")
+    codecs = [row[0] for row in conn.execute("SELECT payload_codec FROM event ORDER BY id")]
+    assert codecs == ["json", "json"]
+    # running it again on an up-to-date database is a no-op
+    initmod._add_missing_columns(conn)
+    conn.close()
@@ -50,4 +50,54 @@ def test_update(effect_repo: EffectRepository):
     assert fetched_effect is not None
     assert fetched_effect.name == "Updated Effect"
     assert fetched_effect.change == 10
-    
\ No newline at end of file
+    
+
+def test_compile_effect_deltas_sums_per_attribute():
+    from aitown.models.effect_model import compile_effect_deltas
+
+    effects = [
+        Effect(name="a", attribute="hunger", change=10),
+        Effect(name="b", attribute="hunger", change=-3),
+        Effect(name="c", attribute="mood", change=2),
+        Effect(name="d", attribute="strength", change=9),
+        None,
+    ]
+    assert compile_effect_deltas(effects, 2) == {"hunger": 14, "mood": 4}
+
+
+def test_apply_effect_deltas_clamps_once():
+    from aitown.models.effect_model import apply_effect_deltas
+    from aitown.models.npc_model import NPC
+
+    npc = NPC(id=1, hunger=95, energy=3, mood=50)
+    fields = apply_effect_deltas(npc, {"hunger": 20, "energy": -10, "mood": 0})
+    assert fields == {"hunger": 100, "energy": 0}
+    assert (npc.hunger, npc.energy, npc.mood) == (100, 0, 50)
+
+
+def test_apply_to_npc_writes_once_through_given_repo():
+    from aitown.models.npc_model import NPC
+
+    class StubRepo:
+        def __init__(self):
+            self.npc = NPC(id=1, energy=70)
+            self.writes = []
+
+        def get(self, npc_id):
+            return self.npc
+
+        def update_fields(self, npc_id, fields):
+            self.writes.append((npc_id, fields))
+            return True
+
+    repo = StubRepo()
+    Effect(name="Energy", attribute="energy", change=5).apply_to_npc(1, 3, repo)
+    assert repo.writes == [(1, {"energy": 85})]
+
+
+def test_update_fields_changes_only_given_columns(effect_repo: EffectRepository):
+    created = effect_repo.create(Effect(name="Partial", attribute="mood", change=1))
+    assert effect_repo.update_fields(created.id, {"change": 7}) is True
+    fetched = effect_repo.get(created.id)
+    assert (fetched.name, fetched.change) == ("Partial", 7)
+    assert effect_repo.update_fields(created.id, {}) is True
@@ -0,0 +1,74 @@
+from aitown.helpers.db_helper import init_db
+from aitown.models.event_model import Event
+from aitown.repos.event_archive import EventArchiver, read_archive
+from aitown.repos.event_journal import EventJournal
+from aitown.repos.event_repo import EventRepository
+
+DAY = 86400.0
+
+
+def _seed(repo: EventRepository):
+    # two old processed events on different days, one recent processed, one pending
+    rows = [
+        Event(event_type="NPC_ACTION", payload={"n": 1}, created_at=1 * DAY + 10, processed=1, processed_at=1 * DAY + 20),
+        Event(event_type="NPC_ACTION", payload={"n": 2}, created_at=2 * DAY + 10, processed=1, processed_at=2 * DAY + 20),
+        Event(event_type="NPC_ACTION", payload={"n": 3}, created_at=9 * DAY, processed=1, processed_at=9 * DAY + 5),
+        Event(event_type="NPC_ACTION", payload={"n": 4}, created_at=1 * DAY),
+    ]
+    for evt in rows:
+        repo.append_event(evt)
+
+
+def _remaining(conn):
+    return [r[0] for r in conn.execute("SELECT id FROM event ORDER BY id").fetchall()]
+
+
+def test_compact_moves_old_processed_events_to_daily_archives(tmp_path):
+    conn = init_db(":memory:")
+    repo = EventRepository(conn)
+    _seed(repo)
+
+    archiver = EventArchiver(repo, archive_dir=str(tmp_path), retention_seconds=DAY, batch_size=10)
+    assert archiver.compact(now=9 * DAY + 10) == 2
+
+    assert _remaining(conn) == [3, 4]
+    day1 = list(read_archive(archiver.archive_path("1970-01-02")))
+    day2 = list(read_archive(archiver.archive_path("1970-01-03")))
+    assert [e.payload for e in day1] == [{"n": 1}]
+    assert [e.payload for e in day2] == [{"n": 2}]
+
+
+def test_compact_respects_batch_limits(tmp_path):
+    conn = init_db(":memory:")
+    repo = EventRepository(conn)
+    _seed(repo)
+
+    archiver = EventArchiver(repo, archive_dir=str(tmp_path), retention_seconds=DAY, batch_size=1)
+    assert archiver.compact(now=9 * DAY + 10, max_batches=1) == 1
+    assert _remaining(conn) == [2, 3, 4]
+    assert archiver.compact(now=9 * DAY + 10) == 1
+    assert _remaining(conn) == [3, 4]
+
+
+def test_ids_of_archived_events_are_not_reused(tmp_path):
+    conn = init_db(":memory:")
+    repo = EventRepository(conn)
+    journal = EventJournal(repo, mode="tick")
+    for n in (1, 2, 3):
+        journal.append(Event(event_type="NPC_ACTION", payload={"n": n}, created_at=DAY, processed=1, processed_at=DAY))
+    journal.flush()
+
+    archiver = EventArchiver(repo, archive_dir=str(tmp_path), retention_seconds=DAY, batch_size=10)
+    assert archiver.compact(now=9 * DAY) == 3
+    assert _remaining(conn) == []
+
+    # a restarted journal continues after the archived ids
+    assert EventJournal(repo, mode="tick").append(Event(event_type="NPC_ACTION", payload={})) == 4
+
+
+def test_unprocessed_partial_index_is_used():
+    conn = init_db(":memory:")
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM event WHERE processed = 0 ORDER BY id ASC LIMIT 10"
+    ).fetchall()
+    assert any("idx_event_unprocessed" in row[-1] for row in plan)
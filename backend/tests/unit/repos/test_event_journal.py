@@ -0,0 +1,111 @@
+from aitown.helpers.db_helper import init_db
+from aitown.models.event_model import DISCARDED, Event
+from aitown.repos.event_journal import DurabilityMode, EventJournal
+from aitown.repos.event_repo import EventRepository
+
+
+def _rows(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT id, npc_id, processed FROM event ORDER BY id")
+    return [tuple(r) for r in cur.fetchall()]
+
+
+def test_tick_mode_buffers_until_flush():
+    conn = init_db(":memory:")
+    journal = EventJournal(EventRepository(conn), mode=DurabilityMode.TICK)
+
+    ids = [journal.append(Event(npc_id="npc:1", event_type="NPC_ACTION")) for _ in range(3)]
+    assert ids == [1, 2, 3]
+    assert _rows(conn) == []
+
+    assert journal.flush() == 3
+    assert _rows(conn) == [(1, "npc:1", 0), (2, "npc:1", 0), (3, "npc:1", 0)]
+    assert journal.pending == 0
+
+
+def test_mark_of_unflushed_event_is_folded_into_insert():
+    conn = init_db(":memory:")
+    journal = EventJournal(EventRepository(conn), mode=DurabilityMode.TICK)
+
+    done = Event(event_type="NPC_ACTION")
+    journal.append(done)
+    journal.mark_processed(done.id, 12.0)
+    assert journal.pending == 1
+
+    journal.flush()
+    first = Event(event_type="NPC_ACTION")
+    journal.append(first)
+    journal.flush()
+    journal.mark_processed(first.id, 13.0)
+    journal.flush()
+    assert _rows(conn) == [(1, None, 1), (2, None, 1)]
+
+
+def test_ids_continue_after_existing_rows():
+    conn = init_db(":memory:")
+    repo = EventRepository(conn)
+    repo.append_event(Event(event_type="NPC_ACTION"))
+    journal = EventJournal(repo, mode=DurabilityMode.TICK)
+    assert journal.append(Event(event_type="NPC_ACTION")) == 2
+
+
+def test_size_threshold_triggers_flush():
+    conn = init_db(":memory:")
+    journal = EventJournal(EventRepository(conn), mode=DurabilityMode.TICK, max_pending=2)
+    journal.append(Event(event_type="NPC_ACTION"))
+    assert _rows(conn) == []
+    journal.append(Event(event_type="NPC_ACTION"))
+    assert len(_rows(conn)) == 2
+
+
+def test_event_mode_writes_through():
+    conn = init_db(":memory:")
+    journal = EventJournal(EventRepository(conn), mode=DurabilityMode.EVENT)
+    evt = Event(event_type="NPC_ACTION")
+    assert journal.append(evt) == 1
+    journal.mark_processed(evt.id, 1.0)
+    assert _rows(conn) == [(1, None, 1)]
+    assert journal.pending == 0
+
+
+def test_discarded_events_are_stored_apart_from_executed_ones():
+    conn = init_db(":memory:")
+    repo = EventRepository(conn)
+    journal = EventJournal(repo, mode=DurabilityMode.TICK)
+    events = [Event(event_type="NPC_ACTION") for _ in range(3)]
+    for evt in events:
+        journal.append(evt)
+    journal.mark_processed(events[0].id, 1.0, DISCARDED)
+    journal.flush()
+    journal.mark_processed(events[1].id, 2.0)
+    journal.mark_processed(events[2].id, 2.0, DISCARDED)
+    journal.flush()
+    assert _rows(conn) == [(1, None, DISCARDED), (2, None, 1), (3, None, DISCARDED)]
+    assert [evt.id for evt in repo.iter_events(processed_only=True)] == [2]
+
+
+def test_failing_row_is_quarantined_and_the_rest_stored():
+    conn = init_db(":memory:")
+    journal = EventJournal(EventRepository(conn), mode=DurabilityMode.TICK)
+    events = [Event(event_type="NPC_ACTION") for _ in range(3)]
+    for evt in events:
+        journal.append(evt)
+    # another writer took id 2, so the batch violates the primary key
+    conn.execute("INSERT INTO event (id, event_type, npc_id) VALUES (2, 'TOWN', 'other')")
+    conn.commit()
+
+    assert journal.flush() == 2
+    assert _rows(conn) == [(1, None, 0), (2, "other", 0), (3, None, 0)]
+    assert journal.pending == 0
+    assert list(journal.quarantine) == [events[1]]
+
+
+def test_swapping_repos_flushes_to_the_old_one_first():
+    old, new = init_db(":memory:"), init_db(":memory:")
+    journal = EventJournal(EventRepository(old), mode=DurabilityMode.TICK)
+    journal.append(Event(event_type="NPC_ACTION"))
+    journal.swap_repo(EventRepository(new))
+    assert _rows(old) == [(1, None, 0)]
+    journal.append(Event(event_type="NPC_ACTION"))
+    journal.flush()
+    assert _rows(new) == [(1, None, 0)]
@@ -0,0 +1,31 @@
+import pytest
+
+from aitown.helpers.codec_helper import CODECS
+from aitown.helpers.db_helper import init_db
+from aitown.models.event_model import Event
+from aitown.repos.event_repo import EventRepository
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_get_unprocessed_decodes_payload(codec):
+    conn = init_db(":memory:")
+    repo = EventRepository(conn, codec=codec)
+    repo.append_event(Event(npc_id="npc:1", event_type="NPC_ACTION", payload={"action_type": "idle"}))
+
+    events = repo.get_unprocessed()
+    assert len(events) == 1
+    assert events[0].payload == {"action_type": "idle"}
+    assert events[0].npc_id == "npc:1"
+
+
+def test_rows_written_with_different_codecs_stay_readable():
+    conn = init_db(":memory:")
+    for i, codec in enumerate(sorted(CODECS)):
+        EventRepository(conn, codec=codec).append_event(
+            Event(event_type="NPC_ACTION", payload={"n": i})
+        )
+    # a legacy row without a recorded codec
+    conn.execute("INSERT INTO event (event_type, payload, payload_codec, created_at) VALUES ('NPC_ACTION', '{\"n\": -1}', NULL, 0)")
+
+    payloads = [e.payload["n"] for e in EventRepository(conn, codec="json").get_unprocessed()]
+    assert payloads == list(range(len(CODECS))) + [-1]
@@ -0,0 +1,61 @@
+import pytest
+
+from aitown.helpers.db_helper import init_db
+from aitown.repos.ledger import Ledger, LedgerKind
+from aitown.repos.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def ledger():
+    return Ledger(init_db(":memory:"))
+
+
+def test_records_are_buffered_until_flush(ledger):
+    ledger.begin_tick(5, 0)
+    ledger.record(LedgerKind.PURCHASE, 1, -30, place_id="p1", item_id="bread", amount=3)
+    ledger.record(LedgerKind.WAGE, 1, 40, place_id="p2", amount=2)
+    assert ledger.pending == 2 and ledger.entries() == []
+
+    assert ledger.flush() == 2
+    assert ledger.pending == 0 and ledger.flush() == 0
+    wage, purchase = ledger.entries(npc_id=1)
+    assert (purchase.kind, purchase.item_id, purchase.amount, purchase.value, purchase.tick) == (
+        "purchase", "bread", 3, -30, 5
+    )
+    assert wage.item_id == "" and ledger.entries(item_id="bread") == [purchase]
+
+
+def test_daily_aggregates_accumulate_across_flushes(ledger):
+    ledger.begin_tick(1, 0)
+    ledger.record(LedgerKind.SALE, 1, 100, place_id="shop", item_id="fish", amount=2)
+    ledger.flush()
+    ledger.begin_tick(2, 0)
+    ledger.record(LedgerKind.SALE, 2, 50, place_id="shop", item_id="fish", amount=1)
+    ledger.record(LedgerKind.WAGE, 2, 20, place_id="farm", amount=1)
+    ledger.flush()
+    ledger.begin_tick(24, 1)
+    ledger.record(LedgerKind.SALE, 1, 50, place_id="shop", item_id="fish", amount=1)
+    ledger.flush()
+
+    day0 = {(r["kind"], r["place_id"], r["item_id"]): r for r in ledger.daily(0)}
+    sale = day0[("sale", "shop", "fish")]
+    assert (sale["entries"], sale["amount"], sale["value"]) == (2, 3, 150)
+    assert day0[("wage", "farm", "")]["value"] == 20
+    assert [(r["day"], r["entries"]) for r in ledger.daily(1)] == [(1, 1)]
+    assert len(ledger.daily()) == 3
+    assert [e.tick for e in ledger.entries(since_tick=2)] == [24, 2, 2]
+
+
+def test_flush_joins_the_surrounding_unit_of_work(ledger):
+    ledger.record(LedgerKind.WAGE, 1, 20)
+    with UnitOfWork(ledger.conn) as uow:
+        assert ledger.flush() == 1
+        # not committed on its own: discarding the tick discards the entries
+        assert ledger.conn.in_transaction
+        uow.rollback()
+    assert ledger.entries() == [] and ledger.daily() == []
+
+
+def test_unknown_kind_is_rejected(ledger):
+    with pytest.raises(ValueError):
+        ledger.record("gift", 1, 10)
@@ -0,0 +1,106 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from aitown.helpers.db_helper import init_db
+from aitown.repos.npc_state_store import NpcStateStore
+from aitown.repos.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def conn():
+    conn = init_db(":memory:")
+    rows = [
+        (1, 100, 100, 100, "peaceful", 0),
+        (2, 31, 80, 80, "peaceful", 0),
+        (3, 11, 50, 50, "sleeping", 0),
+        (4, 5, 5, 5, "awful", 1),
+    ]
+    conn.executemany(
+        "INSERT INTO npc (id, hunger, energy, mood, status, is_dead) VALUES (?, ?, ?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    return conn
+
+
+def _row(conn, npc_id):
+    return conn.execute("SELECT hunger, energy, mood, status FROM npc WHERE id = ?", (npc_id,)).fetchone()
+
+
+def test_tick_decays_derives_status_and_syncs_in_bulk(conn):
+    store = NpcStateStore(conn, decay={"hunger": 2, "energy": 1}, unwell_threshold=30, awful_threshold=10)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert store.tick() == 3
+    conn.set_trace_callback(None)
+
+    assert tuple(_row(conn, 1)) == (98, 99, 100, "peaceful")
+    assert tuple(_row(conn, 2)) == (29, 79, 80, "unwell")
+    # activity statuses are left alone, dead NPCs are not touched
+    assert tuple(_row(conn, 3)) == (9, 49, 50, "sleeping")
+    assert tuple(_row(conn, 4)) == (5, 5, 5, "awful")
+    assert sum(s.startswith("UPDATE npc") for s in statements) == 3  # one executemany
+    assert store.sync() == 0
+
+
+def test_deltas_clamp_and_only_mark_changed_rows(conn):
+    store = NpcStateStore(conn, decay={})
+    store.load()
+    assert store.apply_deltas({"mood": 10}) == 2  # npc 1 is already at 100, npc 4 is dead
+    assert store.get(1)["mood"] == 100 and store.get(2)["mood"] == 90
+    mask = np.zeros(store.size, dtype=bool)
+    mask[store.slot(2)] = True
+    store.apply_deltas({"hunger": -100}, mask=mask)
+    assert store.get(2)["hunger"] == 0 and store.get(3)["hunger"] == 11
+    assert store.derive_status() == 1 and store.get(2)["status"] == "awful"
+
+
+def test_sync_inside_unit_of_work_commits_with_it(conn):
+    store = NpcStateStore(conn, decay={"hunger": 1})
+    with UnitOfWork(conn) as uow:
+        store.tick()
+        assert conn.in_transaction and uow.deferred_commits == 0
+    assert not conn.in_transaction
+    assert _row(conn, 1)[0] == 99
+
+
+def test_grows_past_initial_capacity(conn):
+    store = NpcStateStore(conn, decay={}, capacity=1)
+    assert store.load() == 4
+    assert store.get(4)["status"] == "awful" and store.get(99) is None
+
+
+def test_later_ticks_read_only_invalidated_and_new_rows(conn):
+    store = NpcStateStore(conn, decay={"hunger": 1})
+    store.tick()
+    # an action wrote npc 2; npc 5 was created meanwhile
+    conn.execute("UPDATE npc SET hunger = 70 WHERE id = 2")
+    conn.execute("INSERT INTO npc (id, hunger) VALUES (5, 40)")
+    conn.commit()
+    store.invalidate(["2"])
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    store.tick()
+    conn.set_trace_callback(None)
+
+    selects = [s for s in statements if s.startswith("SELECT")]
+    assert all("WHERE id" in s for s in selects) and len(selects) == 2
+    assert store.get(2)["hunger"] == 69 and store.get(5)["hunger"] == 39
+    assert _row(conn, 1)[0] == 98 and _row(conn, 2)[0] == 69
+
+
+def test_reload_keeps_unsynced_changes(conn):
+    store = NpcStateStore(conn, decay={})
+    store.load()
+    store.apply_deltas({"hunger": -5})
+    conn.execute("UPDATE npc SET hunger = 60, status = 'sleeping' WHERE id = 2")
+    conn.commit()
+
+    store.invalidate([2])
+    store.refresh()
+    assert store.get(2) == {"hunger": 55, "energy": 80, "mood": 80, "status": "sleeping"}
+    store.load()
+    assert store.get(1)["hunger"] == 95
+    assert store.sync() == 3
+    assert _row(conn, 1)[0] == 95 and _row(conn, 2)[0] == 55
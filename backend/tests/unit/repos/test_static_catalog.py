@@ -0,0 +1,77 @@
+import dataclasses
+import json
+
+import pytest
+
+from aitown.helpers.db_helper import init_db
+from aitown.models.effect_model import compile_effect_deltas
+from aitown.repos.static_catalog import StaticCatalog
+
+
+@pytest.fixture
+def conn():
+    conn = init_db(":memory:")
+    conn.execute("INSERT INTO effect (id, name, attribute, change) VALUES (1, 'Hunger +10', 'hunger', 10)")
+    conn.execute("INSERT INTO effect (id, name, attribute, change) VALUES (2, 'Mood +5', 'mood', 5)")
+    conn.execute(
+        "INSERT INTO item (id, name, value, type, effect_ids) VALUES (1, 'Bread', 3, 'CONSUMABLE', ?)",
+        (json.dumps(["1", "2"]),),
+    )
+    conn.execute(
+        "INSERT INTO place (id, name, tags, shop_inventory) VALUES (1, 'Market', ?, ?)",
+        (json.dumps(["SHOP"]), json.dumps({"1": 20})),
+    )
+    conn.execute("INSERT INTO place (id, name, tags) VALUES (2, 'Home', ?)", (json.dumps(["HOUSE"]),))
+    conn.execute("INSERT INTO road (id, from_place, to_place, direction) VALUES (1, 1, 2, 'two-way')")
+    conn.commit()
+    return conn
+
+
+def test_lookups_are_served_from_memory(conn):
+    catalog = StaticCatalog(conn)
+    item = catalog.item(1)
+    assert item.name == "Bread" and item.effect_ids == ("1", "2")
+    assert catalog.item("1") is item
+    assert compile_effect_deltas(catalog.effects_of(item), 2) == {"hunger": 20, "mood": 10}
+
+    market = catalog.place(1)
+    assert "SHOP" in market.tags and market.shop_inventory["1"] == 20
+    assert [r.id for r in catalog.roads_from(2)] == [1]
+    assert catalog.roads_from(99) == ()
+
+    # no SQL after loading: edits are invisible until reload
+    conn.execute("UPDATE item SET name = 'Stale' WHERE id = 1")
+    conn.commit()
+    assert catalog.item(1).name == "Bread"
+    assert catalog.reload() is True
+    assert catalog.item(1).name == "Stale"
+
+
+def test_entries_are_immutable(conn):
+    catalog = StaticCatalog(conn)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        catalog.item(1).value = 0
+    with pytest.raises(TypeError):
+        catalog.place(1).shop_inventory["1"] = 0
+    with pytest.raises(TypeError):
+        catalog.items["2"] = None
+
+
+def test_miss_reads_through_once(conn):
+    catalog = StaticCatalog(conn)
+    catalog.item(1)
+    conn.execute("INSERT INTO item (id, name, value, type) VALUES (2, 'Apple', 1, 'CONSUMABLE')")
+    conn.commit()
+    assert catalog.item(2).name == "Apple"
+    assert "2" in catalog.items
+    assert catalog.item(42) is None
+
+
+def test_from_records():
+    catalog = StaticCatalog.from_records(
+        effects=[{"id": "effect_hunger_plus_5", "name": "Hunger +5", "attribute": "hunger", "change": 5}],
+        items=[{"id": "item_bread", "name": "Bread", "effect_ids": ["effect_hunger_plus_5"]}],
+    )
+    assert catalog.effect("effect_hunger_plus_5").change == 5
+    assert catalog.item("item_bread").type == "MISC"
+    assert catalog.item("missing") is None
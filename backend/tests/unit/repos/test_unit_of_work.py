@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from aitown.helpers.db_helper import init_db
+from aitown.models.effect_model import Effect
+from aitown.repos.effect_repo import EffectRepository
+from aitown.repos.unit_of_work import UnitOfWork, active_unit_of_work, savepoint
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    path = str(tmp_path / "uow.db")
+    conn = init_db(path)
+    other = sqlite3.connect(path)
+    yield EffectRepository(conn), other
+    other.close()
+    conn.close()
+
+
+def _count(other) -> int:
+    return other.execute("SELECT COUNT(*) FROM effect").fetchone()[0]
+
+
+def _effect(name: str) -> Effect:
+    return Effect(name=name, attribute="hunger", change=1)
+
+
+def test_writes_commit_once_at_exit(dbs):
+    repo, other = dbs
+    with UnitOfWork(repo.conn) as uow:
+        for i in range(3):
+            repo.create(_effect(f"e{i}"))
+        assert uow.deferred_commits == 3
+        assert _count(other) == 0
+    assert active_unit_of_work(repo.conn) is None
+    assert _count(other) == 3
+
+
+def test_failed_action_rolls_back_to_its_savepoint(dbs):
+    repo, other = dbs
+    with UnitOfWork(repo.conn):
+        repo.create(_effect("kept"))
+        with savepoint(repo.conn) as sp:
+            repo.create(_effect("failed"))
+            sp.rollback()
+        with pytest.raises(RuntimeError):
+            with savepoint(repo.conn):
+                repo.create(_effect("raised"))
+                raise RuntimeError("boom")
+        repo.create(_effect("after"))
+    names = [r[0] for r in other.execute("SELECT name FROM effect ORDER BY id")]
+    assert names == ["kept", "after"]
+
+
+def test_nested_unit_of_work_joins_outer(dbs):
+    repo, other = dbs
+    with UnitOfWork(repo.conn) as outer:
+        with UnitOfWork(repo.conn) as inner:
+            assert inner is outer
+            repo.create(_effect("x"))
+        assert _count(other) == 0
+    assert _count(other) == 1
+
+
+def test_without_unit_of_work_each_write_commits(dbs):
+    repo, other = dbs
+    with savepoint(repo.conn) as sp:
+        repo.create(_effect("x"))
+        assert _count(other) == 1
+        sp.rollback()
+    assert _count(other) == 1
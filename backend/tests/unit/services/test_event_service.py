@@ -0,0 +1,67 @@
+import asyncio
+
+import aitown.services.event_service as event_service
+from aitown.helpers.db_helper import init_db
+from aitown.kernel.async_event_bus import AsyncEventBus
+from aitown.kernel.event_bus import EventType, InMemoryEventBus
+from aitown.repos.event_repo import Event, EventRepository
+
+
+class FakeNPC:
+    def __init__(self, npc_id):
+        self.id = npc_id
+
+    def register_decision_callback(self, bus, evt):
+        bus.publish(Event(event_type=EventType.NPC_ACTION, npc_id=self.id, payload={"action_type": "idle"}))
+
+    async def register_decision_callback_async(self, bus, evt):
+        self.register_decision_callback(bus, evt)
+
+
+def _bus(cls):
+    bus = cls()
+    bus.event_repo = EventRepository(init_db(":memory:"))
+    return bus
+
+
+def test_register_all_batch_uses_live_npc_list(monkeypatch):
+    npcs = [FakeNPC("npc:1")]
+    monkeypatch.setattr(event_service, "NPC_INSTANCE_LIST", npcs)
+    bus = _bus(InMemoryEventBus)
+
+    event_service.register_all(bus, batch=True)
+    assert bus.dispatch.get(EventType.NPC_DECISION) == ()
+
+    npcs.append(FakeNPC("npc:2"))
+    bus.post_tick()
+    assert [e.npc_id for e in bus.drain(EventType.NPC_ACTION)] == ["npc:1", "npc:2"]
+
+
+def test_register_all_batch_on_async_bus(monkeypatch):
+    monkeypatch.setattr(event_service, "NPC_INSTANCE_LIST", [FakeNPC("npc:1"), FakeNPC("npc:2")])
+    bus = _bus(AsyncEventBus)
+
+    event_service.register_all(bus, batch=True)
+    asyncio.run(bus.post_tick())
+    assert sorted(e.npc_id for e in bus.drain(EventType.NPC_ACTION)) == ["npc:1", "npc:2"]
+
+
+def test_register_all_per_npc(monkeypatch):
+    monkeypatch.setattr(event_service, "NPC_INSTANCE_LIST", [FakeNPC("npc:1"), FakeNPC("npc:2")])
+    bus = _bus(InMemoryEventBus)
+
+    event_service.register_all(bus)
+    assert len(bus.dispatch.get(EventType.NPC_DECISION)) == 2
+
+
+def test_register_all_process_bus_always_batches(monkeypatch):
+    from aitown.kernel.process_event_bus import ProcessEventBus
+
+    monkeypatch.setattr(event_service, "NPC_INSTANCE_LIST", [FakeNPC("npc:1")])
+    bus = ProcessEventBus(workers=1)
+
+    event_service.register_all(bus)
+    assert bus.dispatch.get(EventType.NPC_DECISION) == ()
+    assert bus.dispatch.batch(EventType.NPC_DECISION) == (
+        event_service.EventService.decide_all_in_workers,
+    )